@@ -0,0 +1,131 @@
+"""
+Tâches en arrière-plan pilotées depuis la boucle Tk.
+
+Une tâche est une suite d'étapes. Le travail de chaque étape s'exécute
+hors du thread Tk ; son résultat est repris dans le thread Tk par
+root.after (relevé périodique du Future), où l'étape l'applique à
+l'interface avant que l'étape suivante ne démarre. La fenêtre reste donc
+réactive pendant les opérations longues (démarrage d'Excel, ouverture du
+classeur).
+
+Une tâche annulée n'applique plus aucun résultat : le résultat d'une étape
+en cours est remis à sa fonction `discard` (fermeture d'un classeur ouvert
+pour rien, par exemple).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_INTERVAL = 50      # Millisecondes entre deux relevés du thread Tk
+
+
+class Stage:
+    """
+    Étape d'une tâche : work(valeur) hors du thread Tk, puis
+    apply(résultat) dans le thread Tk ; discard(résultat) si la tâche a
+    été annulée entre-temps. L'étape suivante reçoit la valeur retournée
+    par apply, ou à défaut d'apply le résultat de work.
+    """
+
+    def __init__(self, label, work, apply=None, discard=None):
+        self.label = label
+        self.work = work
+        self.apply = apply
+        self.discard = discard
+
+
+class StagedTask:
+    """
+    Exécute `stages` l'une après l'autre. Rappels, tous dans le thread Tk :
+    on_progress(index, nombre d'étapes, libellé) au démarrage de chaque
+    étape, on_done(dernier résultat), on_error(exception), on_cancel().
+    """
+
+    def __init__(self, root, stages, on_progress=None, on_done=None, on_error=None,
+                 on_cancel=None, poll_interval=POLL_INTERVAL):
+        self.root = root
+        self.stages = list(stages)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.poll_interval = poll_interval
+        self.index = 0
+        self.cancelled = False
+        self.finished = False
+        self._future = None
+        self._executor = None
+
+    @property
+    def running(self):
+        return self._executor is not None and not self.finished
+
+    def start(self, value=None):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tache")
+        self._next(value)
+        return self
+
+    def cancel(self):
+        """Annule la tâche ; l'étape en cours se termine mais son résultat est écarté"""
+        if self.finished or self.cancelled:
+            return
+        self.cancelled = True
+        if self._future is None or self._future.cancel():
+            self._finish()
+            self._notify(self.on_cancel)
+
+    def _next(self, value):
+        if self.index >= len(self.stages):
+            self._finish()
+            self._notify(self.on_done, value)
+            return
+        stage = self.stages[self.index]
+        self._notify(self.on_progress, self.index, len(self.stages), stage.label)
+        self._future = self._executor.submit(stage.work, value)
+        self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        if self.finished:
+            return
+        if not self._future.done():
+            self.root.after(self.poll_interval, self._poll)
+            return
+        stage = self.stages[self.index]
+        error = self._future.exception()
+        if self.cancelled:
+            if error is None and stage.discard is not None:
+                self._notify(stage.discard, self._future.result())
+            self._finish()
+            self._notify(self.on_cancel)
+            return
+        if error is not None:
+            self._finish()
+            if self.on_error is None:
+                raise error
+            self.on_error(error)
+            return
+        result = self._future.result()
+        try:
+            if stage.apply is not None:
+                result = stage.apply(result)
+        except Exception as e:
+            self._finish()
+            if self.on_error is None:
+                raise
+            self.on_error(e)
+            return
+        self.index += 1
+        self._next(result)
+
+    def _finish(self):
+        self.finished = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _notify(callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Erreur dans le rappel de la tâche: {str(e)}")
@@ -0,0 +1,211 @@
+"""
+Graphe de calcul à recalcul incrémental.
+
+Chaque résultat intermédiaire (frais d'emprunt, flux annuels et
+fiscalité, plus-value, projection, synthèse) est un nœud qui déclare ses
+dépendances. Modifier une entrée n'invalide que les nœuds situés en aval,
+recalculés à la demande ; un nœud recalculé à l'identique n'entraîne pas
+le recalcul de ses dépendants. Les abonnés ne sont prévenus que pour les
+sorties dont la valeur a changé.
+"""
+
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from capital_gains import LMNP_REGIMES, capital_gains_curves
+from fiscal_engine import (
+    INPUT_KEYS, MAX_HORIZON, _ScalarMath, financing_costs, normalize_value,
+    optimal_regime, simulate_years,
+)
+from projection import Projection
+
+
+def same_value(a, b):
+    """Égalité de deux résultats (nombres, tableaux, listes, dictionnaires)"""
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, np.ndarray):
+        return a.shape == b.shape and np.array_equal(a, b)
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same_value(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(same_value(x, y) for x, y in zip(a, b))
+    try:
+        return bool(a == b)
+    except (ValueError, TypeError):
+        return False
+
+
+class CalculationGraph:
+    """Entrées et nœuds nommés, recalculés paresseusement"""
+
+    def __init__(self):
+        self._nodes = {}                    # nœud -> (dépendances, fonction)
+        self._dependents = defaultdict(set)
+        self._values = {}
+        self._versions = Counter()          # incrémentée à chaque changement de valeur
+        self._computed_with = {}            # nœud -> versions des dépendances utilisées
+        self._dirty = set()
+        self._seeded = set()                # nœuds fixés par seed(), non calculés
+        self._subscriptions = {}
+        self._next_token = 0
+        self.evaluations = Counter()        # nombre de calculs par nœud
+
+    def add_input(self, name, value=None):
+        self._values[name] = value
+
+    def add_node(self, name, dependencies, function):
+        """Déclare un nœud calculé par function(*valeurs des dépendances)"""
+        for dependency in dependencies:
+            if dependency not in self._values and dependency not in self._nodes:
+                raise ValueError(f"Dépendance inconnue : {dependency}")
+        self._nodes[name] = (tuple(dependencies), function)
+        for dependency in dependencies:
+            self._dependents[dependency].add(name)
+        self._dirty.add(name)
+
+    def set_inputs(self, values):
+        """Met à jour des entrées ; retourne celles dont la valeur a changé"""
+        changed = set()
+        for name, value in values.items():
+            if name in self._nodes:
+                raise ValueError(f"{name} est un nœud calculé, pas une entrée")
+            if name in self._values and same_value(self._values[name], value):
+                continue
+            self._values[name] = value
+            self._versions[name] += 1
+            changed.add(name)
+        if changed and self._seeded:
+            # Les valeurs fixées ne valaient que pour les entrées précédentes ;
+            # leurs dépendances n'ayant jamais été calculées, l'invalidation
+            # depuis les entrées ne les atteint pas
+            seeded, self._seeded = self._seeded, set()
+            self._dirty.update(seeded)
+            self._invalidate(seeded)
+        self._invalidate(changed)
+        return changed
+
+    def seed(self, values):
+        """
+        Fixe la valeur de nœuds calculés sans les calculer : résultats déjà
+        connus pour les entrées actuelles (instantané enregistré, par
+        exemple). Ils sont recalculés dès qu'une entrée change.
+        """
+        for name, value in values.items():
+            if name not in self._nodes:
+                raise ValueError(f"{name} n'est pas un nœud calculé")
+            if name not in self._values or not same_value(self._values[name], value):
+                self._values[name] = value
+                self._versions[name] += 1
+            self._computed_with.pop(name, None)
+            self._dirty.discard(name)
+            self._seeded.add(name)
+
+    def _invalidate(self, names):
+        stack = list(names)
+        while stack:
+            for dependent in self._dependents[stack.pop()]:
+                if dependent not in self._dirty:
+                    self._dirty.add(dependent)
+                    stack.append(dependent)
+
+    def get(self, name):
+        """Valeur d'une entrée ou d'un nœud, recalculé si nécessaire"""
+        if name in self._dirty:
+            dependencies, function = self._nodes[name]
+            arguments = [self.get(dependency) for dependency in dependencies]
+            versions = tuple(self._versions[dependency] for dependency in dependencies)
+            # Dépendances recalculées à l'identique : rien à refaire
+            if self._computed_with.get(name) != versions:
+                value = function(*arguments)
+                self.evaluations[name] += 1
+                if name not in self._values or not same_value(self._values[name], value):
+                    self._values[name] = value
+                    self._versions[name] += 1
+                self._computed_with[name] = versions
+            self._dirty.discard(name)
+        return self._values[name]
+
+    def subscribe(self, outputs, callback):
+        """
+        Abonne callback(changements) aux sorties `outputs` ; changements est
+        un dictionnaire {sortie: nouvelle valeur} limité aux sorties
+        modifiées depuis la notification précédente. Retourne un jeton.
+        """
+        token = self._next_token
+        self._next_token += 1
+        self._subscriptions[token] = (tuple(outputs), callback, {})
+        return token
+
+    def unsubscribe(self, token):
+        self._subscriptions.pop(token, None)
+
+    def recalculate(self):
+        """Recalcule les sorties suivies et prévient les abonnés concernés"""
+        notifications = []
+        for outputs, callback, seen in self._subscriptions.values():
+            changes = {}
+            for name in outputs:
+                value = self.get(name)
+                if seen.get(name) != self._versions[name]:
+                    seen[name] = self._versions[name]
+                    changes[name] = value
+            if changes:
+                notifications.append((callback, changes))
+        # Les abonnés sont appelés une fois tous les calculs terminés
+        for callback, changes in notifications:
+            callback(changes)
+        return notifications
+
+
+# Entrées lues par chaque nœud du moteur fiscal
+LOAN_INPUTS = ("loan_amount", "loan_duration", "loan_rate", "loan_insurance_rate")
+YEARLY_INPUTS = ("rent", "vacancy_months", "rent_growth", "property_charges", "insurance",
+                 "marginal_tax_rate", "acquisition_price", "works_cost", "furniture_cost", "cga")
+CAPITAL_GAINS_INPUTS = ("acquisition_price", "works_cost", "selling_price", "sale_withdrawal")
+
+
+class FiscalGraph(CalculationGraph):
+    """
+    Graphe du moteur fiscal, entrées de feuil1 normalisées.
+
+    Nœuds : loan_costs (frais d'emprunt annuels), yearly_flows (loyers,
+    charges, impôt, prélèvements sociaux par année), capital_gains
+    (plus-value par durée), projection, costs et summary (lectures à la
+    durée de détention) et optimal_regime.
+    """
+
+    def __init__(self, values=None):
+        super().__init__()
+        for key in INPUT_KEYS:
+            self.add_input(key, normalize_value(key, None))
+
+        self.add_node("loan_costs", LOAN_INPUTS, lambda *args: financing_costs(
+            dict(zip(LOAN_INPUTS, args)), MAX_HORIZON))
+        self.add_node("yearly_flows", YEARLY_INPUTS + ("loan_costs",), lambda *args: simulate_years(
+            dict(zip(YEARLY_INPUTS, args)), args[-1], _ScalarMath))
+        self.add_node("capital_gains", CAPITAL_GAINS_INPUTS + ("yearly_flows",), self._capital_gains)
+        self.add_node("projection", ("yearly_flows", "capital_gains"), Projection)
+        self.add_node("costs", ("projection", "detention_duration"),
+                      lambda projection, years: projection.regime_costs(years))
+        self.add_node("summary", ("projection", "detention_duration"),
+                      lambda projection, years: projection.summary(years))
+        self.add_node("optimal_regime", ("costs",), optimal_regime)
+
+        if values:
+            self.set_values(values)
+
+    @staticmethod
+    def _capital_gains(*args):
+        e = dict(zip(CAPITAL_GAINS_INPUTS, args))
+        lmnp = args[-1]["lmnp"]
+        return capital_gains_curves(e, {regime: lmnp[regime]["deducted"]
+                                        for regime in LMNP_REGIMES})
+
+    def set_values(self, values):
+        """Met à jour des entrées brutes (valeurs de cellules), même partielles"""
+        return self.set_inputs({key: normalize_value(key, value)
+                                for key, value in values.items() if key in INPUT_KEYS})
@@ -0,0 +1,172 @@
+"""
+Fiscalité de la plus-value de cession.
+
+Calcule l'impôt sur la plus-value pour chaque régime et pour toutes les
+durées de détention de 1 à MAX_HORIZON ans en un seul appel vectorisé :
+- régime des particuliers (micro, SCI IR, LMNP) : forfaits frais
+  d'acquisition et travaux, abattements pour durée de détention distincts
+  pour l'impôt sur le revenu et les prélèvements sociaux, surtaxe sur les
+  plus-values élevées ;
+- LMNP : réintégration des amortissements déduits ;
+- SCI IS : plus-value professionnelle calculée sur la valeur nette
+  comptable et soumise à l'IS, puis au PFU en cas de distribution.
+"""
+
+import numpy as np
+
+from fiscal_engine import (
+    FLAT_TAX_RATE, LAND_SHARE, BUILDING_DEPRECIATION_YEARS, LMNP_REGIMES, MAX_HORIZON,
+    REGIMES, SOCIAL_CHARGES_RATE, WORKS_DEPRECIATION_YEARS, _ScalarMath,
+    batch_financing_costs, corporate_tax, financing_costs, holding_years,
+    normalize_batch, normalize_inputs, records_to_columns, simulate_years,
+)
+
+CAPITAL_GAINS_TAX_RATE = 0.19         # Impôt sur le revenu des plus-values
+ACQUISITION_FEES_FLAT_RATE = 0.075    # Forfait frais d'acquisition
+WORKS_FLAT_RATE = 0.15                # Forfait travaux au-delà de 5 ans
+ALLOWANCE_START_YEAR = 5              # Pas d'abattement ni de forfait avant
+SURTAX_BRACKETS = (
+    # (plus-value imposable au-delà de, taux de surtaxe)
+    (50000, 0.02),
+    (100000, 0.03),
+    (150000, 0.04),
+    (200000, 0.05),
+    (250000, 0.06),
+)
+
+
+def holding_allowances(years):
+    """
+    Abattements pour durée de détention (impôt, prélèvements sociaux).
+
+    Impôt : 6 % par an de la 6e à la 21e année, 4 % la 22e (exonération
+    après 22 ans). Prélèvements sociaux : 1,65 % par an de la 6e à la 21e
+    année, 1,60 % la 22e, 9 % par an ensuite (exonération après 30 ans).
+    """
+    years = np.asarray(years)
+    counted = np.clip(years - ALLOWANCE_START_YEAR, 0, 16)
+    income = 0.06 * counted + 0.04 * (years >= 22)
+    social = (0.0165 * counted + 0.016 * (years >= 22)
+              + 0.09 * np.clip(years - 22, 0, 8))
+    return np.minimum(income, 1.0), np.minimum(social, 1.0)
+
+
+def surtax(taxable_gain):
+    """Surtaxe sur les plus-values imposables supérieures à 50 000 €"""
+    rate = np.zeros(np.shape(taxable_gain))
+    for threshold, bracket_rate in SURTAX_BRACKETS:
+        rate = np.where(taxable_gain > threshold, bracket_rate, rate)
+    return taxable_gain * rate
+
+
+def private_gain_tax(gain, years):
+    """Impôt et prélèvements sociaux sur une plus-value des particuliers"""
+    gain = np.maximum(gain, 0.0)
+    income_allowance, social_allowance = holding_allowances(years)
+    income_base = gain * (1 - income_allowance)
+    return (income_base * CAPITAL_GAINS_TAX_RATE + surtax(income_base)
+            + gain * (1 - social_allowance) * SOCIAL_CHARGES_RATE)
+
+
+def capital_gains_curves(e, lmnp_deducted):
+    """
+    Fiscalité de la plus-value par régime pour chaque durée de détention.
+
+    `e` contient des entrées normalisées (scalaires ou tableaux de N
+    scénarios), `lmnp_deducted` les amortissements LMNP déduits chaque
+    année par régime (listes de MAX_HORIZON valeurs). Retourne un
+    dictionnaire {régime: tableau (..., MAX_HORIZON)}, la colonne i
+    correspondant à une cession au bout de i + 1 années.
+    """
+    years = np.arange(1, MAX_HORIZON + 1)
+    deducted = {regime: np.cumsum(np.stack(np.broadcast_arrays(*lmnp_deducted[regime]), axis=-1),
+                                  axis=-1)
+                for regime in LMNP_REGIMES}
+    taxes = _taxes({key: np.asarray(value)[..., None] for key, value in e.items()},
+                   years, deducted)
+    shape = np.broadcast(np.asarray(e["selling_price"])[..., None], years).shape
+    return {regime: np.broadcast_to(taxes[regime], shape) for regime in REGIMES}
+
+
+def capital_gains_at(e, years, deducted):
+    """
+    Fiscalité de la plus-value par régime d'une cession au bout de `years`
+    années, pour des entrées normalisées en lot. `deducted` contient les
+    amortissements LMNP déduits sur la durée de détention (scénarios x
+    LMNP_REGIMES, voir evaluate_batch). Retourne une matrice (scénarios x
+    régimes) dans l'ordre de REGIMES.
+    """
+    deducted = dict(zip(LMNP_REGIMES, np.moveaxis(np.asarray(deducted), -1, 0)))
+    taxes = _taxes(e, np.asarray(years), deducted)
+    shape = np.broadcast(*taxes.values()).shape
+    return np.stack([np.broadcast_to(taxes[regime], shape) for regime in REGIMES], axis=-1)
+
+
+def _taxes(e, years, deducted):
+    """Fiscalité de la plus-value par régime, `deducted` : amortissements LMNP cumulés"""
+    price = np.asarray(e["acquisition_price"], dtype=float)
+    works = np.asarray(e["works_cost"], dtype=float)
+    sale = np.asarray(e["selling_price"], dtype=float)
+
+    # Prix de revient des particuliers : forfait frais d'acquisition, puis
+    # travaux réels ou forfait de 15 % après 5 ans de détention
+    flat_works = np.where(years > ALLOWANCE_START_YEAR, WORKS_FLAT_RATE * price, 0.0)
+    cost_price = price * (1 + ACQUISITION_FEES_FLAT_RATE)
+    private_gain = sale - cost_price - np.maximum(works, flat_works)
+
+    taxes = {"micro nu + meublé": private_gain_tax(private_gain, years)}
+    # SCI IR : travaux déjà déduits des revenus fonciers, seul le forfait reste
+    taxes["SCI IR"] = private_gain_tax(sale - cost_price - flat_works, years)
+    # LMNP : les amortissements déduits sont réintégrés dans la plus-value
+    for regime in LMNP_REGIMES:
+        taxes[regime] = private_gain_tax(private_gain + deducted[regime], years)
+
+    # SCI IS : plus-value sur la valeur nette comptable, soumise à l'IS
+    depreciation = (price * (1 - LAND_SHARE) / BUILDING_DEPRECIATION_YEARS
+                    * np.minimum(years, BUILDING_DEPRECIATION_YEARS)
+                    + works / WORKS_DEPRECIATION_YEARS
+                    * np.minimum(years, WORKS_DEPRECIATION_YEARS))
+    gain = np.maximum(sale - (price + works - depreciation), 0.0)
+    tax = corporate_tax(gain, np)
+    distributed = tax + (gain - tax) * FLAT_TAX_RATE
+    # Le prix de cession prélevé est distribué et soumis au PFU
+    withdrawal = np.asarray(e["sale_withdrawal"], dtype=bool)
+    taxes["SCI IS"] = np.where(withdrawal, distributed, tax)
+    taxes["SCI IS PREL BONI"] = distributed
+    return taxes
+
+
+def capital_gains_curve(values):
+    """Fiscalité de la plus-value par régime pour les durées 1 à 40 ans"""
+    e = normalize_inputs(values)
+    financing = financing_costs(e, MAX_HORIZON, values.get("loans"))
+    lmnp = simulate_years(e, financing, _ScalarMath)["lmnp"]
+    deducted = {regime: lmnp[regime]["deducted"] for regime in LMNP_REGIMES}
+    return capital_gains_curves(e, deducted)
+
+
+def capital_gains_taxes(values):
+    """
+    Fiscalité de la plus-value par régime, pour une cession au bout de 40
+    ans et au terme de la durée de détention (c3), issues d'une seule
+    évaluation. Retourne {régime: (40 ans, durée de détention)}.
+    """
+    years = holding_years(normalize_inputs(values)["detention_duration"])
+    return {regime: (float(curve[MAX_HORIZON - 1]), float(curve[years - 1]))
+            for regime, curve in capital_gains_curve(values).items()}
+
+
+def capital_gains_batch(scenarios):
+    """
+    Courbes de fiscalité de la plus-value d'un lot de scénarios.
+
+    `scenarios` accepte les mêmes formes que compute_batch. Retourne un
+    tableau (scénarios x régimes x MAX_HORIZON).
+    """
+    if not isinstance(scenarios, dict):
+        scenarios = records_to_columns(scenarios)
+    e = normalize_batch(scenarios)
+    lmnp = simulate_years(e, batch_financing_costs(e, MAX_HORIZON), np)["lmnp"]
+    deducted = {regime: lmnp[regime]["deducted"] for regime in LMNP_REGIMES}
+    curves = capital_gains_curves(e, deducted)
+    return np.stack([curves[regime] for regime in REGIMES], axis=-2)
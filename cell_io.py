@@ -0,0 +1,345 @@
+"""
+Lecture et écriture groupées des cellules du classeur.
+
+Chaque accès COM à une cellule (sheet.Range(cell).Value) est un aller-retour
+entre processus. Les cellules lues sont regroupées dans leur plage
+englobante : les 13 entrées de feuil1 se lisent en un seul appel, web!B2:B5
+en un autre. Les saisies du formulaire s'écrivent par suites de cellules
+contiguës d'une même colonne, sans toucher aux autres cellules (formules,
+cellules verrouillées d'une feuille protégée). L'écriture se fait calcul
+suspendu : un seul recalcul est forcé une fois toutes les valeurs en
+place.
+
+CellIO définit l'interface ; ComCellIO s'appuie sur un classeur ouvert par
+win32com, MemoryCellIO est une implémentation en mémoire qui compte les
+allers-retours et peut simuler leur latence, pour mesurer sous Linux.
+"""
+
+import re
+import time
+from collections import Counter
+
+from fiscal_engine import INPUT_CELLS, REGIMES
+
+INPUT_SHEET = "feuil1"
+WEB_SHEET = "web"
+WEB_COST_CELLS = ("B2", "B3", "B4", "B5")
+
+# Constantes Excel (XlCalculation)
+XL_CALCULATION_MANUAL = -4135
+
+_CELL = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+
+
+def split_cell(cell):
+    """("c4") -> (colonne, ligne) numérotées à partir de 1"""
+    match = _CELL.match(cell.strip())
+    if not match:
+        raise ValueError(f"Cellule invalide : {cell}")
+    column = 0
+    for letter in match.group(1).upper():
+        column = column * 26 + ord(letter) - ord("A") + 1
+    return column, int(match.group(2))
+
+
+def column_letter(column):
+    letters = ""
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def bounding_block(cells):
+    """Plage englobante d'un ensemble de cellules : (adresse, colonne, ligne)"""
+    positions = [split_cell(cell) for cell in cells]
+    first_column = min(column for column, _ in positions)
+    first_row = min(row for _, row in positions)
+    last_column = max(column for column, _ in positions)
+    last_row = max(row for _, row in positions)
+    address = f"{column_letter(first_column)}{first_row}:{column_letter(last_column)}{last_row}"
+    return address, first_column, first_row
+
+
+def contiguous_runs(values):
+    """
+    Regroupe {cellule: valeur} en suites de cellules contiguës d'une même
+    colonne : [(adresse, lignes de valeurs)], par exemple ("B25:B26", ((1,), (2,))).
+    """
+    columns = {}
+    for cell, value in values.items():
+        column, row = split_cell(cell)
+        columns.setdefault(column, {})[row] = value
+    runs = []
+    for column in sorted(columns):
+        cells = columns[column]
+        rows = sorted(cells)
+        start = previous = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == previous + 1:
+                previous = row
+                continue
+            letter = column_letter(column)
+            address = f"{letter}{start}" if start == previous else f"{letter}{start}:{letter}{previous}"
+            runs.append((address, tuple((cells[line],) for line in range(start, previous + 1))))
+            if row is not None:
+                start = previous = row
+    return runs
+
+
+class CellIO:
+    """
+    Accès groupé aux cellules d'un classeur. Les sous-classes fournissent
+    deux allers-retours élémentaires sur une plage rectangulaire :
+    _read_values et _write_values (lignes de valeurs).
+    """
+
+    def __init__(self):
+        self.calls = Counter()      # allers-retours par opération
+
+    def read_cells(self, sheet, cells):
+        """Valeurs de `cells` ({cellule: valeur}) en une seule lecture"""
+        cells = list(cells)
+        if not cells:
+            return {}
+        address, first_column, first_row = bounding_block(cells)
+        self.calls["read"] += 1
+        rows = self._read_values(sheet, address)
+        values = {}
+        for cell in cells:
+            column, row = split_cell(cell)
+            values[cell] = rows[row - first_row][column - first_column]
+        return values
+
+    def write_cells(self, sheet, values):
+        """
+        Écrit {cellule: valeur} : une affectation par suite de cellules
+        contiguës d'une même colonne (voir contiguous_runs). Seules les
+        cellules visées sont écrites ; les autres ne sont ni relues ni
+        réécrites.
+        """
+        for address, rows in contiguous_runs(values):
+            self.calls["write"] += 1
+            self._write_values(sheet, address, rows)
+
+    def read_inputs(self):
+        """Entrées de feuil1, indexées par clé du moteur"""
+        values = self.read_cells(INPUT_SHEET, INPUT_CELLS.values())
+        return {key: values[cell] for key, cell in INPUT_CELLS.items()}
+
+    def read_web_costs(self):
+        """Coûts globaux de la feuille web (B2:B5) par régime"""
+        values = self.read_cells(WEB_SHEET, WEB_COST_CELLS)
+        return {regime: values[cell] for regime, cell in zip(REGIMES, WEB_COST_CELLS)}
+
+    def write_transaction(self, sheet, values):
+        """
+        Écrit {cellule: valeur} calcul et affichage suspendus, puis force un
+        unique recalcul. L'état antérieur (mode de calcul, rafraîchissement
+        de l'écran) est rétabli même en cas d'erreur. Retourne la durée de
+        l'écriture et celle du recalcul, en secondes.
+        """
+        timings = {"write": 0.0, "recalc": 0.0}
+        state = self._suspend_calculation()
+        try:
+            start = time.perf_counter()
+            self.write_cells(sheet, values)
+            timings["write"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.calls["recalculate"] += 1
+            self._recalculate()
+            timings["recalc"] = time.perf_counter() - start
+        finally:
+            self._restore_calculation(state)
+        return timings
+
+    def write_inputs(self, values):
+        """Écrit des entrées de feuil1 indexées par cellule ("c4") ; voir write_transaction"""
+        return self.write_transaction(INPUT_SHEET, values)
+
+    def _read_values(self, sheet, address):
+        raise NotImplementedError
+
+    def _write_values(self, sheet, address, rows):
+        raise NotImplementedError
+
+    # Sans moteur de calcul (classeur lu depuis le fichier) : rien à suspendre
+    def _suspend_calculation(self):
+        return None
+
+    def _recalculate(self):
+        pass
+
+    def _restore_calculation(self, state):
+        pass
+
+
+def _as_rows(value):
+    """Range.Value d'une seule cellule est un scalaire, sinon des lignes"""
+    if isinstance(value, tuple):
+        return value
+    return ((value,),)
+
+
+class ComCellIO(CellIO):
+    """Accès groupé à un classeur Excel ouvert par win32com"""
+
+    def __init__(self, workbook):
+        super().__init__()
+        self.workbook = workbook
+
+    def _read_values(self, sheet, address):
+        return _as_rows(self.workbook.Sheets(sheet).Range(address).Value)
+
+    def _write_values(self, sheet, address, rows):
+        # Une cellule seule reçoit un scalaire, comme Range.Value le renvoie
+        if len(rows) == 1 and len(rows[0]) == 1:
+            rows = rows[0][0]
+        self.workbook.Sheets(sheet).Range(address).Value = rows
+
+    def _application(self):
+        # Absente pour un classeur lu depuis le fichier
+        return getattr(self.workbook, "Application", None)
+
+    def _suspend_calculation(self):
+        application = self._application()
+        if application is None:
+            return None
+        state = (application.Calculation, application.ScreenUpdating, application.EnableEvents)
+        try:
+            application.ScreenUpdating = False
+            application.EnableEvents = False
+            application.Calculation = XL_CALCULATION_MANUAL
+        except Exception:
+            self._restore_calculation(state)
+            raise
+        return state
+
+    def _recalculate(self):
+        application = self._application()
+        if application is not None:
+            application.Calculate()
+
+    def _restore_calculation(self, state):
+        application = self._application()
+        if application is None or state is None:
+            return
+        calculation, screen_updating, enable_events = state
+        # Chaque propriété est rétablie même si une autre échoue
+        for name, value in (("Calculation", calculation), ("ScreenUpdating", screen_updating),
+                            ("EnableEvents", enable_events)):
+            try:
+                setattr(application, name, value)
+            except Exception as e:
+                print(f"Impossible de rétablir {name} : {str(e)}")
+
+
+class MemoryCellIO(CellIO):
+    """
+    Classeur en mémoire ({feuille: {cellule: valeur}}). `latency` (en
+    secondes) est ajoutée à chaque aller-retour pour reproduire le coût
+    d'un appel COM, `recalc_latency` à chaque recalcul.
+    """
+
+    def __init__(self, sheets=None, latency=0.0, recalc_latency=0.0):
+        super().__init__()
+        self.latency = latency
+        self.recalc_latency = recalc_latency
+        # Comme Excel en calcul automatique : un recalcul par écriture
+        self.automatic = True
+        self.screen_updating = True
+        self.recalculations = 0
+        self.sheets = {}
+        for sheet, cells in (sheets or {}).items():
+            self.sheets[sheet.lower()] = {cell.upper(): value for cell, value in cells.items()}
+
+    def _block(self, sheet, address):
+        if self.latency:
+            time.sleep(self.latency)
+        first, _, last = address.partition(":")
+        first_column, first_row = split_cell(first)
+        last_column, last_row = split_cell(last or first)
+        cells = self.sheets.setdefault(sheet.lower(), {})
+        return cells, [[f"{column_letter(column)}{row}"
+                        for column in range(first_column, last_column + 1)]
+                       for row in range(first_row, last_row + 1)]
+
+    def _read_values(self, sheet, address):
+        cells, block = self._block(sheet, address)
+        return tuple(tuple(cells.get(cell) for cell in row) for row in block)
+
+    def _write_values(self, sheet, address, rows):
+        cells, block = self._block(sheet, address)
+        for names, values in zip(block, rows):
+            for cell, value in zip(names, values):
+                if value in (None, ""):
+                    cells.pop(cell, None)
+                else:
+                    cells[cell] = value
+        if self.automatic:
+            self._recalculate()
+
+    def _suspend_calculation(self):
+        state = (self.automatic, self.screen_updating)
+        self.automatic, self.screen_updating = False, False
+        return state
+
+    def _recalculate(self):
+        self.recalculations += 1
+        if self.recalc_latency:
+            time.sleep(self.recalc_latency)
+
+    def _restore_calculation(self, state):
+        self.automatic, self.screen_updating = state
+
+
+def benchmark(cell_io, repeat=10):
+    """
+    Compare la lecture cellule par cellule des entrées et de web!B2:B5
+    (ancien accès) à la lecture groupée. Retourne les allers-retours et le
+    temps moyen de chaque méthode.
+    """
+    results = {}
+    for method in ("per_cell", "bulk"):
+        cell_io.calls.clear()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            if method == "bulk":
+                cell_io.read_inputs()
+                cell_io.read_web_costs()
+            else:
+                for cell in INPUT_CELLS.values():
+                    cell_io.read_cells(INPUT_SHEET, [cell])
+                for cell in WEB_COST_CELLS:
+                    cell_io.read_cells(WEB_SHEET, [cell])
+        results[method] = {
+            "round_trips": sum(cell_io.calls.values()) / repeat,
+            "seconds": (time.perf_counter() - start) / repeat,
+        }
+    return results
+
+
+def benchmark_writes(cell_io, values, sheet=INPUT_SHEET):
+    """
+    Compare l'écriture cellule par cellule (ancien accès : une affectation
+    Range(cellule).Value par cellule, un recalcul par cellule en calcul
+    automatique) à l'écriture groupée calcul suspendu. Retourne, pour
+    chaque méthode, les allers-retours et les durées d'écriture et de
+    recalcul.
+    """
+    results = {}
+    cell_io.calls.clear()
+    start = time.perf_counter()
+    for cell, value in values.items():
+        cell_io.calls["write"] += 1
+        cell_io._write_values(sheet, cell, ((value,),))
+    results["per_cell"] = {
+        "round_trips": cell_io.calls["read"] + cell_io.calls["write"],
+        "seconds": time.perf_counter() - start,
+    }
+    cell_io.calls.clear()
+    timings = cell_io.write_transaction(sheet, values)
+    results["transaction"] = dict(
+        timings, round_trips=cell_io.calls["read"] + cell_io.calls["write"])
+    return results
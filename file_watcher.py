@@ -0,0 +1,115 @@
+"""
+Surveillance du classeur ouvert.
+
+Un thread relève périodiquement la taille et la date de modification du
+fichier. Un changement n'est pris en compte qu'une fois le fichier stable
+pendant `debounce` secondes (Excel écrit un enregistrement en plusieurs
+fois, un analyste enregistre souvent plusieurs fois de suite), puis
+l'empreinte du contenu est comparée à la dernière connue : le rappel n'est
+appelé qu'une fois par modification réelle du contenu.
+"""
+
+import threading
+import time
+from pathlib import Path
+
+from formula_compiler import workbook_hash
+
+POLL_INTERVAL = 1.0     # Secondes entre deux relevés
+DEBOUNCE = 2.0          # Secondes de stabilité avant de relire le contenu
+
+
+def _signature(path):
+    """(taille, date de modification) du fichier, None s'il est absent"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _content_hash(path):
+    try:
+        return workbook_hash(path)
+    except OSError:
+        # Fichier en cours d'écriture ou verrouillé : nouvel essai au relevé suivant
+        return None
+
+
+class FileWatcher:
+    """
+    Appelle callback(path) depuis le thread de surveillance à chaque
+    modification du contenu de `path`, une fois les enregistrements
+    successifs terminés.
+    """
+
+    def __init__(self, path, callback, interval=POLL_INTERVAL, debounce=DEBOUNCE):
+        self.path = Path(path)
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+        self.changes = 0            # Modifications signalées
+        self._signature = _signature(self.path)
+        self._hash = _content_hash(self.path)
+        self._changed_at = None     # Dernier changement de signature non encore traité
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="surveillance classeur",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def acknowledge(self):
+        """Prend l'état actuel du fichier pour référence (après un enregistrement par l'application)"""
+        with self._lock:
+            self._signature = _signature(self.path)
+            self._hash = _content_hash(self.path)
+            self._changed_at = None
+
+    def check(self, now=None):
+        """
+        Un relevé : retourne True si une modification du contenu vient
+        d'être détectée (le rappel a alors été appelé).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            signature = _signature(self.path)
+            if signature != self._signature:
+                # Enregistrement en cours : on attend que le fichier soit stable
+                self._signature = signature
+                self._changed_at = now
+                return False
+            if self._changed_at is None or now - self._changed_at < self.debounce:
+                return False
+            if signature is None:
+                # Fichier supprimé ou renommé pendant l'enregistrement
+                return False
+            digest = _content_hash(self.path)
+            if digest is None:
+                return False
+            self._changed_at = None
+            if digest == self._hash:
+                # Date modifiée sans changement du contenu
+                return False
+            self._hash = digest
+            self.changes += 1
+        try:
+            self.callback(self.path)
+        except Exception as e:
+            print(f"Erreur lors du traitement de la modification du classeur: {str(e)}")
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
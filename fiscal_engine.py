@@ -0,0 +1,537 @@
+"""
+Moteur fiscal natif : calcul des coûts globaux par régime sans Excel.
+
+Reproduit en Python le calcul de la feuille "web" (B2:B5) à partir des
+cellules d'entrée de la feuille "feuil1". Le même calcul est disponible
+en version vectorisée (numpy) pour évaluer des lots de scénarios.
+"""
+
+import numpy as np
+
+from loan import amortize_loans, annual_insurance, annual_interest, annual_interest_batch
+
+# Cellules d'entrée de la feuille feuil1
+INPUT_CELLS = {
+    "acquisition_price": "c4",    # Prix d'acquisition
+    "works_cost": "b51",          # Travaux
+    "property_charges": "b25",    # TF + charges loc.
+    "insurance": "b26",           # Assurance
+    "rent": "c1",                 # Loyer mensuel
+    "loan_amount": "b39",         # Emprunt
+    "loan_duration": "b40",       # Durée emprunt (années)
+    "loan_rate": "b43",           # Taux emprunt (%)
+    "marginal_tax_rate": "c6",    # TMI perso./physique (%)
+    "selling_price": "b47",       # Prix de cession
+    "detention_duration": "c3",   # Durée détention (années)
+    "sale_withdrawal": "c2",      # Prél. prix de cession (OUI/NON)
+    "cga": "f3",                  # CGA (OUI/NON)
+}
+
+# Hypothèses complémentaires hors feuil1 (nulles par défaut)
+OPTIONAL_INPUTS = (
+    "rent_growth",                # Revalorisation annuelle du loyer (%)
+    "vacancy_months",             # Mois de vacance locative par an
+    "loan_insurance_rate",        # Assurance emprunteur (% annuel du capital)
+    "furniture_cost",             # Mobilier (LMNP)
+)
+INPUT_KEYS = tuple(INPUT_CELLS) + OPTIONAL_INPUTS
+
+FLAG_INPUTS = ("sale_withdrawal", "cga")
+# Unité fixée par entrée, jamais déduite de la valeur (un taux de 0,8 %
+# ou de 100 % est ambigu) : les taux des cellules sont des fractions, comme
+# enregistrés dans le classeur (0,035 pour 3,5 %)
+RATE_INPUTS = ("loan_rate", "marginal_tax_rate", "rent_growth")
+PERCENT_INPUTS = ("loan_insurance_rate",)    # Toujours saisis en %
+
+# Régimes calculés : lignes 2 à 5 de la feuille web, puis LMNP au réel
+# (adhésion CGA selon f3, puis avec adhésion CGA)
+REGIMES = ("micro nu + meublé", "SCI IS", "SCI IS PREL BONI", "SCI IR",
+           "LMNP", "LMNP CGA")
+LMNP_REGIMES = ("LMNP", "LMNP CGA")
+
+# Composantes de la fiscalité annuelle suivies par régime
+FISCAL_FLOWS = ("tax", "social", "fees")
+
+# Paramètres fiscaux
+MAX_HORIZON = 40                  # Horizon maximal de simulation (années)
+BATCH_BLOCK = 4096                # Scénarios évalués ensemble par evaluate_batch
+SOCIAL_CHARGES_RATE = 0.172       # Prélèvements sociaux
+MICRO_ALLOWANCE = 0.50            # Abattement forfaitaire du régime micro
+CORPORATE_TAX_REDUCED_RATE = 0.15
+CORPORATE_TAX_REDUCED_CAP = 42500
+CORPORATE_TAX_RATE = 0.25
+FLAT_TAX_RATE = 0.30              # PFU sur dividendes (12,8 % + 17,2 %)
+DIVIDEND_TAX_RATE = FLAT_TAX_RATE - SOCIAL_CHARGES_RATE
+LAND_SHARE = 0.15                 # Quote-part terrain non amortissable
+BUILDING_DEPRECIATION_YEARS = 30
+WORKS_DEPRECIATION_YEARS = 15
+PROPERTY_DEFICIT_CAP = 10700      # Déficit foncier imputable sur le revenu global
+
+# LMNP au réel : amortissement par composant du bâti
+LMNP_COMPONENTS = (
+    # (quote-part du prix d'acquisition, durée d'amortissement)
+    (0.40, 50),                   # Gros œuvre
+    (0.20, 25),                   # Façades et étanchéité
+    (0.15, 20),                   # Installations générales techniques
+    (0.10, 15),                   # Agencements
+)                                 # Le solde (LAND_SHARE) correspond au terrain
+FURNITURE_DEPRECIATION_YEARS = 7
+LMNP_ACCOUNTING_FEES = 600        # Honoraires comptables annuels
+CGA_FEES = 200                    # Cotisation annuelle au CGA
+CGA_REDUCTION_SHARE = 2 / 3       # Réduction d'impôt pour frais de comptabilité
+CGA_REDUCTION_CAP = 915
+MICRO_BIC_THRESHOLD = 77700       # Seuil de recettes pour la réduction CGA
+
+
+def to_number(value):
+    """Convertit une valeur de cellule en float (0 si vide ou invalide)"""
+    if value is None:
+        return 0.0
+    if isinstance(value, str):
+        value = value.strip().replace(" ", "").replace(",", ".")
+        if not value:
+            return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def to_flag(value):
+    """Convertit une valeur OUI/NON en booléen"""
+    if isinstance(value, str):
+        return value.strip().upper() == "OUI"
+    return bool(value)
+
+
+def to_rate(value):
+    """Taux décimal d'une cellule de taux (fraction : 0,30 pour 30 %)"""
+    return to_number(value)
+
+
+def percent_to_rate(value):
+    """Convertit un pourcentage saisi (30 pour 30 %) en taux décimal"""
+    return to_number(value) / 100
+
+
+def normalize_value(key, value):
+    """Normalise la valeur d'une entrée selon son type"""
+    if key in FLAG_INPUTS:
+        return to_flag(value)
+    if key in RATE_INPUTS:
+        return to_rate(value)
+    if key in PERCENT_INPUTS:
+        return percent_to_rate(value)
+    return to_number(value)
+
+
+def normalize_inputs(values):
+    """Normalise un dictionnaire d'entrées (clés de INPUT_KEYS)"""
+    return {key: normalize_value(key, values.get(key)) for key in INPUT_KEYS}
+
+
+def holding_years(duration):
+    """Durée de détention entière bornée à [1, MAX_HORIZON]"""
+    return min(max(int(round(duration)), 1), MAX_HORIZON)
+
+
+class _ScalarMath:
+    """Équivalents scalaires des fonctions numpy utilisées par le moteur"""
+    maximum = staticmethod(max)
+    minimum = staticmethod(min)
+
+    @staticmethod
+    def where(condition, a, b):
+        return a if condition else b
+
+
+def financing_costs(e, last_year, loans=None):
+    """
+    Intérêts et assurance emprunteur payés chaque année (1 à `last_year`).
+
+    Sans liste de prêts, le prêt unique de feuil1 (b39, b40, b43) est
+    utilisé ; sinon les échéanciers des objets Loan sont cumulés.
+    """
+    if loans:
+        schedule = amortize_loans(loans)
+        yearly = schedule.annual_interest(last_year) + schedule.annual_insurance(last_year)
+        return yearly.sum(axis=0).tolist()
+
+    costs = annual_interest(e["loan_amount"], e["loan_duration"], e["loan_rate"], last_year)
+    if e["loan_insurance_rate"]:
+        insurance = annual_insurance(e["loan_amount"], e["loan_duration"],
+                                     e["loan_insurance_rate"], last_year)
+        costs = [cost + premium for cost, premium in zip(costs, insurance.tolist())]
+    return costs
+
+
+def batch_financing_costs(e, last_year):
+    """Version vectorisée de financing_costs : colonnes annuelles (N)"""
+    costs = annual_interest_batch(e["loan_amount"], e["loan_duration"], e["loan_rate"],
+                                  last_year)
+    costs = costs.reshape(e["loan_amount"].shape + (last_year,))
+    costs = costs + annual_insurance(e["loan_amount"], e["loan_duration"],
+                                     e["loan_insurance_rate"], last_year)
+    return [costs[..., year] for year in range(last_year)]
+
+
+def corporate_tax(profit, xp=_ScalarMath):
+    """Impôt sur les sociétés avec taux réduit"""
+    reduced = xp.minimum(xp.maximum(profit, 0.0), CORPORATE_TAX_REDUCED_CAP)
+    return (reduced * CORPORATE_TAX_REDUCED_RATE
+            + xp.maximum(profit - CORPORATE_TAX_REDUCED_CAP, 0.0) * CORPORATE_TAX_RATE)
+
+
+def lmnp_depreciation(e, last_year):
+    """
+    Dotations LMNP des années 1 à `last_year` : composants du bâti, travaux
+    et mobilier. Une ligne par année (années x scénarios en lot).
+    """
+    year = np.arange(1, last_year + 1)
+    building = sum((year <= duration) * (share / duration)
+                   for share, duration in LMNP_COMPONENTS)
+    works = (year <= WORKS_DEPRECIATION_YEARS) / WORKS_DEPRECIATION_YEARS
+    furniture = (year <= FURNITURE_DEPRECIATION_YEARS) / FURNITURE_DEPRECIATION_YEARS
+    return (np.multiply.outer(building, e["acquisition_price"])
+            + np.multiply.outer(works, e["works_cost"])
+            + np.multiply.outer(furniture, e["furniture_cost"]))
+
+
+def _carried_forward(flows):
+    """
+    Report en fin de chaque année (années x scénarios) : report = max(report
+    précédent - flux, 0), sans report initial. Une passe vectorisée sur les
+    scénarios par année, écrite en place.
+    """
+    if flows.ndim == 1:
+        # Scénario seul : la boucle sur des flottants est plus rapide
+        carried, previous = [], 0.0
+        for flow in flows.tolist():
+            previous = max(previous - flow, 0.0)
+            carried.append(previous)
+        return np.array(carried)
+    carried = np.empty_like(flows)
+    previous = 0.0
+    for year in range(len(flows)):
+        row = carried[year:year + 1]
+        np.subtract(previous, flows[year:year + 1], out=row)
+        np.maximum(row, 0.0, out=row)
+        previous = row
+    return carried
+
+
+def _previous(values):
+    """Valeurs de l'année précédente (0 la première année)"""
+    return np.concatenate([np.zeros_like(values[:1]), values[:-1]])
+
+
+def _lmnp_account(rent, operating_costs, depreciation, tmi, cga):
+    """
+    Comptes d'un LMNP au réel sur toutes les années à la fois (matrices
+    années x scénarios).
+
+    L'amortissement ne peut pas créer de déficit : la part excédant le
+    résultat est reportée sans limite de durée (amortissements différés).
+    Les déficits d'exploitation sont reportés sur les résultats suivants.
+    Retourne les frais, l'impôt, les prélèvements sociaux, les
+    amortissements déduits et différés de chaque année.
+    """
+    fees = LMNP_ACCOUNTING_FEES + CGA_FEES * np.asarray(cga)
+    operating = rent - operating_costs - fees
+    # Résultat après imputation du déficit reporté
+    deficit = _carried_forward(operating)
+    result = np.maximum(operating - _previous(deficit) + deficit, 0.0)
+
+    deferred = _carried_forward(result - depreciation)
+    deducted = depreciation + _previous(deferred) - deferred
+    taxable = result - deducted
+    tax = taxable * tmi
+
+    # Réduction d'impôt pour frais de comptabilité des adhérents CGA
+    eligible = cga & (rent <= MICRO_BIC_THRESHOLD)
+    reduction = np.where(eligible, min(CGA_REDUCTION_SHARE * (LMNP_ACCOUNTING_FEES + CGA_FEES),
+                                       CGA_REDUCTION_CAP), 0.0)
+    return {
+        "fees": np.broadcast_to(fees, rent.shape),
+        "tax": tax - np.minimum(reduction, tax),
+        "social": taxable * SOCIAL_CHARGES_RATE,
+        "deducted": deducted,
+        "deferred": deferred,
+    }
+
+
+def _simulate(e, financing):
+    """
+    Flux de toutes les années couvertes par `financing` : matrices (années
+    x scénarios), ou vecteurs (années) pour un scénario seul. Chaque flux
+    est calculé en une opération pour toutes les années ; seuls les reports
+    (déficits, amortissements différés) sont suivis année par année.
+    """
+    shape = np.broadcast(*[np.asarray(value) for value in e.values()]).shape
+    years = len(financing)
+    year = np.arange(1, years + 1).reshape((years,) + (1,) * len(shape))
+    loan_costs = np.asarray(financing, dtype=float)
+    if loan_costs.shape != (years,) + shape:
+        # Frais d'emprunt communs à tous les scénarios
+        loan_costs = np.broadcast_to(loan_costs.reshape((years,) + (1,) * len(shape)),
+                                     (years,) + shape)
+
+    # Loyer net de la vacance locative, revalorisé chaque année
+    rent = e["rent"] * (12 - e["vacancy_months"]) * (1 + e["rent_growth"]) ** (year - 1)
+    charges = e["property_charges"] + e["insurance"]
+    tmi = e["marginal_tax_rate"]
+    building = e["acquisition_price"] * (1 - LAND_SHARE)
+    works = e["works_cost"]
+    rent, loan_costs = np.broadcast_arrays(rent, loan_costs)
+
+    flows = {"rent": rent, "charges": charges, "loan_costs": loan_costs}
+    for name in FISCAL_FLOWS:
+        flows[name] = dict.fromkeys(REGIMES, 0.0)
+    tax, social, fees = flows["tax"], flows["social"], flows["fees"]
+
+    # Régime micro : abattement forfaitaire, pas de charges déductibles
+    taxable = rent * (1 - MICRO_ALLOWANCE)
+    tax["micro nu + meublé"] = taxable * tmi
+    social["micro nu + meublé"] = taxable * SOCIAL_CHARGES_RATE
+
+    # SCI IS : amortissement du bâti et des travaux, déficits reportables
+    depreciation = ((year <= BUILDING_DEPRECIATION_YEARS) * (building / BUILDING_DEPRECIATION_YEARS)
+                    + (year <= WORKS_DEPRECIATION_YEARS) * (works / WORKS_DEPRECIATION_YEARS))
+    result = rent - charges - loan_costs - depreciation
+    deficit = _carried_forward(result)
+    taxable = np.maximum(result - _previous(deficit) + deficit, 0.0)
+    company_tax = corporate_tax(taxable, np)
+    tax["SCI IS"] = company_tax
+    # PREL BONI : bénéfice après IS distribué et soumis au PFU
+    dividend = taxable - company_tax
+    tax["SCI IS PREL BONI"] = company_tax + dividend * DIVIDEND_TAX_RATE
+    social["SCI IS PREL BONI"] = dividend * SOCIAL_CHARGES_RATE
+
+    # SCI IR : revenus fonciers au réel, travaux déduits la première année
+    revenue = rent - charges - (year == 1) * works
+    net = revenue - loan_costs
+    positive = net >= 0
+    # Déficit hors intérêts imputable sur le revenu global (plafonné) ; le
+    # reste du déficit est reporté sur les revenus fonciers suivants
+    imputed = np.where(positive, 0.0,
+                       np.minimum(np.maximum(-revenue, 0.0), PROPERTY_DEFICIT_CAP))
+    carried = net + imputed
+    deficit = _carried_forward(carried)
+    taxable = np.maximum(carried - _previous(deficit) + deficit, 0.0)
+    tax["SCI IR"] = (taxable - imputed) * tmi
+    social["SCI IR"] = taxable * SOCIAL_CHARGES_RATE
+
+    # LMNP au réel, amortissement par composant
+    depreciation = np.broadcast_to(lmnp_depreciation(e, years), rent.shape)
+    flows["lmnp"] = {}
+    operating_costs = charges + loan_costs
+    account = None
+    for regime, cga in zip(LMNP_REGIMES, (e["cga"], True)):
+        # Adhésion CGA pour tous les scénarios : les deux comptes sont identiques
+        if account is None or not np.all(e["cga"]):
+            account = _lmnp_account(rent, operating_costs, depreciation, tmi, cga)
+        for name in FISCAL_FLOWS:
+            flows[name][regime] = account[name]
+        flows["lmnp"][regime] = {"depreciation": depreciation,
+                                 "deducted": account["deducted"],
+                                 "deferred": account["deferred"]}
+    return flows
+
+
+def simulate_years(e, financing, xp):
+    """
+    Simule chaque année couverte par `financing` (frais d'emprunt annuels).
+
+    Les entrées de `e` sont des flottants (xp = _ScalarMath) ou des
+    tableaux numpy de même longueur (xp = np). Retourne un dictionnaire de
+    listes (une valeur par année : flottant, ou tableau des scénarios) :
+    - "rent", "charges", "loan_costs" : loyers encaissés, charges (TF,
+      assurance) et frais d'emprunt, communs à tous les régimes ;
+    - "tax", "social", "fees" : {régime: liste} pour l'impôt (IR ou IS),
+      les prélèvements sociaux et les frais propres au régime ;
+    - "lmnp" : pour "LMNP" et "LMNP CGA", les dotations, amortissements
+      déduits et amortissements différés de chaque année.
+    """
+    flows = _simulate(e, financing)
+    years = len(financing)
+    # Une liste de flottants en scalaire, une ligne par année en lot
+    rows = list if xp is np else np.ndarray.tolist
+
+    def series(values):
+        if np.ndim(values) == 0:
+            # Valeur identique chaque année
+            return [values] * years
+        return rows(np.asarray(values))
+
+    result = {name: series(flows[name]) for name in ("rent", "charges", "loan_costs")}
+    for name in FISCAL_FLOWS:
+        result[name] = {regime: series(values) for regime, values in flows[name].items()}
+    result["lmnp"] = {regime: {name: series(values) for name, values in detail.items()}
+                      for regime, detail in flows["lmnp"].items()}
+    return result
+
+
+def annual_costs(flows, regime):
+    """Coût de chaque année pour un régime : charges, emprunt et fiscalité"""
+    return [held + loan_cost + tax + social + fees
+            for held, loan_cost, tax, social, fees in zip(
+                flows["charges"], flows["loan_costs"], flows["tax"][regime],
+                flows["social"][regime], flows["fees"][regime])]
+
+
+def _regime_costs(e, financing, years, xp, with_deducted=False):
+    """
+    Coût global de chaque régime cumulé sur `years` années de détention.
+    Avec `with_deducted`, retourne aussi les amortissements déduits sur la
+    durée de détention par régime de LMNP_REGIMES.
+    """
+    flows = _simulate(e, financing)
+    # Années comprises dans la durée de détention de chaque scénario
+    active = (np.arange(1, len(financing) + 1).reshape((-1,) + (1,) * np.ndim(years))
+              <= years).astype(float)
+
+    def held_total(values):
+        # Somme des valeurs annuelles sur la durée de détention
+        return np.einsum("y...,y...->...", active, np.broadcast_to(values, active.shape))
+
+    common = held_total(flows["charges"]) + held_total(flows["loan_costs"])
+    costs = []
+    for regime in REGIMES:
+        total = common
+        for name in FISCAL_FLOWS:
+            values = flows[name][regime]
+            # Flux nul (frais des régimes hors LMNP, prélèvements SCI IS)
+            if np.ndim(values) or values:
+                total = total + held_total(values)
+        costs.append(total if xp is np else float(total))
+    if with_deducted:
+        return costs, [held_total(flows["lmnp"][regime]["deducted"]) for regime in LMNP_REGIMES]
+    return costs
+
+
+def lmnp_schedule(values):
+    """
+    Détail année par année du LMNP au réel sur MAX_HORIZON années.
+
+    Retourne des tableaux (une valeur par année) : dotations, amortissements
+    déduits, amortissements différés reportés, fiscalité annuelle, et coût
+    global cumulé pour chaque durée de détention possible (1 à 40 ans).
+    """
+    e = normalize_inputs(values)
+    flows = simulate_years(e, financing_costs(e, MAX_HORIZON, values.get("loans")), _ScalarMath)
+    schedule = {name: np.array(series) for name, series in flows["lmnp"]["LMNP"].items()}
+    schedule["tax"] = (np.array(flows["tax"]["LMNP"]) + np.array(flows["social"]["LMNP"])
+                       + np.array(flows["fees"]["LMNP"]))
+    schedule["cumulative_cost"] = np.cumsum(annual_costs(flows, "LMNP"))
+    return schedule
+
+
+def compute_regime_costs(values):
+    """
+    Calcule le coût global de chaque régime sur la durée de détention.
+
+    Le coût global cumule les charges (TF, assurance), les frais d'emprunt
+    (intérêts, assurance emprunteur) et la fiscalité (impôt, prélèvements
+    sociaux, IS) de chaque année de détention. Une liste d'objets Loan
+    peut être passée sous la clé "loans" pour remplacer le prêt unique.
+    Retourne un dictionnaire {régime: coût global}.
+    """
+    e = normalize_inputs(values)
+    years = holding_years(e["detention_duration"])
+    financing = financing_costs(e, years, values.get("loans"))
+    return dict(zip(REGIMES, _regime_costs(e, financing, years, _ScalarMath)))
+
+
+def normalize_batch(columns):
+    """
+    Normalise des colonnes d'entrées en tableaux numpy de même longueur.
+
+    Chaque clé de INPUT_KEYS peut recevoir un scalaire (commun à tous les
+    scénarios) ou une séquence de valeurs ; les clés absentes valent 0.
+    """
+    arrays = []
+    for key in INPUT_KEYS:
+        value = columns.get(key)
+        if key in FLAG_INPUTS:
+            value = np.asarray(value if value is not None else False)
+            if value.dtype.kind in "USO":
+                value = np.char.upper(np.char.strip(value.astype(str))) == "OUI"
+            arrays.append(value.astype(bool))
+            continue
+        value = np.nan_to_num(np.asarray(value if value is not None else 0.0, dtype=float))
+        if key in PERCENT_INPUTS:
+            value = value / 100
+        arrays.append(value)
+    return dict(zip(INPUT_KEYS, np.broadcast_arrays(*arrays)))
+
+
+def records_to_columns(records):
+    """Convertit une liste de scénarios (dictionnaires) en colonnes"""
+    return {key: [record.get(key) for record in records] for key in INPUT_KEYS}
+
+
+def scenario_grid(base, axes):
+    """
+    Construit la grille (produit cartésien) des valeurs de `axes` autour
+    du scénario de référence `base`.
+
+    Exemple : scenario_grid(base, {"rent": [700, 800, 900],
+                                   "loan_duration": [15, 20, 25]})
+    """
+    names = list(axes)
+    mesh = np.meshgrid(*(np.asarray(axes[name]) for name in names), indexing="ij")
+    columns = dict(base)
+    columns.update({name: values.ravel() for name, values in zip(names, mesh)})
+    return columns
+
+
+def compute_batch(scenarios):
+    """
+    Calcule les coûts globaux d'un lot de scénarios en un appel vectorisé.
+
+    `scenarios` est soit un dictionnaire de colonnes (voir normalize_batch
+    et scenario_grid), soit une liste de dictionnaires d'entrées. Retourne
+    une matrice (scénarios x régimes) dans l'ordre de REGIMES.
+    """
+    if not isinstance(scenarios, dict):
+        scenarios = records_to_columns(scenarios)
+    return evaluate_batch(normalize_batch(scenarios))
+
+
+def evaluate_batch(e, with_deducted=False):
+    """
+    Coûts globaux (scénarios x régimes) de colonnes déjà normalisées. Avec
+    `with_deducted`, retourne aussi les amortissements LMNP déduits sur la
+    durée de détention (scénarios x LMNP_REGIMES), pour la plus-value.
+    """
+    shape = np.shape(e["detention_duration"])
+    size = int(np.prod(shape))
+    if size == 0:
+        costs = np.empty(shape + (len(REGIMES),))
+        return (costs, np.empty(shape + (len(LMNP_REGIMES),))) if with_deducted else costs
+    # Par blocs : les matrices (années x scénarios) d'un bloc restent
+    # petites, sans allocation de grands tableaux temporaires
+    columns = {key: np.reshape(value, size) for key, value in e.items()}
+    years = np.clip(np.rint(columns["detention_duration"]), 1, MAX_HORIZON).astype(int)
+    financing = batch_financing_costs(columns, int(years.max()))
+    costs = np.empty((size, len(REGIMES)))
+    deducted = np.empty((size, len(LMNP_REGIMES)))
+    for start in range(0, size, BATCH_BLOCK):
+        block = slice(start, start + BATCH_BLOCK)
+        result = _regime_costs({key: value[block] for key, value in columns.items()},
+                               [cost[block] for cost in financing], years[block], np,
+                               with_deducted)
+        if with_deducted:
+            result, held = result
+            deducted[block] = np.stack(held, axis=-1)
+        costs[block] = np.stack(result, axis=-1)
+    costs = costs.reshape(shape + (len(REGIMES),))
+    if with_deducted:
+        return costs, deducted.reshape(shape + (len(LMNP_REGIMES),))
+    return costs
+
+
+def optimal_regime(costs):
+    """Retourne le régime de coût minimal et son coût"""
+    regime = min(costs, key=costs.get)
+    return regime, costs[regime]
@@ -0,0 +1,1347 @@
+"""
+Compilateur des formules du classeur.
+
+Charge les formules du classeur (.xlsm) avec openpyxl, les analyse en
+arbres syntaxiques, puis construit un plan d'évaluation : les cellules
+calculées sont triées topologiquement et chaque formule devient une
+fermeture Python. Le plan permet d'évaluer web!B2:B5 à partir des entrées
+de feuil1 sans processus Excel. Les arbres sont mis en cache sur disque,
+indexés par l'empreinte du classeur, pour que le démarrage reste rapide.
+
+Les fonctions Excel sont fournies par une table : SCALAR_FUNCTIONS évalue
+un scénario, ARRAY_FUNCTIONS évalue un lot de scénarios d'un coup, chaque
+entrée étant liée à un tableau NumPy (WorkbookModel.evaluate_batch).
+"""
+
+import hashlib
+import math
+import os
+import pickle
+import re
+from decimal import ROUND_DOWN, ROUND_HALF_UP, ROUND_UP, Decimal
+from functools import reduce
+from pathlib import Path
+
+import numpy as np
+
+from fiscal_engine import INPUT_CELLS, REGIMES
+
+try:
+    from openpyxl import load_workbook
+    from openpyxl.formula.tokenizer import Token, Tokenizer
+    from openpyxl.utils.cell import get_column_letter, range_boundaries
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+INPUT_SHEET = "feuil1"
+# Coûts globaux de la feuille web, dans l'ordre des quatre premiers régimes
+WEB_OUTPUTS = ("web!B2", "web!B3", "web!B4", "web!B5")
+
+CACHE_DIR_NAME = ".formula_cache"
+CACHE_FORMAT = 1              # À incrémenter si la forme des arbres change
+
+_CELL = re.compile(r"^([A-Z]{1,3})(\d+)$")
+_AREA = re.compile(r"^[A-Z]{1,3}\d+:[A-Z]{1,3}\d+$")
+
+
+class FormulaError(ValueError):
+    """Formule ou fonction non prise en charge par le compilateur"""
+
+
+class CircularReferenceError(FormulaError):
+    """Références circulaires entre cellules calculées"""
+
+
+class ExcelError(Exception):
+    """Valeur d'erreur Excel (#DIV/0!, #VALUE!, #N/A...)"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+    def __repr__(self):
+        return self.code
+
+    def __eq__(self, other):
+        return isinstance(other, ExcelError) and other.code == self.code
+
+    def __hash__(self):
+        return hash(self.code)
+
+
+class CellRange:
+    """Valeurs d'une plage (lignes de cellules)"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def values(self):
+        return [value for row in self.rows for value in row]
+
+
+# === ANALYSE DES FORMULES ===
+#
+# Nœuds de l'arbre (tuples, pour rester sérialisables) :
+#   ("const", valeur)            ("ref", clé)
+#   ("range", lignes de clés)    ("unary", opérateur, opérande)
+#   ("binary", opérateur, gauche, droite)
+#   ("call", fonction, arguments)
+# Une clé de cellule est un couple (feuille en minuscules, "B2").
+
+# Puissances de liaison : comparaisons < & < + - < * / < ^ < négation < %
+BINARY_BINDING = {
+    "=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1,
+    "&": 3,
+    "+": 5, "-": 5,
+    "*": 7, "/": 7,
+    "^": 9,
+}
+PREFIX_BINDING = 11
+
+
+def cell_key(sheet, coordinate):
+    return sheet.lower(), coordinate.replace("$", "").upper()
+
+
+def parse_reference(text, sheet=INPUT_SHEET):
+    """Clé d'une référence "feuille!B2" (feuille par défaut sinon)"""
+    if "!" in text:
+        sheet, text = text.rsplit("!", 1)
+        sheet = sheet.strip("'").replace("''", "'")
+    return cell_key(sheet, text)
+
+
+def input_key(name):
+    """Clé d'une entrée : clé du moteur (INPUT_CELLS) ou référence"""
+    if name in INPUT_CELLS:
+        return cell_key(INPUT_SHEET, INPUT_CELLS[name])
+    return parse_reference(name)
+
+
+class _Parser:
+    def __init__(self, formula, sheet, names):
+        if not OPENPYXL_AVAILABLE:
+            raise FormulaError("openpyxl est requis pour analyser les formules")
+        self.tokens = [token for token in Tokenizer(formula).items
+                       if token.type != Token.WSPACE]
+        self.position = 0
+        self.sheet = sheet
+        self.names = names
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def advance(self):
+        token = self.peek()
+        if token is None:
+            raise FormulaError("Fin de formule inattendue")
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.expression(0)
+        if self.peek() is not None:
+            raise FormulaError(f"Élément inattendu : {self.peek().value}")
+        return node
+
+    def expression(self, min_binding):
+        left = self.prefix()
+        while True:
+            token = self.peek()
+            if token is None:
+                break
+            if token.type == Token.OP_POST:
+                self.advance()
+                left = ("unary", "%", left)
+                continue
+            if token.type != Token.OP_IN or token.value not in BINARY_BINDING:
+                if token.type == Token.OP_IN:
+                    raise FormulaError(f"Opérateur non pris en charge : {token.value}")
+                break
+            binding = BINARY_BINDING[token.value]
+            if binding < min_binding:
+                break
+            self.advance()
+            # Associativité à gauche
+            left = ("binary", token.value, left, self.expression(binding + 1))
+        return left
+
+    def prefix(self):
+        token = self.advance()
+        if token.type == Token.OP_PRE:
+            operand = self.expression(PREFIX_BINDING)
+            return operand if token.value == "+" else ("unary", "neg", operand)
+        if token.type == Token.OPERAND:
+            return self.operand(token)
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            node = self.expression(0)
+            closing = self.advance()
+            if closing.type != Token.PAREN:
+                raise FormulaError("Parenthèse fermante attendue")
+            return node
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            return self.call(token.value[:-1].upper())
+        raise FormulaError(f"Élément non pris en charge : {token.value}")
+
+    def call(self, name):
+        # Préfixes ajoutés par Excel aux fonctions récentes
+        name = name.replace("_XLFN.", "").replace("_XLWS.", "")
+        arguments = []
+        token = self.peek()
+        if token is not None and token.type == Token.FUNC and token.subtype == Token.CLOSE:
+            self.advance()
+            return ("call", name, tuple(arguments))
+        while True:
+            token = self.peek()
+            # Argument omis : IF(a;;c)
+            if token is not None and (token.type == Token.SEP
+                                      or (token.type == Token.FUNC and token.subtype == Token.CLOSE)):
+                arguments.append(("const", None))
+            else:
+                arguments.append(self.expression(0))
+            token = self.advance()
+            if token.type == Token.SEP and token.subtype == Token.ARG:
+                continue
+            if token.type == Token.FUNC and token.subtype == Token.CLOSE:
+                return ("call", name, tuple(arguments))
+            raise FormulaError(f"Séparateur attendu dans {name}")
+
+    def operand(self, token):
+        if token.subtype == Token.NUMBER:
+            return ("const", float(token.value))
+        if token.subtype == Token.TEXT:
+            return ("const", token.value[1:-1].replace('""', '"'))
+        if token.subtype == Token.LOGICAL:
+            return ("const", token.value.upper() == "TRUE")
+        if token.subtype == Token.ERROR:
+            return ("const", ExcelError(token.value))
+        return self.reference(token.value)
+
+    def reference(self, text, sheet=None):
+        sheet = sheet or self.sheet
+        if "!" in text:
+            sheet, text = text.rsplit("!", 1)
+            sheet = sheet.strip("'").replace("''", "'")
+        address = text.replace("$", "").upper()
+        if _CELL.match(address):
+            return ("ref", cell_key(sheet, address))
+        if _AREA.match(address):
+            min_col, min_row, max_col, max_row = range_boundaries(address)
+            return ("range", tuple(
+                tuple(cell_key(sheet, f"{get_column_letter(col)}{row}")
+                      for col in range(min_col, max_col + 1))
+                for row in range(min_row, max_row + 1)))
+        if text.upper() in self.names:
+            return self.reference(self.names[text.upper()], sheet)
+        raise FormulaError(f"Référence non prise en charge : {text}")
+
+
+def parse_formula(formula, sheet, names=None):
+    """Arbre syntaxique d'une formule ("=..." ) saisie dans `sheet`"""
+    return _Parser(formula, sheet, names or {}).parse()
+
+
+def dependencies(node, found=None):
+    """Clés des cellules lues par un arbre"""
+    found = set() if found is None else found
+    kind = node[0]
+    if kind == "ref":
+        found.add(node[1])
+    elif kind == "range":
+        found.update(key for row in node[1] for key in row)
+    elif kind == "unary":
+        dependencies(node[2], found)
+    elif kind == "binary":
+        dependencies(node[2], found)
+        dependencies(node[3], found)
+    elif kind == "call":
+        for argument in node[2]:
+            dependencies(argument, found)
+    return found
+
+
+def functions_used(node, found=None):
+    found = set() if found is None else found
+    if node[0] == "call":
+        found.add(node[1])
+        for argument in node[2]:
+            functions_used(argument, found)
+    elif node[0] == "unary":
+        functions_used(node[2], found)
+    elif node[0] == "binary":
+        functions_used(node[2], found)
+        functions_used(node[3], found)
+    return found
+
+
+# === SÉMANTIQUE SCALAIRE ===
+
+def to_number(value):
+    """Conversion d'une valeur de cellule pour un calcul (règles Excel)"""
+    if isinstance(value, ExcelError):
+        raise value
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.replace(",", ".")) if value.strip() else 0.0
+        except ValueError:
+            raise ExcelError("#VALUE!")
+    if isinstance(value, CellRange):
+        raise ExcelError("#VALUE!")
+    return float(value)
+
+
+def to_text(value):
+    if isinstance(value, ExcelError):
+        raise value
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def to_bool(value):
+    if isinstance(value, ExcelError):
+        raise value
+    if isinstance(value, str):
+        if value.upper() in ("TRUE", "FALSE"):
+            return value.upper() == "TRUE"
+        raise ExcelError("#VALUE!")
+    return bool(to_number(value))
+
+
+def _compare_key(value):
+    """Ordre Excel : nombres < texte < booléens, texte sans casse"""
+    if isinstance(value, ExcelError):
+        raise value
+    if value is None:
+        value = 0.0
+    if isinstance(value, bool):
+        return (2, value)
+    if isinstance(value, str):
+        return (1, value.lower())
+    return (0, value)
+
+
+def _comparison(test):
+    def compare(a, b):
+        # Cellule vide comparée à du texte : chaîne vide
+        if a is None and isinstance(b, str):
+            a = ""
+        if b is None and isinstance(a, str):
+            b = ""
+        return test(_compare_key(a), _compare_key(b))
+    return compare
+
+
+def _divide(a, b):
+    b = to_number(b)
+    if b == 0:
+        raise ExcelError("#DIV/0!")
+    return to_number(a) / b
+
+
+def _power(a, b):
+    result = to_number(a) ** to_number(b)
+    if isinstance(result, complex):
+        raise ExcelError("#NUM!")
+    return result
+
+
+def _arguments(arguments):
+    """Valeurs des arguments, plages aplaties (drapeau : issu d'une plage)"""
+    for argument in arguments:
+        if isinstance(argument, CellRange):
+            for value in argument.values():
+                yield value, True
+        else:
+            yield argument, False
+
+
+def _numbers(arguments):
+    """
+    Nombres retenus par SUM, MIN, MAX... : dans une plage, le texte, les
+    booléens et les cellules vides sont ignorés ; en argument direct, ils
+    sont convertis (cellule vide ignorée).
+    """
+    for value, from_range in _arguments(arguments):
+        if isinstance(value, ExcelError):
+            raise value
+        if value is None:
+            continue
+        if from_range:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield value
+        else:
+            yield to_number(value)
+
+
+def _sum(*arguments):
+    return float(sum(_numbers(arguments)))
+
+
+def _min(*arguments):
+    return min(_numbers(arguments), default=0.0)
+
+
+def _max(*arguments):
+    return max(_numbers(arguments), default=0.0)
+
+
+def _average(*arguments):
+    numbers = list(_numbers(arguments))
+    if not numbers:
+        raise ExcelError("#DIV/0!")
+    return sum(numbers) / len(numbers)
+
+
+def _count(*arguments):
+    return float(sum(1 for value, _ in _arguments(arguments)
+                     if isinstance(value, (int, float)) and not isinstance(value, bool)))
+
+
+def _counta(*arguments):
+    return float(sum(1 for value, _ in _arguments(arguments) if value not in (None, "")))
+
+
+def _product(*arguments):
+    return float(math.prod(_numbers(arguments)))
+
+
+def _round_with(rounding):
+    def round_value(value, digits=0.0):
+        exponent = Decimal(1).scaleb(-int(to_number(digits)))
+        # repr donne la plus courte écriture décimale, comme l'affichage Excel
+        return float(Decimal(repr(float(to_number(value)))).quantize(exponent, rounding=rounding))
+    return round_value
+
+
+def _int(value):
+    return float(math.floor(to_number(value)))
+
+
+def _mod(a, b):
+    b = to_number(b)
+    if b == 0:
+        raise ExcelError("#DIV/0!")
+    return to_number(a) - b * math.floor(to_number(a) / b)
+
+
+def _sqrt(value):
+    value = to_number(value)
+    if value < 0:
+        raise ExcelError("#NUM!")
+    return math.sqrt(value)
+
+
+def _ln(value):
+    value = to_number(value)
+    if value <= 0:
+        raise ExcelError("#NUM!")
+    return math.log(value)
+
+
+def _sign(value):
+    value = to_number(value)
+    return float((value > 0) - (value < 0))
+
+
+def _and(*arguments):
+    values = [to_bool(value) for value, _ in _arguments(arguments) if value is not None]
+    if not values:
+        raise ExcelError("#VALUE!")
+    return all(values)
+
+
+def _or(*arguments):
+    values = [to_bool(value) for value, _ in _arguments(arguments) if value is not None]
+    if not values:
+        raise ExcelError("#VALUE!")
+    return any(values)
+
+
+def _not(value):
+    return not to_bool(value)
+
+
+def _constant_false(env):
+    return False
+
+
+def _if(env, condition, if_true, if_false=_constant_false):
+    """IF paresseux : seule la branche retenue est évaluée"""
+    return if_true(env) if to_bool(condition(env)) else if_false(env)
+
+
+def _iferror(env, value, fallback):
+    try:
+        result = value(env)
+    except (ExcelError, ArithmeticError, ValueError, TypeError):
+        return fallback(env)
+    return fallback(env) if isinstance(result, ExcelError) else result
+
+
+def _is_error(env, value):
+    try:
+        return isinstance(value(env), ExcelError)
+    except (ExcelError, ArithmeticError, ValueError, TypeError):
+        return True
+
+
+def _pmt(rate, periods, present, future=0.0, kind=0.0):
+    rate, periods = to_number(rate), to_number(periods)
+    present, future, kind = to_number(present), to_number(future), to_number(kind)
+    if periods == 0:
+        raise ExcelError("#NUM!")
+    if rate == 0:
+        return -(present + future) / periods
+    growth = (1 + rate) ** periods
+    return -(rate * (future + present * growth)) / ((1 + rate * kind) * (growth - 1))
+
+
+def _fv(rate, periods, payment, present=0.0, kind=0.0):
+    rate, periods = to_number(rate), to_number(periods)
+    payment, present, kind = to_number(payment), to_number(present), to_number(kind)
+    if rate == 0:
+        return -(present + payment * periods)
+    growth = (1 + rate) ** periods
+    return -(present * growth + payment * (1 + rate * kind) * (growth - 1) / rate)
+
+
+def _pv(rate, periods, payment, future=0.0, kind=0.0):
+    rate, periods = to_number(rate), to_number(periods)
+    payment, future, kind = to_number(payment), to_number(future), to_number(kind)
+    if rate == 0:
+        return -(future + payment * periods)
+    growth = (1 + rate) ** periods
+    return -(future + payment * (1 + rate * kind) * (growth - 1) / rate) / growth
+
+
+def _ipmt(rate, period, periods, present, future=0.0, kind=0.0):
+    rate, period, kind = to_number(rate), to_number(period), to_number(kind)
+    if period < 1 or period > to_number(periods):
+        raise ExcelError("#NUM!")
+    payment = _pmt(rate, periods, present, future, kind)
+    if kind == 1:
+        if period == 1:
+            return 0.0
+        return (_fv(rate, period - 2, payment, present, 1) - payment) * rate
+    return _fv(rate, period - 1, payment, present, 0) * rate
+
+
+def _ppmt(rate, period, periods, present, future=0.0, kind=0.0):
+    return (_pmt(rate, periods, present, future, kind)
+            - _ipmt(rate, period, periods, present, future, kind))
+
+
+def _cumipmt(rate, periods, present, start, end, kind):
+    start, end = int(to_number(start)), int(to_number(end))
+    if start < 1 or end < start or to_number(present) <= 0:
+        raise ExcelError("#NUM!")
+    return sum(_ipmt(rate, period, periods, present, 0.0, kind)
+               for period in range(start, end + 1))
+
+
+def _cumprinc(rate, periods, present, start, end, kind):
+    start, end = int(to_number(start)), int(to_number(end))
+    if start < 1 or end < start or to_number(present) <= 0:
+        raise ExcelError("#NUM!")
+    return sum(_ppmt(rate, period, periods, present, 0.0, kind)
+               for period in range(start, end + 1))
+
+
+def _rows(value):
+    return value.rows if isinstance(value, CellRange) else [[value]]
+
+
+def _index(area, row, column=None):
+    rows = _rows(area)
+    row = int(to_number(row))
+    column = int(to_number(column)) if column is not None else 1
+    # INDEX(plage ligne; n) : n désigne la colonne
+    if len(rows) == 1 and column == 1 and row > 1:
+        row, column = 1, row
+    try:
+        if row == 0 or column == 0:
+            raise IndexError
+        return rows[row - 1][column - 1]
+    except IndexError:
+        raise ExcelError("#REF!")
+
+
+def _match_position(value, candidates, match_type):
+    key = _compare_key(value)
+    if match_type == 0:
+        for position, candidate in enumerate(candidates, start=1):
+            if candidate is not None and _compare_key(candidate) == key:
+                return position
+        raise ExcelError("#N/A")
+    # Recherche approchée dans une liste triée (croissante ou décroissante)
+    found = None
+    for position, candidate in enumerate(candidates, start=1):
+        if candidate is None:
+            continue
+        candidate_key = _compare_key(candidate)
+        if (candidate_key <= key) if match_type > 0 else (candidate_key >= key):
+            found = position
+        else:
+            break
+    if found is None:
+        raise ExcelError("#N/A")
+    return found
+
+
+def _match(value, area, match_type=1.0):
+    rows = _rows(area)
+    candidates = rows[0] if len(rows) == 1 else [row[0] for row in rows]
+    return float(_match_position(value, candidates, to_number(match_type)))
+
+
+def _vlookup(value, area, column, approximate=True):
+    rows = _rows(area)
+    position = _match_position(value, [row[0] for row in rows],
+                               1 if to_bool(approximate) else 0)
+    try:
+        return rows[position - 1][int(to_number(column)) - 1]
+    except IndexError:
+        raise ExcelError("#REF!")
+
+
+def _hlookup(value, area, row, approximate=True):
+    rows = _rows(area)
+    position = _match_position(value, rows[0], 1 if to_bool(approximate) else 0)
+    try:
+        return rows[int(to_number(row)) - 1][position - 1]
+    except IndexError:
+        raise ExcelError("#REF!")
+
+
+def _choose(index, *options):
+    index = int(to_number(index))
+    if not 1 <= index <= len(options):
+        raise ExcelError("#VALUE!")
+    return options[index - 1]
+
+
+def _criterion(criterion):
+    """Prédicat d'un critère SUMIF/COUNTIF (">=10", "<>x", "x", 10)"""
+    if isinstance(criterion, str):
+        for operator in ("<=", ">=", "<>", "<", ">", "="):
+            if criterion.startswith(operator):
+                operand = criterion[len(operator):]
+                try:
+                    operand = float(operand.replace(",", "."))
+                except ValueError:
+                    pass
+                return lambda value: OPERATORS[operator](value, operand)
+    return lambda value: value is not None and OPERATORS["="](value, criterion)
+
+
+def _sumif(area, criterion, sum_area=None):
+    test = _criterion(criterion)
+    values = _rows(sum_area if sum_area is not None else area)
+    flat_values = [value for row in values for value in row]
+    total = 0.0
+    for value, summed in zip((value for row in _rows(area) for value in row), flat_values):
+        if test(value) and isinstance(summed, (int, float)) and not isinstance(summed, bool):
+            total += summed
+    return total
+
+
+def _countif(area, criterion):
+    test = _criterion(criterion)
+    return float(sum(1 for row in _rows(area) for value in row if test(value)))
+
+
+def _sumproduct(*areas):
+    columns = [[value for row in _rows(area) for value in row] for area in areas]
+    if len({len(column) for column in columns}) > 1:
+        raise ExcelError("#VALUE!")
+    total = 0.0
+    for values in zip(*columns):
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            total += math.prod(values)
+    return total
+
+
+OPERATORS = {
+    "+": lambda a, b: to_number(a) + to_number(b),
+    "-": lambda a, b: to_number(a) - to_number(b),
+    "*": lambda a, b: to_number(a) * to_number(b),
+    "/": _divide,
+    "^": _power,
+    "&": lambda a, b: to_text(a) + to_text(b),
+    "=": _comparison(lambda a, b: a == b),
+    "<>": _comparison(lambda a, b: a != b),
+    "<": _comparison(lambda a, b: a < b),
+    ">": _comparison(lambda a, b: a > b),
+    "<=": _comparison(lambda a, b: a <= b),
+    ">=": _comparison(lambda a, b: a >= b),
+    "neg": lambda a: -to_number(a),
+    "%": lambda a: to_number(a) / 100,
+}
+
+# Fonctions dont les arguments sont passés non évalués (fermetures)
+LAZY_FUNCTIONS = {"IF", "IFERROR", "ISERROR"}
+
+SCALAR_FUNCTIONS = dict(OPERATORS, **{
+    "SUM": _sum, "MIN": _min, "MAX": _max, "AVERAGE": _average,
+    "COUNT": _count, "COUNTA": _counta, "PRODUCT": _product,
+    "SUMPRODUCT": _sumproduct, "SUMIF": _sumif, "COUNTIF": _countif,
+    "ABS": lambda value: abs(to_number(value)),
+    "ROUND": _round_with(ROUND_HALF_UP),
+    "ROUNDUP": _round_with(ROUND_UP),
+    "ROUNDDOWN": _round_with(ROUND_DOWN),
+    "INT": _int, "MOD": _mod, "SQRT": _sqrt, "LN": _ln, "SIGN": _sign,
+    "POWER": _power,
+    "EXP": lambda value: math.exp(to_number(value)),
+    "IF": _if, "IFERROR": _iferror,
+    "AND": _and, "OR": _or, "NOT": _not,
+    "TRUE": lambda: True, "FALSE": lambda: False,
+    "ISERROR": _is_error,
+    "ISBLANK": lambda value: value is None,
+    "ISNUMBER": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "ISTEXT": lambda value: isinstance(value, str),
+    "NA": lambda: ExcelError("#N/A"),
+    "PMT": _pmt, "IPMT": _ipmt, "PPMT": _ppmt, "FV": _fv, "PV": _pv,
+    "CUMIPMT": _cumipmt, "CUMPRINC": _cumprinc,
+    "INDEX": _index, "MATCH": _match, "VLOOKUP": _vlookup, "HLOOKUP": _hlookup,
+    "CHOOSE": _choose,
+    "CONCATENATE": lambda *values: "".join(to_text(value) for value in values),
+    "UPPER": lambda value: to_text(value).upper(),
+    "LOWER": lambda value: to_text(value).lower(),
+    "TRIM": lambda value: " ".join(to_text(value).split()),
+    "LEN": lambda value: float(len(to_text(value))),
+})
+
+
+# === SÉMANTIQUE VECTORIELLE ===
+#
+# Chaque cellule d'entrée peut être liée à un tableau de N scénarios : une
+# formule est alors évaluée une seule fois pour tout le lot. Les erreurs
+# Excel par scénario deviennent NaN. Les fonctions sans équivalent
+# vectoriel (texte, recherches) sont appliquées scénario par scénario avec
+# la sémantique scalaire.
+
+def _is_array(value):
+    if isinstance(value, CellRange):
+        return any(isinstance(item, np.ndarray) for item in value.values())
+    return isinstance(value, np.ndarray)
+
+
+def _is_text(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in "USO"
+    return isinstance(value, str)
+
+
+def _is_plain_text(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in "US"
+    return isinstance(value, str)
+
+
+def _is_logical(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind == "b"
+    return isinstance(value, (bool, np.bool_))
+
+
+def _element(value, index):
+    if isinstance(value, np.ndarray):
+        flat = value.reshape(-1)
+        item = flat[index] if flat.size > 1 else flat[0]
+        return item.item() if isinstance(item, np.generic) else item
+    if isinstance(value, CellRange):
+        return CellRange([[_element(item, index) for item in row] for row in value.rows])
+    return value
+
+
+def _batch_size(arguments):
+    sizes = [item.size for argument in arguments
+             for item in (argument.values() if isinstance(argument, CellRange) else [argument])
+             if isinstance(item, np.ndarray)]
+    return max(sizes, default=1)
+
+
+def _as_array(results):
+    if all(isinstance(result, bool) for result in results):
+        return np.array(results, dtype=bool)
+    try:
+        return np.array(results, dtype=float)
+    except (TypeError, ValueError):
+        return np.array(results, dtype=object)
+
+
+def _elementwise(function, arguments):
+    """Applique une fonction scalaire scénario par scénario"""
+    results = []
+    for index in range(_batch_size(arguments)):
+        try:
+            result = function(*[_element(argument, index) for argument in arguments])
+        except (ExcelError, ArithmeticError, ValueError, TypeError):
+            result = np.nan
+        results.append(np.nan if isinstance(result, (ExcelError, CellRange)) else result)
+    return _as_array(results)
+
+
+def _number(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind in "fiub":
+            return value.astype(float)
+        return _elementwise(to_number, (value,))
+    return to_number(value)
+
+
+def _truth(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "b":
+            return value
+        if value.dtype.kind in "fiu":
+            return value != 0
+        return _elementwise(to_bool, (value,)).astype(bool)
+    return to_bool(value)
+
+
+def _cell_value(value):
+    """Valeur d'une branche pour np.where (erreur -> NaN, vide -> 0)"""
+    if isinstance(value, ExcelError):
+        return np.nan
+    return 0.0 if value is None else value
+
+
+def _where(test, if_true, if_false):
+    if_true, if_false = _cell_value(if_true), _cell_value(if_false)
+    if _is_text(if_true) != _is_text(if_false):
+        if_true = np.asarray(if_true, dtype=object)
+        if_false = np.asarray(if_false, dtype=object)
+    return np.where(test, if_true, if_false)
+
+
+def _vectorized(scalar, numeric=None, exact=_is_text):
+    """
+    Fonction de la table vectorielle : version scalaire si aucun argument
+    n'est un tableau, version NumPy `numeric` si aucun argument ne relève
+    de `exact` (texte par défaut), application scénario par scénario sinon.
+    """
+    def function(*arguments):
+        if not any(_is_array(argument) for argument in arguments):
+            return scalar(*arguments)
+        if numeric is not None and not any(exact(argument) for argument in arguments):
+            return numeric(*arguments)
+        return _elementwise(scalar, arguments)
+    return function
+
+
+def _numeric(function):
+    """Version NumPy d'une fonction numérique (arguments convertis)"""
+    def numeric(*arguments):
+        return function(*[_number(argument) for argument in arguments])
+    return numeric
+
+
+def _lower(values):
+    """Texte en minuscules ; les saisies n'ont que quelques valeurs distinctes"""
+    values = np.asarray(values, dtype=str)
+    if values.ndim == 0:
+        return np.char.lower(values)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    return np.char.lower(distinct)[inverse.reshape(values.shape)]
+
+
+def _array_comparison(test):
+    scalar = _comparison(test)
+
+    def compare(a, b):
+        if not (_is_array(a) or _is_array(b)):
+            return scalar(a, b)
+        if _is_plain_text(a) and _is_plain_text(b):
+            # Comparaison de texte sans casse
+            return test(_lower(a), _lower(b))
+        if not any(_is_text(value) or _is_logical(value) for value in (a, b)):
+            return test(_number(a), _number(b))
+        return _elementwise(scalar, (a, b))
+    return compare
+
+
+def _array_divide(a, b):
+    return np.where(b == 0, np.nan, a / np.where(b == 0, 1.0, b))
+
+
+def _array_mod(a, b):
+    safe = np.where(b == 0, 1.0, b)
+    return np.where(b == 0, np.nan, a - safe * np.floor(a / safe))
+
+
+def _array_round(method):
+    def round_value(value, digits=0.0):
+        scale = 10.0 ** np.trunc(digits)
+        # Arrondi intermédiaire : 2,675 * 100 vaut 267,49999999999997
+        scaled = np.round(np.abs(value) * scale, 6)
+        return np.sign(value) * method(scaled) / scale
+    return round_value
+
+
+def _array_numbers(arguments):
+    """Équivalent vectoriel de _numbers : termes retenus par SUM, MIN..."""
+    for value, from_range in _arguments(arguments):
+        if isinstance(value, ExcelError):
+            raise value
+        if value is None:
+            continue
+        if from_range:
+            if isinstance(value, np.ndarray):
+                if value.dtype.kind in "fiu":
+                    yield value.astype(float)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield value
+        else:
+            yield _number(value)
+
+
+def _aggregate(scalar, combine, empty=0.0):
+    def aggregate(*arguments):
+        if not any(_is_array(argument) for argument in arguments):
+            return scalar(*arguments)
+        numbers = list(_array_numbers(arguments))
+        return reduce(combine, numbers) if numbers else empty
+    return aggregate
+
+
+def _array_average(*arguments):
+    if not any(_is_array(argument) for argument in arguments):
+        return _average(*arguments)
+    numbers = list(_array_numbers(arguments))
+    if not numbers:
+        raise ExcelError("#DIV/0!")
+    return reduce(np.add, numbers) / len(numbers)
+
+
+def _array_logical(scalar, combine):
+    def logical(*arguments):
+        if not any(_is_array(argument) for argument in arguments):
+            return scalar(*arguments)
+        values = [_truth(value) for value, _ in _arguments(arguments) if value is not None]
+        if not values:
+            raise ExcelError("#VALUE!")
+        return reduce(combine, values)
+    return logical
+
+
+def _array_if(env, condition, if_true, if_false=_constant_false):
+    test = condition(env)
+    if not _is_array(test):
+        return if_true(env) if to_bool(test) else if_false(env)
+    # Les deux branches sont évaluées pour tout le lot
+    return _where(_truth(test), if_true(env), if_false(env))
+
+
+def _array_iferror(env, value, fallback):
+    try:
+        result = value(env)
+    except (ExcelError, ArithmeticError, ValueError, TypeError):
+        return fallback(env)
+    if isinstance(result, ExcelError):
+        return fallback(env)
+    if isinstance(result, np.ndarray) and result.dtype.kind == "f":
+        failed = ~np.isfinite(result)
+        if failed.any():
+            return _where(failed, fallback(env), result)
+    return result
+
+
+def _array_is_error(env, value):
+    try:
+        value = value(env)
+    except (ExcelError, ArithmeticError, ValueError, TypeError):
+        return True
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f":
+            return ~np.isfinite(value)
+        return _elementwise(lambda item: isinstance(item, float) and not math.isfinite(item), (value,))
+    return isinstance(value, ExcelError)
+
+
+def _array_pmt(rate, periods, present, future=0.0, kind=0.0):
+    growth = (1 + rate) ** periods
+    safe = np.where(rate == 0, 1.0, rate)
+    return np.where(rate == 0, -(present + future) / periods,
+                    -(safe * (future + present * growth)) / ((1 + safe * kind) * (growth - 1)))
+
+
+def _array_fv(rate, periods, payment, present=0.0, kind=0.0):
+    growth = (1 + rate) ** periods
+    safe = np.where(rate == 0, 1.0, rate)
+    return np.where(rate == 0, -(present + payment * periods),
+                    -(present * growth + payment * (1 + safe * kind) * (growth - 1) / safe))
+
+
+def _array_pv(rate, periods, payment, future=0.0, kind=0.0):
+    growth = (1 + rate) ** periods
+    safe = np.where(rate == 0, 1.0, rate)
+    return np.where(rate == 0, -(future + payment * periods),
+                    -(future + payment * (1 + safe * kind) * (growth - 1) / safe) / growth)
+
+
+def _array_ipmt(rate, period, periods, present, future=0.0, kind=0.0):
+    payment = _array_pmt(rate, periods, present, future, kind)
+    begin = np.where(period == 1, 0.0,
+                     (_array_fv(rate, period - 2, payment, present, 1.0) - payment) * rate)
+    end = _array_fv(rate, period - 1, payment, present, 0.0) * rate
+    valid = (period >= 1) & (period <= periods)
+    return np.where(valid, np.where(kind == 1, begin, end), np.nan)
+
+
+def _array_ppmt(rate, period, periods, present, future=0.0, kind=0.0):
+    return (_array_pmt(rate, periods, present, future, kind)
+            - _array_ipmt(rate, period, periods, present, future, kind))
+
+
+def _array_cumulative(scalar, periodic):
+    """CUMIPMT/CUMPRINC : vectoriel lorsque les bornes sont communes au lot"""
+    def cumulative(rate, periods, present, start, end, kind):
+        if _is_array(start) or _is_array(end):
+            return _elementwise(scalar, (rate, periods, present, start, end, kind))
+        start, end = int(to_number(start)), int(to_number(end))
+        rate, periods, present, kind = (_number(value) for value in (rate, periods, present, kind))
+        if start < 1 or end < start:
+            raise ExcelError("#NUM!")
+        total = sum(periodic(rate, float(period), periods, present, 0.0, kind)
+                    for period in range(start, end + 1))
+        return np.where(present > 0, total, np.nan)
+    return cumulative
+
+
+ARRAY_FUNCTIONS = dict(SCALAR_FUNCTIONS, **{
+    "+": _vectorized(OPERATORS["+"], _numeric(np.add)),
+    "-": _vectorized(OPERATORS["-"], _numeric(np.subtract)),
+    "*": _vectorized(OPERATORS["*"], _numeric(np.multiply)),
+    "/": _vectorized(_divide, _numeric(_array_divide)),
+    "^": _vectorized(_power, _numeric(np.power)),
+    "&": _vectorized(OPERATORS["&"]),
+    "=": _array_comparison(lambda a, b: a == b),
+    "<>": _array_comparison(lambda a, b: a != b),
+    "<": _array_comparison(lambda a, b: a < b),
+    ">": _array_comparison(lambda a, b: a > b),
+    "<=": _array_comparison(lambda a, b: a <= b),
+    ">=": _array_comparison(lambda a, b: a >= b),
+    "neg": _vectorized(OPERATORS["neg"], _numeric(np.negative)),
+    "%": _vectorized(OPERATORS["%"], _numeric(lambda value: value / 100)),
+    "SUM": _aggregate(_sum, np.add),
+    "MIN": _aggregate(_min, np.minimum),
+    "MAX": _aggregate(_max, np.maximum),
+    "PRODUCT": _aggregate(_product, np.multiply, 1.0),
+    "AVERAGE": _array_average,
+    "ABS": _vectorized(SCALAR_FUNCTIONS["ABS"], _numeric(np.abs)),
+    "ROUND": _vectorized(SCALAR_FUNCTIONS["ROUND"], _numeric(_array_round(lambda x: np.floor(x + 0.5)))),
+    "ROUNDUP": _vectorized(SCALAR_FUNCTIONS["ROUNDUP"], _numeric(_array_round(np.ceil))),
+    "ROUNDDOWN": _vectorized(SCALAR_FUNCTIONS["ROUNDDOWN"], _numeric(_array_round(np.floor))),
+    "INT": _vectorized(_int, _numeric(np.floor)),
+    "MOD": _vectorized(_mod, _numeric(_array_mod)),
+    "SQRT": _vectorized(_sqrt, _numeric(lambda value: np.where(value >= 0, np.sqrt(np.abs(value)), np.nan))),
+    "LN": _vectorized(_ln, _numeric(lambda value: np.where(value > 0, np.log(np.where(value > 0, value, 1.0)), np.nan))),
+    "SIGN": _vectorized(_sign, _numeric(np.sign)),
+    "POWER": _vectorized(_power, _numeric(np.power)),
+    "EXP": _vectorized(SCALAR_FUNCTIONS["EXP"], _numeric(np.exp)),
+    "IF": _array_if, "IFERROR": _array_iferror,
+    "AND": _array_logical(_and, np.logical_and),
+    "OR": _array_logical(_or, np.logical_or),
+    "NOT": _vectorized(_not, lambda value: ~_truth(value), exact=lambda value: False),
+    "ISERROR": _array_is_error,
+    "ISNUMBER": _vectorized(SCALAR_FUNCTIONS["ISNUMBER"],
+                            lambda value: np.full(value.shape, value.dtype.kind in "fiu")),
+    "PMT": _vectorized(_pmt, _numeric(_array_pmt)),
+    "IPMT": _vectorized(_ipmt, _numeric(_array_ipmt)),
+    "PPMT": _vectorized(_ppmt, _numeric(_array_ppmt)),
+    "FV": _vectorized(_fv, _numeric(_array_fv)),
+    "PV": _vectorized(_pv, _numeric(_array_pv)),
+    "CUMIPMT": _array_cumulative(_cumipmt, _array_ipmt),
+    "CUMPRINC": _array_cumulative(_cumprinc, _array_ppmt),
+})
+# Fonctions restantes (texte, recherches, SUMIF...) : scénario par scénario
+for _name, _function in SCALAR_FUNCTIONS.items():
+    if ARRAY_FUNCTIONS[_name] is _function and _name not in LAZY_FUNCTIONS:
+        ARRAY_FUNCTIONS[_name] = _vectorized(_function)
+
+
+# === COMPILATION ===
+
+def compile_node(node, functions=SCALAR_FUNCTIONS):
+    """Fermeture env -> valeur équivalente à l'arbre `node`"""
+    kind = node[0]
+    if kind == "const":
+        value = node[1]
+        return lambda env: value
+    if kind == "ref":
+        key = node[1]
+        return lambda env: env.get(key)
+    if kind == "range":
+        rows = node[1]
+        return lambda env: CellRange([[env.get(key) for key in row] for row in rows])
+    if kind == "unary":
+        operator, operand = functions[node[1]], compile_node(node[2], functions)
+        return lambda env: operator(operand(env))
+    if kind == "binary":
+        operator = functions[node[1]]
+        left, right = compile_node(node[2], functions), compile_node(node[3], functions)
+        return lambda env: operator(left(env), right(env))
+
+    name = node[1]
+    if name not in functions:
+        raise FormulaError(f"Fonction non prise en charge : {name}")
+    function = functions[name]
+    arguments = [compile_node(argument, functions) for argument in node[2]]
+    if name in LAZY_FUNCTIONS:
+        return lambda env: function(env, *arguments)
+    if len(arguments) == 1:
+        argument = arguments[0]
+        return lambda env: function(argument(env))
+    if len(arguments) == 2:
+        first, second = arguments
+        return lambda env: function(first(env), second(env))
+    return lambda env: function(*[argument(env) for argument in arguments])
+
+
+def _raise_name_error(env):
+    raise ExcelError("#NAME?")
+
+
+def topological_order(formulas):
+    """Cellules calculées triées pour que chacune suive ses dépendances"""
+    pending = {key: dependencies(node) & formulas.keys() for key, node in formulas.items()}
+    dependents = {}
+    for key, needed in pending.items():
+        for dependency in needed:
+            dependents.setdefault(dependency, []).append(key)
+    ready = sorted(key for key, needed in pending.items() if not needed)
+    order = []
+    while ready:
+        key = ready.pop()
+        order.append(key)
+        for dependent in dependents.get(key, ()):
+            needed = pending[dependent]
+            needed.discard(key)
+            if not needed:
+                ready.append(dependent)
+    if len(order) != len(formulas):
+        cycle = sorted(key for key, needed in pending.items() if needed)
+        raise CircularReferenceError(
+            "Références circulaires : " + ", ".join(f"{sheet}!{cell}" for sheet, cell in cycle[:10]))
+    return order
+
+
+class WorkbookModel:
+    """
+    Plan d'évaluation d'un classeur : constantes, arbres des formules et
+    ordre topologique. `functions` choisit la sémantique des opérateurs et
+    fonctions (SCALAR_FUNCTIONS par défaut).
+    """
+
+    def __init__(self, constants, formulas, errors=None, functions=SCALAR_FUNCTIONS):
+        self.constants = constants          # clé -> valeur saisie
+        self.formulas = formulas            # clé -> arbre
+        self.errors = dict(errors or {})    # clé -> formule non analysable
+        self.order = topological_order(formulas)
+        self.functions = functions
+        self.unsupported = set()
+        self._closures = {}
+        for key, node in formulas.items():
+            try:
+                self._closures[key] = compile_node(node, functions)
+            except FormulaError:
+                self.unsupported |= functions_used(node) - functions.keys()
+                self._closures[key] = _raise_name_error
+        for key in self.errors:
+            self._closures[key] = _raise_name_error
+        self._plans = {}
+        self._array_model = None
+
+    @classmethod
+    def load(cls, path, sheets=None, cache_dir=None, functions=SCALAR_FUNCTIONS):
+        """
+        Charge le classeur `path` (toutes les feuilles par défaut). Les
+        arbres sont relus depuis le cache disque lorsque l'empreinte du
+        classeur n'a pas changé.
+        """
+        path = Path(path)
+        cache_file = _cache_file(path, sheets, cache_dir)
+        if cache_file.exists():
+            try:
+                with open(cache_file, "rb") as handle:
+                    cached = pickle.load(handle)
+                return cls(cached["constants"], cached["formulas"], cached["errors"], functions)
+            except Exception as e:
+                print(f"Cache des formules illisible, recompilation : {str(e)}")
+
+        constants, formulas, errors = read_workbook(path, sheets)
+        model = cls(constants, formulas, errors, functions)
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temporary = cache_file.with_suffix(".tmp")
+            with open(temporary, "wb") as handle:
+                pickle.dump({"constants": constants, "formulas": formulas, "errors": errors},
+                            handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, cache_file)
+        except OSError as e:
+            print(f"Impossible d'écrire le cache des formules : {str(e)}")
+        return model
+
+    def with_functions(self, functions):
+        """Même plan, évalué avec une autre table de fonctions"""
+        return type(self)(self.constants, self.formulas, self.errors, functions)
+
+    def plan(self, outputs):
+        """Cellules calculées nécessaires à `outputs`, dans l'ordre d'évaluation"""
+        outputs = tuple(outputs)
+        if outputs not in self._plans:
+            needed, stack = set(), list(outputs)
+            while stack:
+                key = stack.pop()
+                if key in needed or key not in self.formulas:
+                    continue
+                needed.add(key)
+                stack.extend(dependencies(self.formulas[key]))
+            self._plans[outputs] = [(key, self._closures[key])
+                                    for key in self.order if key in needed]
+        return self._plans[outputs]
+
+    def environment(self, inputs):
+        """
+        Valeurs de départ : constantes du classeur remplacées par `inputs`,
+        indexé par clé du moteur (INPUT_CELLS) ou référence "feuille!B2".
+        """
+        env = dict(self.constants)
+        for name, value in inputs.items():
+            env[input_key(name)] = value
+        return env
+
+    def run(self, env, outputs, fixed=()):
+        """
+        Évalue le plan de `outputs` dans `env` (modifié sur place). Les
+        cellules de `fixed` gardent leur valeur même si elles contiennent
+        une formule (entrée forcée).
+        """
+        for key, closure in self.plan(outputs):
+            if key in fixed:
+                continue
+            try:
+                env[key] = closure(env)
+            except ExcelError as e:
+                env[key] = e
+            except ZeroDivisionError:
+                env[key] = ExcelError("#DIV/0!")
+            except (ArithmeticError, ValueError, TypeError):
+                env[key] = ExcelError("#VALUE!")
+        return env
+
+    def evaluate(self, inputs, outputs=WEB_OUTPUTS):
+        """Valeurs des cellules `outputs` ("feuille!B2") pour ces entrées"""
+        keys = tuple(parse_reference(output) for output in outputs)
+        fixed = {input_key(name) for name in inputs}
+        env = self.run(self.environment(inputs), keys, fixed)
+        return {output: env.get(key) for output, key in zip(outputs, keys)}
+
+    def evaluate_batch(self, inputs, outputs=WEB_OUTPUTS):
+        """
+        Évalue un lot de scénarios en une passe : chaque entrée peut être
+        liée à un tableau de N valeurs (les scalaires sont communs au lot).
+        Retourne {sortie: tableau de N valeurs}, NaN pour les erreurs Excel.
+        """
+        if self.functions is not ARRAY_FUNCTIONS:
+            if self._array_model is None:
+                self._array_model = self.with_functions(ARRAY_FUNCTIONS)
+            return self._array_model.evaluate_batch(inputs, outputs)
+
+        columns = {name: np.asarray(values) if isinstance(values, (list, tuple, np.ndarray)) else values
+                   for name, values in inputs.items()}
+        size = _batch_size(list(columns.values()))
+        keys = tuple(parse_reference(output) for output in outputs)
+        with np.errstate(all="ignore"):
+            env = self.run(self.environment(columns), keys, {input_key(name) for name in columns})
+        return {output: _column(env.get(key), size) for output, key in zip(outputs, keys)}
+
+    def regime_costs(self, inputs):
+        """Coûts globaux de la feuille web (B2:B5) par régime"""
+        values = self.evaluate(inputs, WEB_OUTPUTS)
+        return {regime: values[output] for regime, output in zip(REGIMES, WEB_OUTPUTS)}
+
+
+def _column(value, size):
+    """Valeur d'une cellule étendue à tout le lot"""
+    value = _cell_value(value)
+    if isinstance(value, CellRange):
+        value = np.nan
+    column = np.array(np.broadcast_to(value, (size,)))
+    if column.dtype.kind in "fiub":
+        return column.astype(float)
+    return column
+
+
+def read_workbook(path, sheets=None):
+    """
+    Lit les constantes et analyse les formules d'un classeur. Retourne
+    (constantes, arbres, formules non analysables).
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise FormulaError("openpyxl est requis pour compiler le classeur")
+    workbook = load_workbook(path, data_only=False, read_only=False)
+    names = {}
+    for name, definition in _defined_names(workbook):
+        if definition.attr_text and not definition.attr_text.startswith("#"):
+            names[name.upper()] = definition.attr_text
+
+    selected = {sheet.lower() for sheet in sheets} if sheets else None
+    constants, formulas, errors = {}, {}, {}
+    for worksheet in workbook.worksheets:
+        if selected is not None and worksheet.title.lower() not in selected:
+            continue
+        for row in worksheet.iter_rows():
+            for cell in row:
+                value = cell.value
+                if value is None:
+                    continue
+                key = cell_key(worksheet.title, cell.coordinate)
+                text = getattr(value, "text", value)      # Formules matricielles
+                if isinstance(text, str) and text.startswith("="):
+                    try:
+                        formulas[key] = parse_formula(text, worksheet.title, names)
+                    except FormulaError as e:
+                        errors[key] = f"{text} ({str(e)})"
+                else:
+                    constants[key] = float(value) if isinstance(value, int) and not isinstance(value, bool) else value
+    workbook.close()
+    return constants, formulas, errors
+
+
+def _defined_names(workbook):
+    defined = workbook.defined_names
+    # openpyxl >= 3.1 : dictionnaire ; versions antérieures : liste
+    if hasattr(defined, "items"):
+        return list(defined.items())
+    return [(definition.name, definition) for definition in defined.definedName]
+
+
+def workbook_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_file(path, sheets, cache_dir):
+    digest = hashlib.sha256(workbook_hash(path).encode())
+    digest.update(repr((CACHE_FORMAT, sorted(sheet.lower() for sheet in sheets or ()))).encode())
+    directory = Path(cache_dir) if cache_dir else path.parent / CACHE_DIR_NAME
+    return directory / f"{digest.hexdigest()}.pickle"
@@ -0,0 +1,140 @@
+"""
+Valeur cible par régime (équivalent natif de la valeur cible d'Excel).
+
+Cherche, pour chaque scénario et chaque régime, la valeur d'une entrée
+(loyer, prix d'acquisition, taux d'emprunt...) qui amène un indicateur
+(cash-flow cumulé, ROI) à une cible. La recherche est encadrée (méthode
+de la fausse position, variante d'Illinois) et menée simultanément pour
+tous les scénarios et tous les régimes : chaque itération est un seul
+appel au moteur vectorisé.
+"""
+
+import numpy as np
+
+from fiscal_engine import (
+    INPUT_KEYS, MAX_HORIZON, REGIMES, evaluate_batch, normalize_batch,
+    records_to_columns,
+)
+from monte_carlo import total_rent
+from result_cache import cached_batch
+
+METRICS = ("cash_flow", "roi")
+
+# Intervalles de recherche par défaut (valeurs normalisées : taux décimaux)
+DEFAULT_BOUNDS = {
+    "rent": (0.0, 20000.0),
+    "acquisition_price": (0.0, 5_000_000.0),
+    "loan_rate": (0.0, 0.25),
+}
+
+DEFAULT_TOLERANCE = 1e-9
+DEFAULT_MAX_ITERATIONS = 100
+
+
+def metric_values(e, costs, metric):
+    """
+    Indicateur (scénarios x régimes) sur la durée de détention.
+
+    "cash_flow" : loyers encaissés - coût global ; "roi" : gain net
+    rapporté à l'investissement (prix et travaux), en %, comme
+    calculate_roi.
+    """
+    years = np.clip(np.rint(e["detention_duration"]), 1, MAX_HORIZON)
+    rent = total_rent(e, years)[:, None]
+    if metric == "cash_flow":
+        return rent - costs
+    investment = (e["acquisition_price"] + e["works_cost"])[:, None]
+    gain = rent + e["selling_price"][:, None] - costs - investment
+    safe = np.where(investment > 0, investment, 1.0)
+    return np.where(investment > 0, gain / safe * 100, 0.0)
+
+
+def goal_seek(scenarios, variable, metric="cash_flow", target=0.0, bounds=None,
+              tolerance=DEFAULT_TOLERANCE, max_iterations=DEFAULT_MAX_ITERATIONS, cache=None):
+    """
+    Valeur de `variable` qui amène `metric` à `target`, par scénario et
+    par régime.
+
+    `scenarios` accepte les mêmes formes que compute_batch. `bounds`
+    (bas, haut) encadre la recherche, en valeurs normalisées (taux
+    décimaux) ; `target` peut être un scalaire ou un tableau (scénarios).
+    Retourne une matrice (scénarios x régimes) dans l'ordre de REGIMES,
+    NaN lorsque la cible n'est pas atteignable dans l'intervalle. Le
+    résultat passe par le cache des résultats (`cache`, défaut : le cache
+    partagé).
+    """
+    if variable not in INPUT_KEYS:
+        raise ValueError(f"Entrée inconnue : {variable}")
+    if metric not in METRICS:
+        raise ValueError(f"Indicateur inconnu : {metric}")
+    if not isinstance(scenarios, dict):
+        scenarios = records_to_columns(scenarios)
+    low_bound, high_bound = bounds or DEFAULT_BOUNDS[variable]
+
+    base = normalize_batch(scenarios)
+    kind = ["goal_seek", variable, metric, np.asarray(target, dtype=float).tolist(),
+            float(low_bound), float(high_bound), tolerance, max_iterations]
+    # Copie : la matrice en cache ne doit pas être modifiée par l'appelant
+    return cached_batch(kind, base, lambda: _solve(
+        base, variable, metric, target, low_bound, high_bound, tolerance, max_iterations),
+        cache).copy()
+
+
+def _solve(base, variable, metric, target, low_bound, high_bound, tolerance, max_iterations):
+    """Recherche encadrée de goal_seek sur des colonnes normalisées"""
+    size, regimes = base["rent"].size, len(REGIMES)
+    # Chaque scénario est répété une fois par régime : la ligne (i, j) ne
+    # garde que la colonne du régime j
+    e = {key: np.repeat(np.atleast_1d(values), regimes) for key, values in base.items()}
+    column = np.tile(np.arange(regimes), size)
+    target = np.broadcast_to(np.asarray(target, dtype=float)[..., None], (size, regimes))
+
+    def residual(values):
+        e[variable] = values.ravel()
+        costs = evaluate_batch(e)
+        metrics = metric_values(e, costs, metric)[np.arange(column.size), column]
+        return metrics.reshape(size, regimes) - target
+
+    low = np.full((size, regimes), float(low_bound))
+    high = np.full((size, regimes), float(high_bound))
+    f_low, f_high = residual(low), residual(high)
+    bracketed = np.sign(f_low) != np.sign(f_high)
+    x = np.where(f_low == 0, low, high)
+    side = np.zeros((size, regimes), dtype=int)
+
+    for _ in range(max_iterations):
+        converged = np.abs(high - low) <= tolerance * np.maximum(np.abs(x), 1.0)
+        if (converged | ~bracketed).all():
+            break
+        # Fausse position, repli sur le milieu si les résidus sont égaux
+        denominator = f_high - f_low
+        safe = np.where(denominator != 0, denominator, 1.0)
+        x = np.where(denominator != 0, (low * f_high - high * f_low) / safe, (low + high) / 2)
+        f_x = residual(x)
+        exact = f_x == 0
+        toward_high = np.sign(f_x) == np.sign(f_high)
+        # Illinois : on divise par deux le résidu de la borne conservée deux fois
+        f_low = np.where(toward_high & (side == 1), f_low / 2, f_low)
+        f_high = np.where(~toward_high & (side == -1), f_high / 2, f_high)
+        high, f_high = np.where(toward_high, x, high), np.where(toward_high, f_x, f_high)
+        low, f_low = np.where(toward_high, low, x), np.where(toward_high, f_low, f_x)
+        side = np.where(toward_high, 1, -1)
+        low = np.where(exact, x, low)
+        high = np.where(exact, x, high)
+
+    return np.where(bracketed, x, np.nan)
+
+
+def break_even_rent(scenarios, **options):
+    """Loyer mensuel (c1) annulant le cash-flow cumulé, par régime"""
+    return goal_seek(scenarios, "rent", "cash_flow", 0.0, **options)
+
+
+def max_acquisition_price(scenarios, roi, **options):
+    """Prix d'acquisition (c4) maximal pour atteindre un ROI cible (%), par régime"""
+    return goal_seek(scenarios, "acquisition_price", "roi", roi, **options)
+
+
+def max_loan_rate(scenarios, cash_flow=0.0, **options):
+    """Taux d'emprunt (décimal) maximal pour un cash-flow cumulé cible, par régime"""
+    return goal_seek(scenarios, "loan_rate", "cash_flow", cash_flow, **options)
@@ -0,0 +1,172 @@
+"""
+Durée de détention optimale.
+
+Évalue toutes les durées de détention de 1 à MAX_HORIZON ans pour tous les
+régimes à partir d'une seule projection annuelle (matrices années x
+régimes), puis retient le couple (durée, régime) qui minimise le coût
+moyen annuel ou maximise le TRI.
+"""
+
+import numpy as np
+
+from fiscal_engine import MAX_HORIZON, REGIMES, normalize_inputs
+from loan import amortize_loans, fixed_rate_balances
+from projection import projection
+from result_cache import cached_scenario
+
+CRITERIA = ("cost", "irr")
+
+# Intervalle de recherche du TRI, précision et nombre maximal d'itérations
+IRR_BOUNDS = (-0.99, 1.0)
+IRR_TOLERANCE = 1e-12
+IRR_ITERATIONS = 100
+
+
+def average_cost_curves(result):
+    """
+    Coût moyen annuel (années x régimes) d'une cession au bout de chaque
+    durée : coûts cumulés et fiscalité de la plus-value, rapportés à la
+    durée de détention.
+    """
+    years = np.arange(1, MAX_HORIZON + 1)
+    return (result.cumulative_costs + result.capital_gains) / years[:, None]
+
+
+def debt_flows(values, e=None):
+    """
+    Flux de trésorerie des emprunts sur MAX_HORIZON années : montant
+    emprunté (reçu à l'achat), remboursement de capital payé chaque année
+    (échéances hors intérêts et assurance, négatif lorsque les intérêts sont
+    capitalisés) et capital restant dû en fin d'année, remboursé à la
+    cession. Prêt unique de feuil1 (b39, b40, b43) ou prêts de la clé "loans".
+    """
+    e = normalize_inputs(values) if e is None else e
+    loans = values.get("loans")
+    if not loans:
+        # Prêt unique à taux fixe : capital restant dû par la formule fermée
+        balances = fixed_rate_balances(e["loan_amount"], e["loan_duration"], e["loan_rate"],
+                                       MAX_HORIZON)
+        proceeds = e["loan_amount"] if e["loan_duration"] > 0 else 0.0
+        repayments = np.concatenate(([proceeds], balances[:-1])) - balances
+        return proceeds, repayments, balances
+
+    schedule = amortize_loans(loans)
+    proceeds = sum(loan.amount for loan in loans)
+    paid = schedule.payment - schedule.interest - schedule.insurance
+    repayments = schedule.annual(paid, MAX_HORIZON).sum(axis=0)
+    # Capital restant dû à la fin de chaque année (nul une fois le prêt soldé)
+    months = schedule.remaining.shape[1]
+    ends = 12 * np.arange(1, MAX_HORIZON + 1) - 1
+    balances = np.zeros(MAX_HORIZON)
+    within = ends < months
+    balances[within] = schedule.remaining[:, ends[within]].sum(axis=0)
+    return proceeds, repayments, balances
+
+
+def irr_curves(result, investment, selling_price, debt=None):
+    """
+    TRI (années x régimes) d'une cession au bout de chaque durée.
+
+    Flux retenus, comme pour le gain net : apport (prix, travaux et
+    mobilier, moins le montant emprunté) la première année, loyers nets des
+    coûts et des remboursements de capital chaque année, puis prix de
+    cession net de la fiscalité de la plus-value et du capital restant dû
+    l'année de la vente. `debt` est le triplet retourné par debt_flows ;
+    sans emprunt, les coûts ne doivent pas comprendre d'intérêts. Les TRI
+    de toutes les durées et régimes sont cherchés ensemble par la méthode
+    de Newton, encadrée (repli sur le milieu de l'intervalle lorsque le pas
+    en sort) ; NaN lorsqu'aucun taux de l'intervalle n'annule la VAN.
+    """
+    years = np.arange(1, MAX_HORIZON + 1)
+    flows = result.cash_flows()                      # années x régimes
+    terminal = selling_price - result.capital_gains  # durées x régimes
+    if debt is not None:
+        proceeds, repayments, balances = debt
+        investment = investment - proceeds
+        flows = flows - repayments[:, None]
+        terminal = terminal - balances[:, None]
+    # La VAN d'une détention de d ans est un polynôme en v = 1 / (1 + taux) :
+    # coefficients[d, r, t] est le flux de l'année t (t = 0 : apport)
+    powers = np.arange(MAX_HORIZON + 1)
+    coefficients = np.zeros(terminal.shape + (MAX_HORIZON + 1,))
+    coefficients[..., 0] = -investment
+    held = years[None, :] <= years[:, None]          # durées x années
+    coefficients[..., 1:] = np.where(held[:, None, :], flows.T[None, :, :], 0.0)
+    coefficients[years - 1, :, years] += terminal
+    derivative = coefficients[..., 1:] * powers[1:]
+
+    def npv(rate):
+        """VAN et dérivée par rapport au taux"""
+        v = 1 / (1 + rate)
+        discount = v[..., None] ** powers
+        value = np.einsum("drt,drt->dr", coefficients, discount)
+        slope = np.einsum("drt,drt->dr", derivative, discount[..., :-1])
+        return value, -slope * v * v
+
+    low = np.full(terminal.shape, IRR_BOUNDS[0])
+    high = np.full(terminal.shape, IRR_BOUNDS[1])
+    bracketed = (npv(low)[0] >= 0) & (npv(high)[0] <= 0)
+
+    # Départ : rendement moyen des flux cumulés sur la durée de détention
+    gain = coefficients[..., 1:].sum(axis=2)
+    ratio = np.where(investment > 0, gain / np.where(investment > 0, investment, 1.0), 1.0)
+    rate = np.maximum(ratio, 1e-6) ** (1 / years[:, None]) - 1
+    rate = np.clip(rate, IRR_BOUNDS[0] / 2, IRR_BOUNDS[1] / 2)
+    active = bracketed.copy()
+    for _ in range(IRR_ITERATIONS):
+        value, slope = npv(rate)
+        # La VAN décroît avec le taux aux bornes de l'intervalle
+        low = np.where(value > 0, rate, low)
+        high = np.where(value > 0, high, rate)
+        safe = np.where(slope != 0, slope, 1.0)
+        step = np.where(slope != 0, rate - value / safe, np.inf)
+        step = np.where((step > low) & (step < high), step, (low + high) / 2)
+        active &= np.abs(step - rate) > IRR_TOLERANCE * (1 + np.abs(rate))
+        rate = np.where(active, step, rate)
+        if not active.any():
+            break
+    return np.where(bracketed, rate, np.nan)
+
+
+def optimal_holding(values, criterion="cost", cache=None):
+    """
+    Durée de détention et régime optimaux d'un jeu d'entrées (feuil1).
+
+    `criterion` vaut "cost" (coût moyen annuel minimal, plus-value
+    comprise) ou "irr" (TRI maximal). Retourne un dictionnaire avec le
+    régime, la durée et la valeur optimale, ainsi que les courbes
+    complètes {régime: tableau de MAX_HORIZON valeurs} pour les graphiques.
+    Le résultat passe par le cache des résultats (`cache`, défaut : le
+    cache partagé).
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"Critère inconnu : {criterion}")
+    result = cached_scenario(["holding", criterion], values,
+                             lambda: _optimal_holding(values, criterion), cache)
+    # Copie : les courbes en cache ne doivent pas être modifiées par l'appelant
+    return dict(result, curves={regime: curve.copy() for regime, curve in result["curves"].items()})
+
+
+def _optimal_holding(values, criterion):
+    result = projection(values)
+    if criterion == "cost":
+        curves = average_cost_curves(result)
+        scores = curves
+    else:
+        e = normalize_inputs(values)
+        investment = e["acquisition_price"] + e["works_cost"] + e["furniture_cost"]
+        curves = irr_curves(result, investment, e["selling_price"], debt_flows(values, e))
+        # Les TRI introuvables ne sont jamais retenus
+        scores = np.where(np.isnan(curves), np.inf, -curves)
+
+    if np.isinf(scores).all():
+        year, column = None, None
+    else:
+        year, column = np.unravel_index(np.argmin(scores), scores.shape)
+    return {
+        "criterion": criterion,
+        "regime": REGIMES[column] if column is not None else None,
+        "years": int(year) + 1 if year is not None else None,
+        "value": float(curves[year, column]) if year is not None else None,
+        "curves": {regime: curves[:, i] for i, regime in enumerate(REGIMES)},
+    }
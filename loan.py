@@ -0,0 +1,296 @@
+"""
+Échéanciers d'emprunt.
+
+Amortissement mensuel d'un ou plusieurs prêts, avec différé partiel
+(intérêts seuls) ou total (intérêts capitalisés), taux fixe ou variable
+par paliers et assurance emprunteur. Les échéanciers de plusieurs prêts
+sont calculés ensemble sous forme de tableaux (prêts x mois).
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Types de différé
+DEFERRAL_PARTIAL = "partiel"    # Intérêts payés, capital non amorti
+DEFERRAL_TOTAL = "total"        # Intérêts capitalisés, aucune échéance
+
+# Nombre d'échéanciers simples gardés en mémoire
+CACHE_SIZE = 4096
+_annual_interest_cache = OrderedDict()
+# Le cache est partagé entre les threads (serveur web, tâches de fond)
+_cache_lock = threading.Lock()
+
+
+class Schedule:
+    """Échéancier mensuel de plusieurs prêts (tableaux prêts x mois)"""
+
+    def __init__(self, interest, principal, insurance, payment, remaining):
+        self.interest = interest        # Intérêts courus (capitalisés en différé total)
+        self.principal = principal      # Capital amorti
+        self.insurance = insurance      # Assurance emprunteur
+        self.payment = payment          # Échéance réellement payée
+        self.remaining = remaining      # Capital restant dû en fin de mois
+
+    def annual(self, values, years=None):
+        """Regroupe un tableau mensuel par année (prêts x années)"""
+        months = values.shape[1]
+        years = years or -(-months // 12)
+        padded = np.zeros((values.shape[0], years * 12))
+        length = min(months, years * 12)
+        padded[:, :length] = values[:, :length]
+        return padded.reshape(values.shape[0], years, 12).sum(axis=2)
+
+    def annual_interest(self, years=None):
+        return self.annual(self.interest, years)
+
+    def annual_insurance(self, years=None):
+        return self.annual(self.insurance, years)
+
+    def total_interest(self):
+        return self.interest.sum(axis=1)
+
+    def total_insurance(self):
+        return self.insurance.sum(axis=1)
+
+
+class Loan:
+    """
+    Description d'un prêt.
+
+    Les taux sont décimaux (0.035 pour 3,5 %). La durée inclut le différé.
+    `rate_steps` liste des paliers (mois de début, taux annuel) qui
+    remplacent le taux initial à partir du mois indiqué ; l'échéance est
+    alors recalculée sur la durée restante.
+    """
+
+    def __init__(self, amount, years, rate, deferral_months=0,
+                 deferral=DEFERRAL_PARTIAL, rate_steps=None,
+                 insurance_rate=0.0, insurance_on_remaining=False):
+        self.amount = float(amount)
+        self.years = float(years)
+        self.rate = float(rate)
+        self.deferral_months = int(deferral_months)
+        self.deferral = deferral
+        self.rate_steps = sorted(rate_steps or [])
+        self.insurance_rate = float(insurance_rate)
+        self.insurance_on_remaining = insurance_on_remaining
+
+    @property
+    def months(self):
+        return int(round(self.years * 12))
+
+    def monthly_rates(self, length):
+        """Taux annuel applicable à chaque mois"""
+        rates = np.full(length, self.rate)
+        for start, rate in self.rate_steps:
+            rates[int(start):] = rate
+        return rates
+
+    def schedule(self):
+        """Échéancier mensuel de ce prêt seul"""
+        return amortize_loans([self])
+
+
+def amortize(amounts, months, rates, deferral_months=0, total_deferral=False,
+             insurance_rates=0.0, insurance_on_remaining=False):
+    """
+    Calcule les échéanciers de N prêts en une passe vectorisée.
+
+    `rates` est un vecteur de taux annuels (N) ou une matrice de taux par
+    mois (N x durée maximale). Les autres paramètres sont des scalaires ou
+    des vecteurs de longueur N.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    months = np.rint(np.asarray(months, dtype=float)).astype(int)
+    amounts, months = np.broadcast_arrays(amounts, months)
+    size = amounts.shape[0]
+    horizon = int(months.max()) if size else 0
+
+    rates = np.asarray(rates, dtype=float)
+    if rates.ndim < 2:
+        rates = np.repeat(np.broadcast_to(rates, (size,))[:, None], horizon, axis=1)
+    deferral_months = np.broadcast_to(np.asarray(deferral_months, dtype=int), (size,))
+    total_deferral = np.broadcast_to(np.asarray(total_deferral, dtype=bool), (size,))
+    insurance_rates = np.broadcast_to(np.asarray(insurance_rates, dtype=float), (size,))
+    insurance_on_remaining = np.broadcast_to(
+        np.asarray(insurance_on_remaining, dtype=bool), (size,))
+
+    interest = np.zeros((size, horizon))
+    principal = np.zeros((size, horizon))
+    insurance = np.zeros((size, horizon))
+    payment = np.zeros((size, horizon))
+    remaining = np.zeros((size, horizon))
+
+    balance = amounts.copy()
+    for month in range(horizon):
+        active = month < months
+        deferred = active & (month < deferral_months)
+        capitalized = deferred & total_deferral
+
+        monthly_rate = rates[:, month] / 12
+        accrued = balance * monthly_rate
+        # Échéance constante recalculée sur la durée restante
+        left = np.maximum(months - month, 1)
+        safe_rate = np.where(monthly_rate > 0, monthly_rate, 1.0)
+        annuity = np.where(monthly_rate > 0,
+                           balance * safe_rate / (1 - (1 + safe_rate) ** -left),
+                           balance / left)
+        amortized = np.where(deferred | ~active, 0.0, annuity - accrued)
+
+        insured = np.where(insurance_on_remaining, balance, amounts)
+        insurance[:, month] = np.where(active, insured * insurance_rates / 12, 0.0)
+        interest[:, month] = np.where(active, accrued, 0.0)
+        principal[:, month] = amortized
+        payment[:, month] = (np.where(capitalized | ~active, 0.0, accrued)
+                             + amortized + insurance[:, month])
+
+        balance = balance - amortized + np.where(capitalized, accrued, 0.0)
+        balance = np.where(active, balance, 0.0)
+        remaining[:, month] = balance
+
+    return Schedule(interest, principal, insurance, payment, remaining)
+
+
+def amortize_loans(loans):
+    """Échéanciers d'une liste d'objets Loan, calculés en une passe"""
+    horizon = max((loan.months for loan in loans), default=0)
+    return amortize(
+        [loan.amount for loan in loans],
+        [loan.months for loan in loans],
+        np.array([loan.monthly_rates(horizon) for loan in loans]).reshape(len(loans), horizon),
+        deferral_months=[loan.deferral_months for loan in loans],
+        total_deferral=[loan.deferral == DEFERRAL_TOTAL for loan in loans],
+        insurance_rates=[loan.insurance_rate for loan in loans],
+        insurance_on_remaining=[loan.insurance_on_remaining for loan in loans],
+    )
+
+
+def fixed_rate_annual_interest(amounts, years, rates, horizon):
+    """
+    Intérêts annuels (N x horizon) de prêts à mensualités constantes, par
+    la formule fermée du capital restant dû (une itération par année).
+    """
+    return _fixed_rate_years(amounts, years, rates, horizon)[0]
+
+
+def fixed_rate_balances(amounts, years, rates, horizon):
+    """
+    Capital restant dû en fin d'année (N x horizon) de prêts à mensualités
+    constantes, nul une fois le prêt soldé.
+    """
+    return _fixed_rate_years(amounts, years, rates, horizon)[1]
+
+
+def _fixed_rate_years(amounts, years, rates, horizon):
+    """Intérêts annuels et capital restant dû en fin d'année (formule fermée)"""
+    amounts, years, rates = np.broadcast_arrays(
+        np.asarray(amounts, dtype=float), np.asarray(years, dtype=float),
+        np.asarray(rates, dtype=float))
+    months = np.maximum(np.rint(years * 12), 1)
+    capital = np.where(years > 0, amounts, 0.0)
+    # Taux plancher pour traiter le prêt à taux zéro sans cas particulier
+    monthly_rate = np.maximum(rates / 12, 1e-9)
+    growth = 1 + monthly_rate
+    payment = capital * monthly_rate / (1 - growth ** -months)
+
+    interest = np.zeros(amounts.shape + (horizon,))
+    balances = np.zeros(amounts.shape + (horizon,))
+    start, balance = 0, capital
+    for year in range(horizon):
+        end = np.minimum(12 * (year + 1), months)
+        factor = growth ** end
+        new_balance = capital * factor - payment * (factor - 1) / monthly_rate
+        interest[..., year] = payment * (end - start) - (balance - new_balance)
+        balances[..., year] = np.where(end < months, new_balance, 0.0)
+        start, balance = end, new_balance
+    return interest, balances
+
+
+def annual_interest_batch(amounts, years, rates, horizon):
+    """
+    Intérêts annuels (N x horizon) de prêts simples à taux fixe.
+
+    Les résultats sont mémoïsés par (montant, durée, taux) : seuls les
+    prêts absents du cache sont calculés, en une seule passe vectorisée.
+    """
+    keys = np.stack(np.broadcast_arrays(
+        np.asarray(amounts, dtype=float),
+        np.asarray(years, dtype=float),
+        np.asarray(rates, dtype=float)), axis=-1).reshape(-1, 3)
+    unique, inverse = _unique_rows(keys)
+
+    table = np.zeros((len(unique), horizon))
+    if len(unique) > CACHE_SIZE:
+        # Lot plus grand que le cache : calcul direct, sans mémoïsation
+        rows, missing = None, list(range(len(unique)))
+    else:
+        rows = [tuple(row) for row in unique.tolist()]
+        missing = []
+        for i, key in enumerate(rows):
+            values = _lookup(key)
+            if values is None:
+                missing.append(i)
+            else:
+                length = min(len(values), horizon)
+                table[i, :length] = values[:length]
+
+    if missing:
+        amounts_, years_, rates_ = unique[missing].T
+        # Calcul sur toute la durée des prêts pour que le cache reste complet
+        length = max(horizon, int(np.ceil(years_.max())))
+        computed = fixed_rate_annual_interest(amounts_, years_, rates_, length)
+        table[missing] = computed[:, :horizon]
+        if rows is not None:
+            for i, values in zip(missing, computed):
+                _store(rows[i], values)
+    return table[inverse]
+
+
+def annual_interest(amount, years, rate, horizon):
+    """Intérêts annuels d'un prêt simple à taux fixe (mémoïsés)"""
+    values = _lookup((float(amount), float(years), float(rate)))
+    if values is None:
+        return annual_interest_batch(amount, years, rate, horizon)[0].tolist()
+    values = values[:horizon].tolist()
+    return values + [0.0] * (horizon - len(values))
+
+
+def annual_insurance(amounts, years, insurance_rates, horizon):
+    """Assurance emprunteur annuelle calculée sur le capital initial"""
+    months = np.rint(np.asarray(years, dtype=float) * 12)
+    paid = np.clip(months[..., None] - 12 * np.arange(horizon), 0, 12)
+    monthly = np.asarray(amounts, dtype=float) * insurance_rates / 12
+    return monthly[..., None] * paid
+
+
+def _unique_rows(keys):
+    """Lignes distinctes d'une matrice et indices pour la reconstituer"""
+    order = np.lexsort(keys.T[::-1])
+    ordered = keys[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    inverse = np.empty(len(keys), dtype=int)
+    inverse[order] = np.cumsum(first) - 1
+    return ordered[first], inverse
+
+
+def _lookup(key):
+    """Lecture du cache en marquant l'entrée comme récente"""
+    with _cache_lock:
+        values = _annual_interest_cache.get(key)
+        if values is not None:
+            _annual_interest_cache.move_to_end(key)
+        return values
+
+
+def _store(key, values):
+    """Ajoute un résultat au cache en évinçant le plus ancien"""
+    values = np.array(values)
+    values.flags.writeable = False
+    with _cache_lock:
+        _annual_interest_cache[key] = values
+        while len(_annual_interest_cache) > CACHE_SIZE:
+            _annual_interest_cache.popitem(last=False)
+    return values
@@ -0,0 +1,145 @@
+"""
+Simulation de Monte-Carlo des coûts par régime.
+
+Tire la revalorisation des loyers, la vacance locative, un choc sur le
+taux d'emprunt et le prix de cession, puis évalue chaque tirage avec le
+moteur vectorisé : coût global sur la durée de détention et fiscalité de
+la plus-value de cession, propre à chaque régime. Les tirages sont découpés en lots de graines
+indépendantes, répartis sur un pool de processus : le résultat ne dépend
+que de la graine et de la taille des lots, pas du nombre de processus.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from capital_gains import capital_gains_at
+from fiscal_engine import REGIMES, evaluate_batch, holding_years, normalize_batch, normalize_inputs
+from result_cache import cached_scenario
+
+# Distributions par défaut : (méthode de numpy.random.Generator, paramètres)
+DEFAULT_DISTRIBUTIONS = {
+    "rent_growth": ("normal", 0.015, 0.01),        # Revalorisation annuelle
+    "vacancy_months": ("triangular", 0.0, 0.5, 3.0),
+    "rate_shock": ("normal", 0.0, 0.005),          # Écart sur le taux d'emprunt
+    "resale_factor": ("lognormal", 0.0, 0.15),     # Multiplicateur du prix de cession
+}
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def draw(rng, spec, size):
+    """Tire `size` valeurs selon une spécification (méthode, *paramètres)"""
+    method, *params = spec
+    if method == "constant":
+        return np.full(size, float(params[0]))
+    return getattr(rng, method)(*params, size=size)
+
+
+def total_rent(e, years):
+    """Loyers encaissés sur la durée de détention (croissance géométrique)"""
+    growth = e["rent_growth"]
+    first_year = e["rent"] * (12 - e["vacancy_months"])
+    # Somme géométrique, avec la limite years quand la croissance est nulle
+    safe = np.where(np.abs(growth) < 1e-12, 1.0, growth)
+    factor = np.where(np.abs(growth) < 1e-12, years, ((1 + safe) ** years - 1) / safe)
+    return first_year * factor
+
+
+def simulate_chunk(base, distributions, seed, size):
+    """
+    Évalue un lot de tirages.
+
+    Retourne (coûts, gains nets) : deux matrices (tirages x régimes). Le
+    coût comprend la fiscalité de la plus-value de la cession au terme de
+    la durée de détention. Le gain net reprend la logique de calculate_roi :
+    loyers + prix de cession - coût - investissement initial.
+    """
+    rng = np.random.default_rng(seed)
+    columns = dict(base)
+    columns["rent_growth"] = draw(rng, distributions["rent_growth"], size)
+    columns["vacancy_months"] = np.clip(draw(rng, distributions["vacancy_months"], size), 0, 12)
+    columns["loan_rate"] = np.maximum(
+        base["loan_rate"] + draw(rng, distributions["rate_shock"], size), 0.0)
+    columns["selling_price"] = (base["selling_price"]
+                                * draw(rng, distributions["resale_factor"], size))
+
+    e = normalize_batch(columns)
+    costs, deducted = evaluate_batch(e, with_deducted=True)
+    years = holding_years(base["detention_duration"])
+    costs += capital_gains_at(e, years, deducted)
+    revenue = total_rent(columns, years) + columns["selling_price"]
+    investment = base["acquisition_price"] + base["works_cost"]
+    gains = (revenue - investment)[:, None] - costs
+    return costs, gains
+
+
+def optimal_shares(costs):
+    """
+    Part des tirages (tirages x régimes) où chaque régime est optimal. Un
+    tirage où plusieurs régimes sont à égalité (SCI IS et PREL BONI sans
+    bénéfice distribué) est partagé entre eux plutôt qu'attribué au premier.
+    """
+    optimal = costs == costs.min(axis=1, keepdims=True)
+    return (optimal / optimal.sum(axis=1, keepdims=True)).mean(axis=0)
+
+
+def run_monte_carlo(values, paths=1_000_000, distributions=None, seed=0,
+                    chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+                    percentiles=DEFAULT_PERCENTILES, cache=None):
+    """
+    Lance `paths` tirages autour du scénario `values` (entrées feuil1).
+
+    `distributions` complète ou remplace DEFAULT_DISTRIBUTIONS. Avec
+    workers=1 le calcul reste dans le processus courant. Retourne les
+    percentiles du coût global (plus-value comprise) et du gain net par
+    régime, ainsi que la probabilité que chaque régime soit optimal (voir
+    optimal_shares). Le résultat ne dépendant pas du nombre de processus,
+    il passe par le cache des résultats (`cache`, défaut : le cache
+    partagé).
+    """
+    specs = dict(DEFAULT_DISTRIBUTIONS)
+    specs.update(distributions or {})
+    kind = ["monte_carlo", paths, sorted(specs.items()), seed, chunk_size, list(percentiles)]
+    return cached_scenario(kind, values, lambda: _run(
+        values, paths, specs, seed, chunk_size, workers, percentiles), cache)
+
+
+def _run(values, paths, specs, seed, chunk_size, workers, percentiles):
+    base = normalize_inputs(values)
+
+    sizes = [chunk_size] * (paths // chunk_size)
+    if paths % chunk_size:
+        sizes.append(paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(base, specs, chunk_seed, size) for chunk_seed, size in zip(seeds, sizes)]
+
+    if workers == 1 or len(tasks) <= 1:
+        results = [simulate_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(simulate_chunk, *zip(*tasks)))
+
+    costs = np.concatenate([chunk_costs for chunk_costs, _ in results])
+    gains = np.concatenate([chunk_gains for _, chunk_gains in results])
+    shares = optimal_shares(costs)
+
+    cost_percentiles = np.percentile(costs, percentiles, axis=0)
+    gain_percentiles = np.percentile(gains, percentiles, axis=0)
+    return {
+        "paths": int(costs.shape[0]),
+        "seed": seed,
+        "cost_percentiles": {
+            regime: dict(zip(percentiles, cost_percentiles[:, i].tolist()))
+            for i, regime in enumerate(REGIMES)
+        },
+        "gain_percentiles": {
+            regime: dict(zip(percentiles, gain_percentiles[:, i].tolist()))
+            for i, regime in enumerate(REGIMES)
+        },
+        "optimal_probability": {
+            regime: float(shares[i])
+            for i, regime in enumerate(REGIMES)
+        },
+    }
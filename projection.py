@@ -0,0 +1,165 @@
+"""
+Projection annuelle des flux par régime.
+
+Construit pour un jeu d'entrées la matrice (années x régimes) des flux sur
+MAX_HORIZON années : loyers, charges (TF, assurance), frais d'emprunt,
+impôt, prélèvements sociaux, frais propres au régime et fiscalité de la
+plus-value en cas de cession. Les totaux et moyennes pour une durée de
+détention quelconque sont de simples lectures de cette matrice, mise en
+cache par jeu d'entrées : changer la durée de détention ne relance pas le
+calcul.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from capital_gains import LMNP_REGIMES, capital_gains_curves
+from fiscal_engine import (
+    INPUT_KEYS, MAX_HORIZON, REGIMES, _ScalarMath, financing_costs,
+    holding_years, normalize_inputs, simulate_years,
+)
+
+# Nombre de projections gardées en mémoire
+CACHE_SIZE = 256
+_projection_cache = OrderedDict()
+# Le cache est partagé entre les threads (serveur web, tâches de fond)
+_cache_lock = threading.Lock()
+
+
+class Projection:
+    """
+    Flux annuels d'un jeu d'entrées.
+
+    Les vecteurs (rent, charges, loan_costs) ont une valeur par année, les
+    matrices (tax, social, fees, costs, capital_gains) une ligne par année
+    et une colonne par régime, dans l'ordre de REGIMES. La ligne i
+    correspond à l'année i + 1 (ou à une cession au bout de i + 1 ans).
+    """
+
+    # Matrices définissant la projection (enregistrées dans les instantanés)
+    ARRAYS = ("rent", "charges", "loan_costs", "tax", "social", "fees",
+              "capital_gains", "costs", "cumulative_costs")
+
+    def __init__(self, flows, capital_gains):
+        self.rent = self._freeze(flows["rent"])
+        self.charges = self._freeze(flows["charges"])
+        self.loan_costs = self._freeze(flows["loan_costs"])
+        self.tax = self._regime_matrix(flows["tax"])
+        self.social = self._regime_matrix(flows["social"])
+        self.fees = self._regime_matrix(flows["fees"])
+        self.capital_gains = self._regime_matrix(capital_gains)
+        self.costs = self._freeze((self.charges + self.loan_costs)[:, None]
+                                  + self.tax + self.social + self.fees)
+        self.cumulative_costs = self._freeze(np.cumsum(self.costs, axis=0))
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Projection reconstruite à partir de ses matrices enregistrées
+        (instantané) : {attribut: matrice}, copiées.
+        """
+        projection = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(projection, name, cls._freeze(arrays[name]))
+        return projection
+
+    @staticmethod
+    def _freeze(values):
+        # Les projections sont partagées via le cache : lecture seule
+        values = np.array(values, dtype=float)
+        values.flags.writeable = False
+        return values
+
+    def _regime_matrix(self, series):
+        return self._freeze(np.column_stack([series[regime] for regime in REGIMES]))
+
+    def cash_flows(self):
+        """Flux net de chaque année (loyers - coûts), années x régimes"""
+        return self.rent[:, None] - self.costs
+
+    def total_costs(self, years):
+        """Coût global cumulé sur `years` années, par régime"""
+        return self.cumulative_costs[holding_years(years) - 1]
+
+    def average_costs(self, years):
+        """Coût moyen annuel sur `years` années, par régime"""
+        years = holding_years(years)
+        return self.cumulative_costs[years - 1] / years
+
+    def capital_gains_tax(self, years):
+        """Fiscalité de la plus-value d'une cession au bout de `years` ans"""
+        return self.capital_gains[holding_years(years) - 1]
+
+    def regime_costs(self, years):
+        """Coût global par régime : {régime: coût}"""
+        return dict(zip(REGIMES, self.total_costs(years).tolist()))
+
+    def summary(self, years):
+        """
+        Valeurs des tableaux de synthèse par régime, dans l'ordre des
+        colonnes : coût moyen annuel (40 ans, durée), coût global (40 ans,
+        durée), fiscalité plus-value (40 ans, durée), coût global total.
+        """
+        columns = np.column_stack([
+            self.average_costs(MAX_HORIZON),
+            self.average_costs(years),
+            self.total_costs(MAX_HORIZON),
+            self.total_costs(years),
+            self.capital_gains_tax(MAX_HORIZON),
+            self.capital_gains_tax(years),
+            self.total_costs(years) + self.capital_gains_tax(years),
+        ])
+        return {regime: tuple(row) for regime, row in zip(REGIMES, columns.tolist())}
+
+
+def build_projection(values):
+    """Calcule la projection d'un jeu d'entrées (feuil1), sans cache"""
+    e = normalize_inputs(values)
+    flows = simulate_years(e, financing_costs(e, MAX_HORIZON, values.get("loans")),
+                           _ScalarMath)
+    deducted = {regime: flows["lmnp"][regime]["deducted"] for regime in LMNP_REGIMES}
+    return Projection(flows, capital_gains_curves(e, deducted))
+
+
+def projection(values):
+    """
+    Projection d'un jeu d'entrées, mise en cache.
+
+    La clé ne dépend pas de la durée de détention, qui n'intervient qu'à la
+    lecture. Les scénarios décrivant leurs prêts (clé "loans") ne sont pas
+    mis en cache.
+    """
+    if values.get("loans"):
+        return build_projection(values)
+    e = normalize_inputs(values)
+    key = tuple(e[name] for name in INPUT_KEYS if name != "detention_duration")
+    with _cache_lock:
+        result = _projection_cache.get(key)
+        if result is not None:
+            _projection_cache.move_to_end(key)
+            return result
+    # Calcul hors du verrou : un autre thread peut calculer la même clé
+    result = build_projection(values)
+    with _cache_lock:
+        result = _projection_cache.setdefault(key, result)
+        _projection_cache.move_to_end(key)
+        while len(_projection_cache) > CACHE_SIZE:
+            _projection_cache.popitem(last=False)
+    return result
+
+
+def clear_cache():
+    with _cache_lock:
+        _projection_cache.clear()
+
+
+def regime_costs(values):
+    """Coût global par régime sur la durée de détention (c3)"""
+    return projection(values).regime_costs(normalize_inputs(values)["detention_duration"])
+
+
+def regime_summary(values):
+    """Valeurs des tableaux de synthèse par régime (voir Projection.summary)"""
+    return projection(values).summary(normalize_inputs(values)["detention_duration"])
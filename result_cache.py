@@ -0,0 +1,283 @@
+"""
+Cache persistant des résultats de simulation.
+
+Les résultats (coûts par régime, synthèse, lots de scénarios) sont indexés
+par une empreinte canonique des entrées de feuil1 normalisées et de la
+version du moteur. Deux niveaux : un LRU en mémoire, puis une base SQLite
+sur disque dont la taille est bornée (les entrées les moins récemment
+lues sont supprimées). Les compteurs de succès et d'échecs sont exposés
+par stats().
+"""
+
+import hashlib
+import json
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from fiscal_engine import INPUT_KEYS, evaluate_batch, normalize_inputs
+from projection import regime_costs, regime_summary
+
+DEFAULT_CACHE_FILE = "cache_resultats.sqlite3"
+MEMORY_SIZE = 256                       # Résultats gardés en mémoire
+DISK_SIZE = 64 * 1024 * 1024            # Taille maximale de la base (octets)
+
+# Modules dont le code détermine les résultats
+ENGINE_MODULES = ("fiscal_engine", "loan", "capital_gains", "projection",
+                  "holding_period", "goal_seek", "monte_carlo")
+# Incrémentée à chaque changement de format des résultats en cache
+CACHE_FORMAT = 1
+
+
+def engine_version():
+    """
+    Empreinte du moteur : code source des modules de calcul (les résultats
+    enregistrés par une autre version du moteur ne sont jamais relus).
+    """
+    digest = hashlib.sha256(str(CACHE_FORMAT).encode())
+    for name in ENGINE_MODULES:
+        module = sys.modules.get(name) or __import__(name)
+        try:
+            with open(module.__file__, "rb") as handle:
+                digest.update(handle.read())
+        except (OSError, TypeError, AttributeError):
+            # Application empaquetée sans les sources
+            digest.update(name.encode())
+    return digest.hexdigest()[:16]
+
+
+def scenario_key(kind, values, version):
+    """Clé canonique d'un jeu d'entrées (dictionnaire de feuil1)"""
+    e = normalize_inputs(values)
+    canonical = json.dumps([kind, version, [[key, _canonical(e[key])] for key in INPUT_KEYS]])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def batch_key(kind, columns, version):
+    """Clé canonique d'un lot de colonnes normalisées"""
+    digest = hashlib.sha256(json.dumps([kind, version]).encode())
+    for key in INPUT_KEYS:
+        column = np.ascontiguousarray(columns[key], dtype=float)
+        digest.update(key.encode())
+        digest.update(str(column.shape).encode())
+        digest.update(column.tobytes())
+    return digest.hexdigest()
+
+
+def _canonical(value):
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    # repr des flottants : 0.1 + 0.2 et 0.30000000000000004 restent distincts
+    return repr(float(value))
+
+
+class ResultCache:
+    """
+    Cache à deux niveaux. `path` désigne la base SQLite (None : mémoire
+    seule) ; `memory_size` le nombre de résultats gardés en mémoire et
+    `disk_size` la taille maximale de la base en octets.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, memory_size=MEMORY_SIZE, disk_size=DISK_SIZE):
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.counters = Counter()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        if path is not None:
+            try:
+                self._connection = sqlite3.connect(str(path), check_same_thread=False)
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+                    " size INTEGER NOT NULL, accessed REAL NOT NULL)")
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"Cache disque indisponible ({path}) : {str(e)}")
+                self._connection = None
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self._memory[key]
+            value = self._read(key)
+            if value is None:
+                self.counters["misses"] += 1
+                return default
+            self.counters["disk_hits"] += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            self._write(key, value)
+
+    def get_or_compute(self, key, compute):
+        """Résultat en cache, ou calculé par compute() puis enregistré"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM results")
+                self._connection.commit()
+
+    def stats(self):
+        """Compteurs de succès (mémoire, disque), d'échecs et tailles"""
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            requests = hits + self.counters["misses"]
+            disk_entries, disk_bytes = 0, 0
+            if self._connection is not None:
+                disk_entries, disk_bytes = self._connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            return {
+                "memory_hits": self.counters["memory_hits"],
+                "disk_hits": self.counters["disk_hits"],
+                "misses": self.counters["misses"],
+                "hit_rate": hits / requests if requests else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _read(self, key):
+        if self._connection is None:
+            return None
+        try:
+            row = self._connection.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            return pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError) as e:
+            print(f"Lecture du cache disque impossible : {str(e)}")
+            return None
+
+    def _write(self, key, value):
+        if self._connection is None:
+            return
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if len(blob) > self.disk_size:
+                return
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()))
+            self._evict()
+            self._connection.commit()
+        except sqlite3.Error as e:
+            print(f"Écriture du cache disque impossible : {str(e)}")
+
+    def _evict(self):
+        """Supprime les résultats les moins récemment lus au-delà de disk_size"""
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.disk_size:
+            return
+        released = 0
+        doomed = []
+        for key, size in self._connection.execute(
+                "SELECT key, size FROM results ORDER BY accessed"):
+            if total - released <= self.disk_size:
+                break
+            doomed.append((key,))
+            released += size
+        self._connection.executemany("DELETE FROM results WHERE key = ?", doomed)
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+_engine_version = None
+
+
+def current_version():
+    """Version du moteur, calculée une fois par processus"""
+    global _engine_version
+    if _engine_version is None:
+        _engine_version = engine_version()
+    return _engine_version
+
+
+def default_cache():
+    """Cache partagé de l'application (base DEFAULT_CACHE_FILE)"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
+
+
+def set_default_cache(cache):
+    """Remplace le cache partagé (par exemple par un cache mémoire seul)"""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
+
+
+def cached_scenario(kind, values, compute, cache=None):
+    """
+    Résultat compute() d'un jeu d'entrées de feuil1 via le cache. `kind`
+    (sérialisable en JSON) désigne le calcul et ses paramètres.
+    """
+    # Les prêts détaillés ne font pas partie de la clé
+    if values.get("loans"):
+        return compute()
+    key = scenario_key(kind, values, current_version())
+    return (cache or default_cache()).get_or_compute(key, compute)
+
+
+def cached_batch(kind, e, compute, cache=None):
+    """Résultat compute() d'un lot de colonnes normalisées `e` via le cache"""
+    key = batch_key(kind, e, current_version())
+    return (cache or default_cache()).get_or_compute(key, compute)
+
+
+def cached_regime_costs(values, cache=None):
+    """regime_costs(values) via le cache"""
+    return cached_scenario("costs", values, lambda: regime_costs(values), cache)
+
+
+def cached_regime_summary(values, cache=None):
+    """regime_summary(values) via le cache"""
+    return cached_scenario("summary", values, lambda: regime_summary(values), cache)
+
+
+def cached_evaluate_batch(e, cache=None):
+    """evaluate_batch(e) (colonnes normalisées) via le cache"""
+    # Copie : le tableau en cache ne doit pas être modifié par l'appelant
+    return cached_batch("batch", e, lambda: evaluate_batch(e), cache).copy()
+
+
+def cache_stats():
+    return default_cache().stats()
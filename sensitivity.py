@@ -0,0 +1,97 @@
+"""
+Analyse de sensibilité (diagramme en tornade) des entrées de feuil1.
+
+Chaque entrée du formulaire de saisie est décalée de -x % puis de +x %
+(les options OUI/NON sont basculées) ; le scénario de référence et les
+26 scénarios perturbés sont évalués en un seul appel au moteur vectorisé.
+"""
+
+import numpy as np
+
+from fiscal_engine import (
+    FLAG_INPUTS, INPUT_CELLS, INPUT_KEYS, RATE_INPUTS, REGIMES, normalize_inputs,
+)
+from result_cache import cached_evaluate_batch
+
+DEFAULT_SHIFT = 0.10
+
+# Libellés du formulaire de saisie
+INPUT_LABELS = {
+    "acquisition_price": "Prix d'acquisition",
+    "works_cost": "Travaux",
+    "property_charges": "TF + charges loc.",
+    "insurance": "Assurance",
+    "rent": "Loyer mensuel",
+    "loan_amount": "Emprunt",
+    "loan_duration": "Durée emprunt",
+    "loan_rate": "Taux emprunt",
+    "marginal_tax_rate": "TMI perso./physique",
+    "selling_price": "Prix de cession",
+    "detention_duration": "Durée détention",
+    "sale_withdrawal": "Prél. prix de cession",
+    "cga": "CGA",
+}
+
+
+def _scenario(costs, value):
+    """Coûts d'un scénario, régime optimal et valeur de l'entrée"""
+    costs = dict(zip(REGIMES, costs.tolist()))
+    return {
+        "value": value,
+        "costs": costs,
+        "optimal": min(costs, key=costs.get),
+    }
+
+
+def _display_value(key, value):
+    """Valeur dans l'unité de saisie (OUI/NON, taux en %)"""
+    if key in FLAG_INPUTS:
+        return "OUI" if value else "NON"
+    if key in RATE_INPUTS:
+        return float(value) * 100
+    return float(value)
+
+
+def sensitivity_analysis(values, shift=DEFAULT_SHIFT, inputs=None):
+    """
+    Sensibilité des coûts globaux à chaque entrée (défaut : les 13 cellules).
+
+    Retourne un dictionnaire sérialisable en JSON : le scénario de
+    référence, puis une entrée par cellule avec les scénarios bas et haut
+    (valeur, coûts par régime, régime optimal), l'écart de coût par régime
+    (haut - bas) et l'écart maximal, triées par écart décroissant.
+    """
+    keys = list(inputs or INPUT_CELLS)
+    base = normalize_inputs(values)
+    size = 1 + 2 * len(keys)
+
+    # Ligne 0 : référence ; lignes 2i + 1 et 2i + 2 : entrée i basse et haute
+    columns = {key: np.full(size, base[key]) for key in INPUT_KEYS}
+    for i, key in enumerate(keys):
+        if key in FLAG_INPUTS:
+            columns[key][2 * i + 1:2 * i + 3] = (False, True)
+        else:
+            columns[key][2 * i + 1:2 * i + 3] = (base[key] * (1 - shift), base[key] * (1 + shift))
+    costs = cached_evaluate_batch(columns)
+
+    report = []
+    for i, key in enumerate(keys):
+        low = _scenario(costs[2 * i + 1], _display_value(key, columns[key][2 * i + 1]))
+        high = _scenario(costs[2 * i + 2], _display_value(key, columns[key][2 * i + 2]))
+        swing = {regime: high["costs"][regime] - low["costs"][regime] for regime in REGIMES}
+        report.append({
+            "input": key,
+            "cell": INPUT_CELLS.get(key),
+            "label": INPUT_LABELS.get(key, key),
+            "low": low,
+            "high": high,
+            "swing": swing,
+            "max_swing": max(abs(value) for value in swing.values()),
+        })
+    report.sort(key=lambda item: item["max_swing"], reverse=True)
+
+    return {
+        "shift": shift,
+        "base": _scenario(costs[0], None),
+        "inputs": report,
+    }
@@ -0,0 +1,389 @@
+"""
+Historique des simulations sauvegardées.
+
+Chaque simulation est une ligne ajoutée à une base SQLite (journal WAL,
+ajout en temps constant quelle que soit la taille de l'historique), indexée
+par date, option optimale et empreinte des entrées de feuil1. L'ancien
+historique Excel (historique_simulations.xlsx) est importé une seule fois ;
+l'export vers Excel ou CSV reste disponible à la demande.
+
+Les valeurs sont enregistrées typées (montants et taux numériques, options
+OUI/NON en 0/1) : toutes les entrées de feuil1, le coût global de chaque
+régime, l'option optimale et les indicateurs dérivés. Le formatage (« 245
+000 », « 3,5 % ») n'est appliqué qu'à l'affichage, et les agrégats sont
+calculés par la base.
+"""
+
+import csv
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from fiscal_engine import INPUT_CELLS, REGIMES, normalize_inputs
+from result_cache import scenario_key
+
+DEFAULT_STORE_FILE = "historique_simulations.sqlite3"
+LEGACY_HISTORY_FILE = "historique_simulations.xlsx"
+EXPORT_FILE = "historique_simulations_export.xlsx"
+SCHEMA_VERSION = 2
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"          # Dates enregistrées (triables)
+DISPLAY_DATE_FORMAT = "%d/%m/%Y %H:%M"     # Dates affichées et exportées
+
+
+def _cost_column(regime):
+    return "cost_" + re.sub(r"[^a-z0-9]+", "_", regime.lower()).strip("_")
+
+
+# Coût global de chaque régime : colonne de la base
+COST_COLUMNS = {regime: _cost_column(regime) for regime in REGIMES}
+
+# (colonne, type SQL, en-tête, format d'affichage)
+FIELDS = (
+    ("id", "INTEGER PRIMARY KEY AUTOINCREMENT", "ID", "id"),
+    ("created_at", "TEXT NOT NULL", "Date", "date"),
+    ("acquisition_price", "REAL", "Prix acquisition (€)", "currency"),
+    ("works_cost", "REAL", "Travaux (€)", "currency"),
+    ("property_charges", "REAL", "TF + charges loc. (€)", "currency"),
+    ("insurance", "REAL", "Assurance (€)", "currency"),
+    ("rent", "REAL", "Loyer mensuel (€)", "currency"),
+    ("loan_amount", "REAL", "Emprunt (€)", "currency"),
+    ("loan_duration", "REAL", "Durée emprunt (ans)", "number"),
+    ("loan_rate", "REAL", "Taux emprunt (%)", "rate"),
+    ("marginal_tax_rate", "REAL", "TMI (%)", "rate"),
+    ("selling_price", "REAL", "Prix cession (€)", "currency"),
+    ("detention_duration", "REAL", "Durée détention (ans)", "number"),
+    ("sale_withdrawal", "INTEGER", "Prél. prix de cession", "flag"),
+    ("cga", "INTEGER", "CGA", "flag"),
+    ("min_cost", "REAL", "Coût minimal (€)", "currency"),
+    ("optimal_option", "TEXT", "Option optimale", "text"),
+    ("gross_yield", "REAL", "Rentabilité brute (%)", "percent"),
+    ("roi", "REAL", "ROI estimé (%)", "percent"),
+    ("cashflow", "REAL", "Cash-flow annuel (€)", "currency"),
+) + tuple((column, "REAL", f"Coût {regime} (€)", "currency")
+          for regime, column in COST_COLUMNS.items()) + (
+    ("input_hash", "TEXT", "Empreinte des entrées", "text"),
+)
+
+COLUMNS = tuple(field[0] for field in FIELDS)
+HEADERS = tuple(field[2] for field in FIELDS)
+FORMATS = {field[0]: field[3] for field in FIELDS}
+# Colonnes affichées dans l'historique (l'empreinte n'est utile qu'aux requêtes)
+DISPLAY_COLUMNS = COLUMNS[:-1]
+RESULT_COLUMNS = ("min_cost", "optimal_option", "gross_yield", "roi", "cashflow")
+
+# Colonnes de l'ancien historique Excel (valeurs formatées)
+LEGACY_HEADERS = {
+    "Prix acquisition (€)": "acquisition_price",
+    "Travaux (€)": "works_cost",
+    "Emprunt (€)": "loan_amount",
+    "Prix cession (€)": "selling_price",
+    "Loyer mensuel (€)": "rent",
+    "Durée détention (ans)": "detention_duration",
+    "Coût minimal (€)": "min_cost",
+    "Option optimale": "optimal_option",
+    "Rentabilité brute (%)": "gross_yield",
+    "ROI estimé (%)": "roi",
+    "Cash-flow annuel (€)": "cashflow",
+}
+
+
+def input_hash(values):
+    """Empreinte canonique des entrées de feuil1 (indépendante du moteur)"""
+    return scenario_key("inputs", values, None)
+
+
+def parse_number(value):
+    """Montant formaté (« 245 000 », « 4,5 % ») ou nombre -> float, None si illisible"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = re.sub(r"[\s  €%]", "", str(value)).replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def display_date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT).strftime(DISPLAY_DATE_FORMAT)
+    except (TypeError, ValueError):
+        return value
+
+
+def _grouped(value, decimals=0):
+    text = f"{value:,.{decimals}f}".replace(",", " ")
+    return text.replace(".", ",")
+
+
+def format_value(column, value):
+    """Texte affiché pour une valeur enregistrée de `column`"""
+    if value is None:
+        return ""
+    kind = FORMATS.get(column, "text")
+    try:
+        if kind == "date":
+            return display_date(value)
+        if kind == "currency":
+            return f"{_grouped(round(value))} €"
+        if kind == "rate":
+            return f"{_grouped(value * 100, 2)} %"
+        if kind == "percent":
+            return f"{_grouped(value, 2)} %"
+        if kind == "number":
+            return _grouped(value) if float(value).is_integer() else _grouped(value, 2)
+        if kind == "flag":
+            return "OUI" if value else "NON"
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def format_row(row, columns=DISPLAY_COLUMNS):
+    """Ligne enregistrée -> textes affichés"""
+    return [format_value(column, value) for column, value in zip(columns, row)]
+
+
+class SimulationStore:
+    """Base des simulations ; `path` désigne le fichier SQLite (":memory:" pour un essai)"""
+
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL reste cohérent après une coupure (seule la dernière écriture peut manquer)
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._create_schema()
+
+    def _create_schema(self):
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        exists = self._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'simulations'").fetchone()
+        if exists and version < SCHEMA_VERSION:
+            self._connection.execute("ALTER TABLE simulations RENAME TO simulations_v1")
+            for index in ("created_at", "optimal_option", "input_hash"):
+                self._connection.execute(f"DROP INDEX IF EXISTS simulations_{index}")
+        columns = ", ".join(f"{name} {sql_type}" for name, sql_type, _, _ in FIELDS)
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS simulations ({columns})")
+        for index in ("created_at", "optimal_option", "input_hash", "min_cost"):
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS simulations_{index} ON simulations ({index})")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS imports ("
+            " path TEXT PRIMARY KEY, imported_at TEXT NOT NULL, rows INTEGER NOT NULL)")
+        if exists and version < SCHEMA_VERSION:
+            self._migrate_v1()
+        self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _migrate_v1(self):
+        """Reprend les lignes de la première version (montants enregistrés formatés)"""
+        cursor = self._connection.execute("SELECT * FROM simulations_v1 ORDER BY id")
+        names = [description[0] for description in cursor.description]
+        rows = []
+        for line in cursor:
+            row = dict(zip(names, line))
+            record = {column: row.get(column) for column in LEGACY_HEADERS.values()}
+            rows.append(self._legacy_values(row["id"], row["created_at"], record,
+                                            row.get("input_hash")))
+        self._insert_many(rows)
+        self._connection.execute("DROP TABLE simulations_v1")
+
+    def append(self, inputs, results, created_at=None):
+        """
+        Ajoute une simulation et retourne son identifiant. `inputs` : entrées
+        de feuil1 (clés du moteur) ; `results` : min_cost, optimal_option,
+        gross_yield, roi, cashflow et costs ({régime: coût global}).
+        """
+        created_at = created_at or datetime.now()
+        e = normalize_inputs(inputs)
+        values = {"created_at": created_at.strftime(DATE_FORMAT), "input_hash": input_hash(inputs)}
+        for key in INPUT_CELLS:
+            value = e[key]
+            values[key] = int(value) if isinstance(value, bool) else float(value)
+        for column in RESULT_COLUMNS:
+            value = results.get(column)
+            values[column] = value if column == "optimal_option" else parse_number(value)
+        costs = results.get("costs") or {}
+        for regime, column in COST_COLUMNS.items():
+            values[column] = parse_number(costs.get(regime))
+        names = list(values)
+        with self._lock:
+            cursor = self._connection.execute(
+                f"INSERT INTO simulations ({', '.join(names)}) "
+                f"VALUES ({', '.join('?' * len(names))})", [values[name] for name in names])
+            self._connection.commit()
+            return cursor.lastrowid
+
+    def count(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM simulations").fetchone()[0]
+
+    def rows(self, columns=DISPLAY_COLUMNS):
+        """Toutes les simulations (valeurs typées), dans l'ordre d'enregistrement"""
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT {', '.join(columns)} FROM simulations ORDER BY id").fetchall()
+
+    def page(self, offset, limit, order_by="id", descending=False, columns=DISPLAY_COLUMNS):
+        """
+        Simulations de rang offset à offset + limit, triées par la base
+        selon `order_by` (l'identifiant départage les égalités).
+        """
+        if order_by not in COLUMNS:
+            raise ValueError(f"Colonne inconnue : {order_by}")
+        direction = "DESC" if descending else "ASC"
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT {', '.join(columns)} FROM simulations"
+                f" ORDER BY {order_by} {direction}, id {direction} LIMIT ? OFFSET ?",
+                (limit, offset)).fetchall()
+
+    def latest(self, columns=DISPLAY_COLUMNS):
+        """Dernière simulation enregistrée, ou None"""
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT {', '.join(columns)} FROM simulations ORDER BY id DESC LIMIT 1").fetchone()
+
+    def statistics(self):
+        """
+        Agrégats calculés par la base : nombre de simulations, date de la
+        dernière, coût global moyen par régime et répartition des options
+        optimales (nombre, coût minimal moyen).
+        """
+        averages = ", ".join(f"AVG({column})" for column in COST_COLUMNS.values())
+        with self._lock:
+            count, latest, *costs = self._connection.execute(
+                f"SELECT COUNT(*), MAX(created_at), {averages} FROM simulations").fetchone()
+            options = self._connection.execute(
+                "SELECT optimal_option, COUNT(*), AVG(min_cost) FROM simulations"
+                " GROUP BY optimal_option ORDER BY COUNT(*) DESC").fetchall()
+        return {
+            "count": count,
+            "latest": latest,
+            "average_costs": dict(zip(COST_COLUMNS, costs)),
+            "optimal_options": [{"option": option, "count": number, "average_min_cost": average}
+                                for option, number, average in options],
+        }
+
+    def export(self, path):
+        """
+        Écrit l'historique complet dans `path` (.xlsx ou .csv). Les valeurs
+        restent numériques dans le classeur ; le CSV reçoit les textes affichés.
+        """
+        path = Path(path)
+        headers = [HEADERS[COLUMNS.index(column)] for column in DISPLAY_COLUMNS]
+        if path.suffix.lower() == ".csv":
+            with open(path, "w", newline="", encoding="utf-8-sig") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(headers)
+                writer.writerows(format_row(row) for row in self._iter_rows())
+            return path
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Historique")
+        sheet.append(headers)
+        for row in self._iter_rows():
+            row = list(row)
+            try:
+                row[1] = datetime.strptime(row[1], DATE_FORMAT)
+            except (TypeError, ValueError):
+                pass
+            sheet.append(row)
+        workbook.save(path)
+        return path
+
+    def import_excel(self, path=LEGACY_HISTORY_FILE):
+        """
+        Importe une seule fois un historique Excel de l'ancien format.
+        Retourne le nombre de lignes importées (0 si déjà importé ou absent).
+        """
+        path = Path(path)
+        if not path.exists():
+            return 0
+        key = str(path.absolute())
+        with self._lock:
+            if self._connection.execute("SELECT 1 FROM imports WHERE path = ?", (key,)).fetchone():
+                return 0
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            lines = workbook.worksheets[0].iter_rows(values_only=True)
+            headers = [str(header).strip() if header is not None else "" for header in next(lines, ())]
+            rows = []
+            for line in lines:
+                if not any(value is not None for value in line):
+                    continue
+                row = dict(zip(headers, line))
+                record = {column: row.get(header) for header, column in LEGACY_HEADERS.items()}
+                rows.append(self._legacy_values(None, self._parse_date(row.get("Date")), record))
+        finally:
+            workbook.close()
+
+        with self._lock:
+            with self._connection:
+                self._insert_many(rows)
+                self._connection.execute(
+                    "INSERT INTO imports (path, imported_at, rows) VALUES (?, ?, ?)",
+                    (key, datetime.now().strftime(DATE_FORMAT), len(rows)))
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def _legacy_values(row_id, created_at, record, digest=None):
+        values = {"id": row_id, "created_at": created_at, "input_hash": digest}
+        for column, value in record.items():
+            values[column] = value if column == "optimal_option" else parse_number(value)
+        return values
+
+    def _insert_many(self, rows):
+        if not rows:
+            return
+        names = list(rows[0])
+        self._connection.executemany(
+            f"INSERT INTO simulations ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+            [[row[name] for name in names] for row in rows])
+
+    def _iter_rows(self):
+        # Curseur dédié : l'export ne charge pas tout l'historique en mémoire
+        with self._lock:
+            cursor = self._connection.execute(
+                f"SELECT {', '.join(DISPLAY_COLUMNS)} FROM simulations ORDER BY id")
+            for row in cursor:
+                yield row
+
+    @staticmethod
+    def _parse_date(value):
+        if isinstance(value, datetime):
+            return value.strftime(DATE_FORMAT)
+        try:
+            return datetime.strptime(str(value).strip(), DISPLAY_DATE_FORMAT).strftime(DATE_FORMAT)
+        except (TypeError, ValueError):
+            return datetime.now().strftime(DATE_FORMAT)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Historique partagé de l'application ; l'ancien historique Excel y est importé"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = SimulationStore()
+            try:
+                imported = _default_store.import_excel()
+                if imported:
+                    print(f"{imported} simulations importées depuis {LEGACY_HISTORY_FILE}")
+            except Exception as e:
+                print(f"Import de l'historique Excel impossible : {str(e)}")
+        return _default_store
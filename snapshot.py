@@ -0,0 +1,176 @@
+"""
+Instantané binaire d'un classeur chargé, pour un démarrage immédiat.
+
+L'instantané est enregistré à côté du classeur (classeur.xlsm.snapshot) :
+
+    en-tête   magie, version, empreinte SHA-256 du classeur, taille et
+              date de modification du classeur, longueur des métadonnées
+    JSON      entrées de feuil1, coûts de la feuille web, synthèse par
+              régime, position et forme des matrices
+    matrices  float64 contigus, alignés sur 8 octets (projection annuelle)
+
+À l'ouverture, le fichier est projeté en mémoire (mmap) : les matrices
+sont lues sans copie. L'instantané est écarté dès que le classeur source
+a changé (taille ou date différentes et contenu différent).
+"""
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from formula_compiler import workbook_hash
+from projection import Projection
+
+MAGIC = b"LMNPSNAP"
+FORMAT_VERSION = 1
+SUFFIX = ".snapshot"
+_HEADER = struct.Struct("<8sHH32sQqI")
+_ALIGNMENT = 8
+
+# Matrices de la projection annuelle enregistrées
+PROJECTION_ARRAYS = Projection.ARRAYS
+
+
+def snapshot_path(workbook_path):
+    workbook_path = Path(workbook_path)
+    return workbook_path.with_name(workbook_path.name + SUFFIX)
+
+
+def _padding(size):
+    return -size % _ALIGNMENT
+
+
+def save_snapshot(workbook_path, inputs, costs=None, summary=None, projection=None):
+    """
+    Enregistre l'instantané du classeur `workbook_path` : entrées de
+    feuil1 (clés du moteur), coûts par régime, synthèse et matrices de la
+    projection (objet Projection). Retourne le chemin de l'instantané.
+    """
+    workbook_path = Path(workbook_path)
+    stat = workbook_path.stat()
+    digest = bytes.fromhex(workbook_hash(workbook_path))
+
+    arrays = {}
+    if projection is not None:
+        arrays = {name: np.ascontiguousarray(getattr(projection, name), dtype="<f8")
+                  for name in PROJECTION_ARRAYS}
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [offset, list(array.shape)]
+        offset += array.nbytes
+    metadata = json.dumps({
+        "workbook": workbook_path.name,
+        "inputs": inputs,
+        "costs": costs,
+        "summary": summary,
+        "arrays": layout,
+    }, default=str).encode("utf-8")
+
+    path = snapshot_path(workbook_path)
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, digest, stat.st_size,
+                                  stat.st_mtime_ns, len(metadata)))
+        handle.write(metadata)
+        handle.write(b"\0" * _padding(_HEADER.size + len(metadata)))
+        for array in arrays.values():
+            handle.write(array.tobytes())
+    os.replace(temporary, path)
+    return path
+
+
+class Snapshot:
+    """Instantané projeté en mémoire ; les matrices sont des vues sans copie"""
+
+    def __init__(self, path, handle, mapping, metadata, data_offset):
+        self.path = path
+        self._handle = handle
+        self._mapping = mapping
+        self.workbook = metadata.get("workbook")
+        self.inputs = metadata.get("inputs") or {}
+        self.costs = metadata.get("costs")
+        summary = metadata.get("summary")
+        self.summary = ({regime: tuple(values) for regime, values in summary.items()}
+                        if summary else None)
+        self.arrays = {}
+        for name, (offset, shape) in metadata.get("arrays", {}).items():
+            count = int(np.prod(shape)) if shape else 1
+            array = np.frombuffer(mapping, dtype="<f8", count=count,
+                                  offset=data_offset + offset).reshape(shape)
+            self.arrays[name] = array
+
+    def projection(self):
+        """Projection enregistrée (matrices copiées), ou None"""
+        if not all(name in self.arrays for name in PROJECTION_ARRAYS):
+            return None
+        return Projection.from_arrays(self.arrays)
+
+    def close(self):
+        self.arrays = {}
+        try:
+            self._mapping.close()
+        except BufferError:
+            # Des vues sur les matrices sont encore utilisées
+            return
+        self._handle.close()
+
+
+def _read_header(mapping):
+    if len(mapping) < _HEADER.size:
+        return None
+    header = _HEADER.unpack_from(mapping, 0)
+    if header[0] != MAGIC or header[1] != FORMAT_VERSION:
+        return None
+    return header
+
+
+def load_snapshot(workbook_path):
+    """
+    Instantané à jour du classeur `workbook_path`, ou None (absent,
+    illisible ou classeur modifié depuis ; un instantané périmé est
+    supprimé).
+    """
+    workbook_path = Path(workbook_path)
+    path = snapshot_path(workbook_path)
+    if not path.exists() or not workbook_path.exists():
+        return None
+    handle = open(path, "rb")
+    try:
+        mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        handle.close()
+        return None
+
+    try:
+        header = _read_header(mapping)
+        if header is None:
+            raise ValueError("format inconnu")
+        _, _, _, digest, size, mtime_ns, metadata_size = header
+        stat = workbook_path.stat()
+        # Taille et date identiques : pas besoin de relire le classeur
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            if bytes.fromhex(workbook_hash(workbook_path)) != digest:
+                mapping.close()
+                handle.close()
+                _discard(path)
+                return None
+        start = _HEADER.size
+        metadata = json.loads(bytes(mapping[start:start + metadata_size]).decode("utf-8"))
+        data_offset = start + metadata_size + _padding(start + metadata_size)
+        return Snapshot(path, handle, mapping, metadata, data_offset)
+    except (ValueError, KeyError, TypeError, struct.error) as e:
+        print(f"Instantané illisible ({path.name}) : {str(e)}")
+        mapping.close()
+        handle.close()
+        return None
+
+
+def _discard(path):
+    try:
+        path.unlink()
+    except OSError:
+        pass
@@ -1,19 +1,33 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-import win32com.client
 import os
 from pathlib import Path
 import sqlite3
 from datetime import datetime
 from tkinter import ttk, messagebox
 import locale
-from flask import Flask, render_template, jsonify, send_from_directory
+from flask import Flask, render_template, jsonify, send_from_directory, request
 from flask_cors import CORS
 import threading
 import webbrowser
 import time
 import sys
+from collections import OrderedDict
+
+from fiscal_engine import INPUT_CELLS, REGIMES, percent_to_rate, to_rate
+from result_cache import cache_stats, cached_regime_costs, cached_regime_summary
+from sensitivity import DEFAULT_SHIFT, sensitivity_analysis
+from calc_graph import FiscalGraph
+from cell_io import ComCellIO
+from workbook_backend import open_workbook
+from workbook_worker import WorkerBusyError, default_worker
+from snapshot import load_snapshot, save_snapshot
+from file_watcher import FileWatcher
+from background_tasks import Stage, StagedTask
+from simulation_store import (
+    COLUMNS, DISPLAY_COLUMNS, EXPORT_FILE, HEADERS, default_store, display_date, format_row,
+    format_value,
+)
 
 # Imports pour la sauvegarde Excel
 try:
@@ -32,6 +46,74 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+# Clé d'entrée du moteur pour chaque cellule de feuil1
+INPUT_KEYS_BY_CELL = {cell: key for key, cell in INPUT_CELLS.items()}
+
+def format_rate(value):
+    """Taux d'une cellule de feuil1 (fraction : 0,035) exprimé en pourcentage (« 3,50 »)"""
+    return f"{to_rate(value) * 100:.2f}".replace(".", ",")
+
+# Tous les accès au classeur passent par le thread qui en est propriétaire
+def read_workbook_inputs(workbook):
+    """Lecture des cellules d'entrée de la feuille feuil1 (une seule lecture COM)"""
+    return default_worker().call(_read_inputs, workbook, key=("read_inputs", id(workbook)))
+
+def _read_inputs(workbook):
+    return ComCellIO(workbook).read_inputs()
+
+def write_workbook_inputs(workbook, values):
+    """Écriture des saisies dans feuil1 ({cellule: valeur}), puis activation de la synthèse"""
+    return default_worker().call(_write_inputs, workbook, values)
+
+def _write_inputs(workbook, values):
+    # Calcul suspendu pendant l'écriture, puis un seul recalcul
+    timings = ComCellIO(workbook).write_inputs(values)
+    workbook.Sheets("synthese").Activate()
+    return timings
+
+def close_workbook(excel, workbook, save_changes=None):
+    """Fermeture du classeur (Excel décide de l'enregistrement si save_changes vaut None) et d'Excel"""
+    default_worker().call(_close_workbook, excel, workbook, save_changes)
+
+def _close_workbook(excel, workbook, save_changes):
+    try:
+        if workbook is not None:
+            if save_changes is None:
+                workbook.Close()
+            else:
+                workbook.Close(SaveChanges=save_changes)
+    finally:
+        if excel is not None:
+            excel.DisplayAlerts = False  # Éviter les pop-ups
+            excel.Quit()
+
+def write_snapshot(path, contents):
+    """Enregistre l'instantané du classeur (voir ExcelInterface.snapshot_contents)"""
+    try:
+        save_snapshot(path, *contents)
+    except Exception as e:
+        print(f"Impossible d'enregistrer l'instantané : {str(e)}")
+
+def compute_workbook_costs(workbook):
+    """Coûts globaux par régime calculés par le moteur natif (via le cache)"""
+    return cached_regime_costs(read_workbook_inputs(workbook))
+
+def compute_workbook_summary(workbook):
+    """Valeurs des tableaux de synthèse par régime, issues de la projection annuelle"""
+    return cached_regime_summary(read_workbook_inputs(workbook))
+
+# Correspondance des régimes affichés vers les régimes calculés
+REGIME_MAPPING = {
+    "micro nu": "micro nu + meublé",
+    "micro meublé": "micro nu + meublé",
+    "micro classé": "micro nu + meublé",
+    "SCI IS": "SCI IS",
+    "SCI IS PREL BONI": "SCI IS PREL BONI",
+    "SCI IR": "SCI IR",
+    "LMNP": "LMNP",
+    "LMNP CGA": "LMNP CGA"
+}
+
 class WebServer:
     def __init__(self):
         self.app = Flask(__name__, 
@@ -43,6 +125,7 @@ class WebServer:
         self.app.config['CORS_HEADERS'] = 'Content-Type'
         self.workbook = None
         self.cached_data = None 
+        self.cached_inputs = None
         self.lock = threading.Lock()
         self.main_thread_id = threading.current_thread().ident
         
@@ -55,7 +138,8 @@ class WebServer:
 
         @self.app.route('/api/data')
         def get_data():
-            if not self.workbook:
+            # Servies dès le chargement de l'instantané, avant le classeur
+            if not self.workbook and not self.cached_data:
                 return jsonify({"error": "No workbook loaded"}), 400
             
             try:
@@ -71,11 +155,40 @@ class WebServer:
         def refresh_data():
             """Force le rafraîchissement des données"""
             try:
-                self.update_cache()
+                # Rafraîchissements simultanés fusionnés en un seul, sur le thread du classeur
+                default_worker().submit(self.update_cache, key="refresh").result()
                 return jsonify({"status": "success", "message": "Données actualisées"})
+            except WorkerBusyError as e:
+                return jsonify({"status": "error", "message": str(e)}), 503
             except Exception as e:
                 return jsonify({"status": "error", "message": str(e)}), 500
 
+        @self.app.route('/api/sensitivity')
+        def get_sensitivity():
+            """Analyse de sensibilité des entrées (variation de ±shift %)"""
+            # Entrées du classeur ou de l'instantané, comme pour /api/data
+            with self.lock:
+                inputs = self.cached_inputs
+            if inputs is None:
+                if not self.workbook:
+                    return jsonify({"error": "No workbook loaded"}), 400
+                return jsonify({"error": "No data available"}), 404
+
+            try:
+                shift = float(request.args.get('shift', DEFAULT_SHIFT * 100)) / 100
+                return jsonify(sensitivity_analysis(inputs, shift))
+
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @self.app.route('/api/cache')
+        def get_cache_stats():
+            """Compteurs du cache des résultats (succès mémoire/disque, échecs)"""
+            try:
+                return jsonify(cache_stats())
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
         @self.app.after_request 
         def after_request(response):
             response.headers.add('Access-Control-Allow-Origin', '*')
@@ -96,67 +209,57 @@ class WebServer:
         except:
             return str(value)
 
-    def get_regime_values(self, regime, sheet):
+    def get_regime_values(self, regime, summary):
         try:
-            # Utilisation de la feuille web au lieu de synthese
-            web_sheet = self.workbook.Sheets("web")
-            
-            # Mapping des régimes vers leurs lignes dans la feuille web
-            regime_mapping = {
-                "micro nu": 2,           # Ligne 2 : micro nu + meublé
-                "micro meublé": 2,       # Ligne 2 : micro nu + meublé  
-                "micro classé": 2,       # Ligne 2 : micro nu + meublé
-                "SCI IS": 3,             # Ligne 3 : SCI IS
-                "SCI IS PREL BONI": 4,   # Ligne 4 : SCI IS PREL BONI
-                "SCI IR": 5,             # Ligne 5 : SCI IR
-                "LMNP": 2,               # Ligne 2 : micro nu + meublé (approximation)
-                "LMNP CGA": 2            # Ligne 2 : micro nu + meublé (approximation)
-            }
-            
-            row_num = regime_mapping.get(regime.lower().replace(" ", ""), 2)
-            
-            # Lecture du coût global depuis la feuille web (colonne B)
-            cost_global = web_sheet.Range(f"B{row_num}").Value or 0
+            # Valeurs issues de la projection annuelle du moteur natif
+            (average_40, average_detention, cost_40, cost_detention,
+             plus_value_40, plus_value_detention, total) = summary[REGIME_MAPPING.get(regime, REGIMES[0])]
             
             return [
                 regime,
-                cost_global / 40 if cost_global > 0 else 0,  # coût moyen annuel (40 ans)
-                cost_global / 20 if cost_global > 0 else 0,  # coût moyen annuel (durée estimation)
-                cost_global,  # coût global (40 ans)
-                cost_global,  # coût global (durée de détention)
-                0,  # fiscalité plus value (40 ans) - à ajuster selon vos besoins
-                0,  # fiscalité plus value (durée de détention) - à ajuster selon vos besoins
-                cost_global  # coût global total
+                average_40,  # coût moyen annuel (40 ans)
+                average_detention,  # coût moyen annuel (durée de détention)
+                cost_40,  # coût global (40 ans)
+                cost_detention,  # coût global (durée de détention)
+                plus_value_40,  # fiscalité plus value (40 ans)
+                plus_value_detention,  # fiscalité plus value (durée de détention)
+                total  # coût global total
             ]
 
         except Exception as e:
             print(f"Erreur dans get_regime_values pour {regime}: {str(e)}")
             return [regime] + [0] * 7
 
-    def update_cache(self):
+    def update_cache(self, inputs=None, summary=None):
+        """
+        Mise à jour du cache de l'API. Les entrées de feuil1 et la synthèse
+        peuvent être fournies par le graphe de calcul de l'interface ; à
+        défaut elles sont relues dans le classeur.
+        """
         try:
-            if not self.workbook:
-                return
-
-            sheet = self.workbook.Sheets("feuil1")
-            web_sheet = self.workbook.Sheets("web")
+            if inputs is None:
+                if not self.workbook:
+                    return
+                inputs = read_workbook_inputs(self.workbook)
+            if summary is None:
+                summary = cached_regime_summary(inputs)
 
             # Récupération des données d'entrée
             with self.lock:
                 input_data = {
-                    "Prix d'acquisition": f"{self.format_number(sheet.Range('c4').Value)} €",
-                    "Travaux": f"{self.format_number(sheet.Range('b51').Value)} €",
-                    "TF + charges loc.": f"{self.format_number(sheet.Range('b25').Value)} €",
-                    "Assurance": f"{self.format_number(sheet.Range('b26').Value)} €",
-                    "Loyer mensuel": f"{self.format_number(sheet.Range('c1').Value)} €",
-                    "Emprunt": f"{self.format_number(sheet.Range('b39').Value)} €",
-                    "Durée emprunt": f"{self.format_number(sheet.Range('b40').Value)} ans",
-                    "Taux emprunt": f"{self.format_number(sheet.Range('b43').Value)} %",
-                    "TMI perso./physique": f"{self.format_number(sheet.Range('c6').Value)} %",
-                    "Prix de cession": f"{self.format_number(sheet.Range('b47').Value)} €",
-                    "Durée détention": f"{self.format_number(sheet.Range('c3').Value)} ans",
-                    "Prél. prix de cession": sheet.Range("c2").Value,
-                    "CGA": sheet.Range("f3").Value
+                    "Prix d'acquisition": f"{self.format_number(inputs['acquisition_price'])} €",
+                    "Travaux": f"{self.format_number(inputs['works_cost'])} €",
+                    "TF + charges loc.": f"{self.format_number(inputs['property_charges'])} €",
+                    "Assurance": f"{self.format_number(inputs['insurance'])} €",
+                    "Loyer mensuel": f"{self.format_number(inputs['rent'])} €",
+                    "Emprunt": f"{self.format_number(inputs['loan_amount'])} €",
+                    "Durée emprunt": f"{self.format_number(inputs['loan_duration'])} ans",
+                    "Taux emprunt": f"{format_rate(inputs['loan_rate'])} %",
+                    "TMI perso./physique": f"{format_rate(inputs['marginal_tax_rate'])} %",
+                    "Prix de cession": f"{self.format_number(inputs['selling_price'])} €",
+                    "Durée détention": f"{self.format_number(inputs['detention_duration'])} ans",
+                    "Prél. prix de cession": inputs["sale_withdrawal"],
+                    "CGA": inputs["cga"]
                 }
 
                 fiscal_data = []
@@ -165,8 +268,9 @@ class WebServer:
                     "SCI IS PREL BONI", "SCI IR", "LMNP", "LMNP CGA"
                 ]
 
+                self.cached_inputs = inputs
                 for regime in regimes:
-                    values = self.get_regime_values(regime, web_sheet)
+                    values = self.get_regime_values(regime, summary)
                     fiscal_data.append({
                         "regime": regime,
                         "cout_moyen_40": f"{self.format_number(values[1])} €",
@@ -188,10 +292,19 @@ class WebServer:
         except Exception as e:
             print(f"Erreur lors de la mise à jour du cache: {str(e)}")
 
-    def set_workbook(self, workbook):
+    def clear_cache(self):
+        """Oublie les données servies (classeur fermé, remplacé ou ouverture abandonnée)"""
+        with self.lock:
+            self.cached_data = None
+            self.cached_inputs = None
+
+    def set_workbook(self, workbook, refresh=True):
         print("Setting workbook")
         self.workbook = workbook
-        self.update_cache()
+        if workbook is None:
+            self.clear_cache()
+        if refresh:
+            self.update_cache()
         print("Workbook set successfully")
 
     def run(self):
@@ -204,10 +317,12 @@ class WebServer:
 
 
 class DataEntryForm(tk.Toplevel):
-    def __init__(self, parent, workbook):
+    def __init__(self, parent, workbook, on_validate=None):
         super().__init__(parent)
         self.title("Saisie des Données - Analyse Fiscale Immobilière")
         self.workbook = workbook
+        # Appelé avec les entrées validées {clé moteur: valeur}
+        self.on_validate = on_validate
         
         # Configuration de la fenêtre
         self.geometry("1000x800")  # Augmenté pour voir tous les éléments
@@ -232,6 +347,8 @@ class DataEntryForm(tk.Toplevel):
         
         # Dictionnaire pour stocker les entrées
         self.entries = {}
+        # Unité de saisie de chaque champ (les "%" sont écrits en fraction)
+        self.units = {}
         
         # Configuration principale de la fenêtre
         self.rowconfigure(0, weight=0)  # Header fixe
@@ -440,6 +557,7 @@ class DataEntryForm(tk.Toplevel):
             
             entry.grid(row=0, column=0, padx=(0, 5), ipady=5)
             self.entries[cell] = entry
+            self.units[cell] = unit
             
             # Label d'unité
             unit_label = tk.Label(entry_frame,
@@ -566,8 +684,6 @@ class DataEntryForm(tk.Toplevel):
     def validate_form(self):
         """Validation du formulaire avec mise à jour web"""
         try:
-            sheet = self.workbook.Sheets("feuil1")
-            
             # Validation des champs obligatoires
             required_fields = ["c4", "c1", "c3"]  # Prix acquisition, loyer, durée
             missing_fields = []
@@ -584,7 +700,9 @@ class DataEntryForm(tk.Toplevel):
                                      "- Prix d'acquisition\n- Loyer mensuel\n- Durée de détention")
                 return
             
-            # Mise à jour des cellules Excel
+            # Mise à jour des cellules Excel, écrites en une seule affectation
+            values = {}
+            cell_values = {}
             for cell, entry in self.entries.items():
                 value = entry.get().strip()
                 if value:
@@ -592,27 +710,23 @@ class DataEntryForm(tk.Toplevel):
                         # Tentative de conversion en nombre
                         if value.upper() not in ["OUI", "NON"]:
                             value = float(value.replace(" ", "").replace(",", "."))
+                            # Taux saisis en % (3,5), enregistrés en fraction (0,035)
+                            if self.units.get(cell) == "%":
+                                value = percent_to_rate(value)
                     except ValueError:
                         pass
-                    sheet.Range(cell).Value = value
-            
-            # Activation de la feuille synthèse
-            self.workbook.Sheets("synthese").Activate()
-            
-            # Mise à jour du cache web via la méthode update_cache
+                    cell_values[cell] = value
+                    values[INPUT_KEYS_BY_CELL.get(cell, cell)] = value
+            # Écriture groupée, calcul suspendu, puis activation de la feuille synthèse
+            timings = write_workbook_inputs(self.workbook, cell_values)
+            print(f"Écriture des saisies : {timings['write'] * 1000:.1f} ms, "
+                  f"recalcul : {timings['recalc'] * 1000:.1f} ms")
+            
+            # Recalcul incrémental : seuls les affichages dont les valeurs
+            # ont changé sont rafraîchis (tableaux, récapitulatif, cache web)
             try:
-                main_window = self.master
-                if hasattr(main_window, 'web_server'):
-                    main_window.web_server.update_cache()
-                    print("Cache web mis à jour avec succès")
-                
-                # Mise à jour de l'interface principale
-                if hasattr(main_window, 'update_data_tree'):
-                    main_window.update_data_tree()
-                if hasattr(main_window, 'refresh_input_summary'):
-                    main_window.refresh_input_summary()
-                if hasattr(main_window, 'extract_web_data'):
-                    main_window.web_data = main_window.extract_web_data()
+                if self.on_validate:
+                    self.on_validate(values)
                     
             except Exception as e:
                 print(f"Erreur lors de la mise à jour: {str(e)}")
@@ -675,7 +789,7 @@ class DataEntryForm(tk.Toplevel):
     # === MÉTHODES DE SAUVEGARDE EXCEL ===
     
     def save_simulation(self):
-        """Sauvegarde dans un fichier Excel dédié aux simulations"""
+        """Sauvegarde de la simulation dans l'historique"""
         try:
             if not self.workbook:
                 messagebox.showwarning("Attention", "Aucun classeur Excel ouvert!")
@@ -688,53 +802,29 @@ class DataEntryForm(tk.Toplevel):
                 messagebox.showwarning("Attention", "Impossible de calculer les données de simulation")
                 return
             
-            # Chemin du fichier d'historique
-            history_file = "historique_simulations.xlsx"
-            
-            # Création ou ouverture du fichier
-            try:
-                if os.path.exists(history_file):
-                    df_existing = pd.read_excel(history_file)
-                else:
-                    df_existing = pd.DataFrame()
-            except Exception as e:
-                print(f"Erreur lors de la lecture du fichier existant: {e}")
-                df_existing = pd.DataFrame()
-            
-            # Nouvelle ligne de données
-            new_row = {
-                'ID': len(df_existing) + 1,
-                'Date': datetime.now().strftime('%d/%m/%Y %H:%M'),
-                'Prix acquisition (€)': self.format_currency(data.get('acquisition_price', 0)),
-                'Travaux (€)': self.format_currency(data.get('works_cost', 0)),
-                'Emprunt (€)': self.format_currency(data.get('loan_amount', 0)),
-                'Prix cession (€)': self.format_currency(data.get('selling_price', 0)),
-                'Loyer mensuel (€)': self.format_currency(data.get('rent', 0)),
-                'Durée détention (ans)': data.get('detention_duration', 0),
-                'Coût minimal (€)': self.format_currency(data.get('min_cost', 0)),
-                'Option optimale': data.get('optimal_option', ''),
-                'Rentabilité brute (%)': self.calculate_profitability(data),
-                'ROI estimé (%)': self.calculate_roi(data),
-                'Cash-flow annuel (€)': self.format_currency(self.calculate_cashflow(data))
+            # Résultats enregistrés tels quels (nombres) ; formatés à l'affichage
+            results = {
+                'min_cost': data.get('min_cost', 0),
+                'optimal_option': data.get('optimal_option', ''),
+                'gross_yield': self.calculate_profitability(data),
+                'roi': self.calculate_roi(data),
+                'cashflow': self.calculate_cashflow(data),
+                'costs': data.get('costs', {})
             }
             
-            # Ajout de la nouvelle ligne
-            if df_existing.empty:
-                df_new = pd.DataFrame([new_row])
-            else:
-                df_new = pd.concat([df_existing, pd.DataFrame([new_row])], ignore_index=True)
-            
-            # Sauvegarde simple
-            df_new.to_excel(history_file, index=False)
+            # Ajout en fin d'historique (base SQLite), sans relire les simulations précédentes
+            simulation_id = default_store().append(data['inputs'], results)
             
-            # Message de succès avec option d'ouvrir le fichier
+            # Message de succès avec option d'ouvrir l'historique dans Excel
             result = messagebox.askyesno("Succès", 
-                                       f"Simulation #{new_row['ID']} sauvegardée!\n\n"
-                                       f"Option optimale: {new_row['Option optimale']}\n"
-                                       f"Coût minimal: {new_row['Coût minimal (€)']}\n\n"
+                                       f"Simulation #{simulation_id} sauvegardée!\n\n"
+                                       f"Option optimale: {results['optimal_option']}\n"
+                                       f"Coût minimal: {format_value('min_cost', results['min_cost'])}\n\n"
                                        f"Voulez-vous ouvrir le fichier d'historique?")
             
             if result:
+                # Export à la demande de l'historique complet
+                history_file = default_store().export(EXPORT_FILE)
                 try:
                     os.startfile(history_file)  # Windows
                 except:
@@ -743,7 +833,7 @@ class DataEntryForm(tk.Toplevel):
                     except:
                         os.system(f"xdg-open {history_file}")  # Linux
             
-            return history_file
+            return simulation_id
             
         except Exception as e:
             print(f"Erreur lors de la sauvegarde: {str(e)}")
@@ -752,38 +842,31 @@ class DataEntryForm(tk.Toplevel):
     def calculate_simulation_data(self):
         """Calcule les données de la simulation"""
         try:
-            sheet = self.workbook.Sheets("feuil1")
-            web_sheet = self.workbook.Sheets("web")
-            
-            # Recherche de l'option optimale en utilisant la feuille web
-            regimes = [
-                ("micro nu + meublé", 2),    # Ligne 2 dans la feuille web
-                ("SCI IS", 3),               # Ligne 3 dans la feuille web
-                ("SCI IS PREL BONI", 4),     # Ligne 4 dans la feuille web
-                ("SCI IR", 5)                # Ligne 5 dans la feuille web
-            ]
+            inputs = read_workbook_inputs(self.workbook)
+            
+            # Recherche de l'option optimale avec le moteur natif
+            costs = cached_regime_costs(inputs)
             
             min_cost = float('inf')
             optimal_option = ""
             
-            for regime_name, row_num in regimes:
-                try:
-                    cost_value = web_sheet.Range(f"B{row_num}").Value
-                    if cost_value is not None and cost_value < min_cost:
-                        min_cost = cost_value
-                        optimal_option = regime_name
-                except:
-                    continue
+            for regime_name in REGIMES:
+                cost_value = costs[regime_name]
+                if cost_value < min_cost:
+                    min_cost = cost_value
+                    optimal_option = regime_name
             
             return {
-                'acquisition_price': sheet.Range("c4").Value or 0,
-                'works_cost': sheet.Range("b51").Value or 0,
-                'loan_amount': sheet.Range("b39").Value or 0,
-                'selling_price': sheet.Range("b47").Value or 0,
-                'rent': sheet.Range("c1").Value or 0,
-                'detention_duration': sheet.Range("c3").Value or 0,
+                'acquisition_price': inputs["acquisition_price"] or 0,
+                'works_cost': inputs["works_cost"] or 0,
+                'loan_amount': inputs["loan_amount"] or 0,
+                'selling_price': inputs["selling_price"] or 0,
+                'rent': inputs["rent"] or 0,
+                'detention_duration': inputs["detention_duration"] or 0,
                 'min_cost': min_cost if min_cost != float('inf') else 0,
-                'optimal_option': optimal_option or "Non défini"
+                'optimal_option': optimal_option or "Non défini",
+                'inputs': inputs,
+                'costs': costs
             }
             
         except Exception as e:
@@ -962,6 +1045,150 @@ class SummaryTable(ttk.Frame):
         self.input_tree.delete(*self.input_tree.get_children())
         self.fiscal_tree.delete(*self.fiscal_tree.get_children())
 
+class HistoryTable(ttk.Frame):
+    """
+    Tableau de l'historique des simulations affiché par fenêtre : seules
+    les lignes visibles sont dans le Treeview, lues page par page dans la
+    base au fil du défilement. Un clic sur un en-tête trie l'historique
+    dans la base (un second clic inverse l'ordre).
+    """
+
+    PAGE_SIZE = 200         # Lignes lues par requête
+    CACHED_PAGES = 8        # Pages gardées en mémoire
+
+    def __init__(self, parent, store, visible_rows=20):
+        super().__init__(parent)
+        self.store = store
+        self.columns = list(DISPLAY_COLUMNS)
+        self.headers = {column: HEADERS[COLUMNS.index(column)] for column in self.columns}
+        self.visible_rows = visible_rows
+        self.first = 0
+        self.total = 0
+        self.order_by = "id"
+        self.descending = False
+        self.pages = OrderedDict()
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=visible_rows)
+        for column in self.columns:
+            header = self.headers[column]
+            self.tree.heading(column, text=header, command=lambda c=column: self.sort_by(c))
+            # Ajustement de la largeur selon le contenu
+            if 'Date' in header or 'ID' in header:
+                self.tree.column(column, width=120, anchor="center")
+            elif '€' in header or '%' in header:
+                self.tree.column(column, width=140, anchor="center")
+            elif 'Option' in header:
+                self.tree.column(column, width=180, anchor="center")
+            else:
+                self.tree.column(column, width=100, anchor="center")
+
+        # La barre verticale représente tout l'historique, pas le contenu du Treeview
+        self.v_scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        h_scrollbar = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=h_scrollbar.set)
+
+        # Configuration des couleurs
+        self.tree.tag_configure('even', background='#f8f9fa')
+        self.tree.tag_configure('odd', background='white')
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.v_scrollbar.grid(row=0, column=1, sticky="ns")
+        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.yview("scroll", -3, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.yview("scroll", 3, "units"))
+        self.tree.bind("<Prior>", lambda event: self.yview("scroll", -1, "pages"))
+        self.tree.bind("<Next>", lambda event: self.yview("scroll", 1, "pages"))
+        self.tree.bind("<Configure>", self.on_resize)
+
+        self.refresh()
+
+    def refresh(self):
+        """Relit le nombre de simulations et la fenêtre affichée"""
+        self.total = self.store.count()
+        self.pages.clear()
+        self.render()
+
+    def sort_by(self, column):
+        """Trie l'historique par `column` (dans la base) et revient en tête"""
+        if column == self.order_by:
+            self.descending = not self.descending
+        else:
+            self.order_by, self.descending = column, False
+        for name in self.columns:
+            arrow = (" ▼" if self.descending else " ▲") if name == self.order_by else ""
+            self.tree.heading(name, text=self.headers[name] + arrow)
+        self.first = 0
+        self.pages.clear()
+        self.render()
+
+    def yview(self, *args):
+        """Commande de la barre de défilement (moveto / scroll)"""
+        if args[0] == "moveto":
+            first = int(float(args[1]) * self.total)
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            first = self.first + int(args[1]) * step
+        else:
+            return
+        first = max(0, min(first, self.total - self.visible_rows))
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def on_mousewheel(self, event):
+        self.yview("scroll", -3 * int(event.delta / 120), "units")
+        return "break"
+
+    def on_resize(self, event):
+        row_height = ttk.Style().lookup("Treeview", "rowheight") or 20
+        # En-tête compris ; au moins une ligne
+        rows = max(1, (event.height - int(row_height)) // int(row_height))
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.tree.configure(height=rows)
+            self.render()
+
+    def row(self, index):
+        """Ligne de rang `index` dans l'ordre courant (page lue si besoin)"""
+        number = index // self.PAGE_SIZE
+        if number in self.pages:
+            self.pages.move_to_end(number)
+        else:
+            self.pages[number] = self.store.page(number * self.PAGE_SIZE, self.PAGE_SIZE,
+                                                 self.order_by, self.descending, self.columns)
+            while len(self.pages) > self.CACHED_PAGES:
+                self.pages.popitem(last=False)
+        page = self.pages[number]
+        offset = index - number * self.PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def render(self):
+        """Affiche les lignes first à first + visible_rows en réutilisant les lignes du Treeview"""
+        rows = []
+        for index in range(self.first, min(self.first + self.visible_rows, self.total)):
+            row = self.row(index)
+            if row is None:
+                break
+            rows.append((index, row))
+        items = self.tree.get_children()
+        for position, (index, row) in enumerate(rows):
+            tag = 'odd' if index % 2 else 'even'
+            if position < len(items):
+                self.tree.item(items[position], values=format_row(row, self.columns), tags=(tag,))
+            else:
+                self.tree.insert("", "end", values=format_row(row, self.columns), tags=(tag,))
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+        if self.total:
+            self.v_scrollbar.set(self.first / self.total, (self.first + len(rows)) / self.total)
+        else:
+            self.v_scrollbar.set(0, 1)
+
+
 class ExcelInterface:
     def __init__(self, root):
         self.root = root
@@ -972,12 +1199,23 @@ class ExcelInterface:
         self.excel_path = None
         self.excel = None
         self.workbook = None
+        # Instantané du dernier chargement (affiché pendant l'ouverture)
+        self.snapshot = None
+        # Surveillance des modifications du fichier ouvert
+        self.file_watcher = None
+        # Ouverture en cours (étapes en arrière-plan)
+        self.open_task = None
         
         # Initialisation du serveur web
         self.web_server = WebServer()
         self.server_thread = None
         self.web_data = {}
         
+        # Graphe de calcul incrémental alimenté par les entrées de feuil1
+        self.workbook_inputs = {}
+        self.calc_graph = FiscalGraph()
+        self.calc_graph.subscribe(list(INPUT_CELLS) + ["summary"], self.on_results_changed)
+        
         # Couleurs
         self.COLORS = {
             'bg': "#F0F8FF",
@@ -1001,7 +1239,10 @@ class ExcelInterface:
         """Gestionnaire simple de fermeture de l'application"""
         try:
             print("Fermeture de l'application...")
+            if self.open_task and self.open_task.running:
+                self.open_task.cancel()
             self.close_excel_properly()
+            default_worker().stop(timeout=5)
             self.root.destroy()
         except Exception as e:
             print(f"Erreur lors de la fermeture: {str(e)}")
@@ -1009,6 +1250,7 @@ class ExcelInterface:
 
     def close_excel_properly(self):
         """Fermeture propre d'Excel"""
+        excel = self.excel
         try:
             print("Fermeture d'Excel...")
             
@@ -1017,18 +1259,18 @@ class ExcelInterface:
                 print("Arrêt du serveur web...")
                 self.server_thread = None
             
-            # Fermer le classeur
-            if self.workbook:
+            # L'API ne sert plus les données du classeur fermé
+            self.web_server.set_workbook(None, refresh=False)
+            
+            # L'enregistrement à la fermeture n'est pas une modification à relire
+            self.unwatch_workbook()
+            
+            # Fermer le classeur (Excel décide de sauvegarder ou non) puis l'application
+            if self.workbook or self.excel:
                 print("Fermeture du classeur Excel...")
-                self.workbook.Close()  # Laisse Excel décider de sauvegarder ou non
-                self.workbook = None
-            
-            # Fermer l'application Excel
-            if self.excel:
-                print("Fermeture de l'application Excel...")
-                self.excel.DisplayAlerts = False  # Éviter les pop-ups
-                self.excel.Quit()
-                self.excel = None
+                excel, workbook = self.excel, self.workbook
+                self.excel, self.workbook = None, None
+                close_workbook(excel, workbook)
                 
             print("Excel fermé avec succès")
             
@@ -1036,9 +1278,8 @@ class ExcelInterface:
             print(f"Erreur lors de la fermeture d'Excel: {str(e)}")
             # En cas d'erreur, essayer de forcer la fermeture
             try:
-                if self.excel:
-                    self.excel.Quit()
-                    self.excel = None
+                if excel:
+                    close_workbook(excel, None)
             except:
                 pass
 
@@ -1123,6 +1364,17 @@ class ExcelInterface:
                                   style="Header.TLabel")
         self.file_label.pack(side=tk.LEFT, padx=20)
         
+        # Progression de l'ouverture (affichée pendant le chargement)
+        self.progress_frame = ttk.Frame(header, style="Header.TFrame")
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode='determinate', length=200)
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+        self.progress_label = ttk.Label(self.progress_frame, text="", style="Header.TLabel")
+        self.progress_label.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = ttk.Button(self.progress_frame,
+                                     text="✖ Annuler",
+                                     command=self.cancel_open)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        
         # Boutons d'action
         buttons_frame = ttk.Frame(header, style="Header.TFrame")
         buttons_frame.pack(side=tk.RIGHT, padx=5)
@@ -1152,6 +1404,12 @@ class ExcelInterface:
                   text="📊 Historique",
                   command=self.show_simulation_history,
                   style="Green.TButton").pack(side=tk.LEFT, padx=5)
+        
+        # Bouton Analyse de sensibilité
+        ttk.Button(buttons_frame,
+                  text="📈 Sensibilité",
+                  command=self.show_sensitivity_analysis,
+                  style="Green.TButton").pack(side=tk.LEFT, padx=5)
     
     def create_data_tab(self, notebook):
         """Création de l'onglet des données Excel"""
@@ -1308,48 +1566,185 @@ class ExcelInterface:
             self.open_excel()
 
     def open_excel(self):
-        """Ouverture du fichier Excel sélectionné"""
-        try:
-            if self.excel:
+        """
+        Ouverture du fichier Excel sélectionné, par étapes exécutées en
+        arrière-plan : la fenêtre reste réactive et les tableaux sont
+        affichés dès que les résultats sont disponibles.
+        """
+        if self.open_task and self.open_task.running:
+            self.open_task.cancel()
+        self.unwatch_workbook()
+        
+        path = self.excel_path
+        previous = (self.excel, self.workbook)
+        self.excel = None
+        self.workbook = None
+        self.web_server.set_workbook(None, refresh=False)
+        self.disable_buttons()
+        # Classeur ouvert par cette tâche (à refermer en cas d'annulation)
+        opened = {}
+        
+        def close_previous(_):
+            if any(previous):
                 try:
-                    if self.workbook:
-                        self.workbook.Close(SaveChanges=False)
-                    self.excel.Quit()
-                except:
-                    pass
-            
-            self.excel = win32com.client.Dispatch("Excel.Application")
-            self.excel.Visible = False
-            self.excel.DisplayAlerts = False
-            
-            self.workbook = self.excel.Workbooks.Open(str(self.excel_path.absolute()))
-            
-            # Mise à jour immédiate du tableau avec les données de synthèse
-            self.update_data_tree()
-            
-            # Mise à jour des autres données
-            self.refresh_input_summary()
-            self.web_data = self.extract_web_data()
-            
-            # Configuration du serveur web
-            self.web_server.set_workbook(self.workbook)
+                    close_workbook(*previous, save_changes=False)
+                except Exception as e:
+                    print(f"Erreur lors de la fermeture du classeur précédent: {str(e)}")
+        
+        def open_file(_):
+            # Excel via COM si disponible, sinon lecture directe du fichier ;
+            # le classeur appartient au thread qui l'ouvre
+            return default_worker().call(open_workbook, path)
+        
+        def use_workbook(result):
+            self.excel, self.workbook = opened["workbook"] = result
+            # Configuration du serveur web, alimenté par le graphe de calcul
+            self.web_server.set_workbook(self.workbook, refresh=False)
+        
+        def discard_workbook(result):
+            default_worker().submit(_close_workbook, *result, False)
+        
+        def show_results(values):
+            # Lecture des entrées et mise à jour de tous les affichages
+            if not self.recalculate(values):
+                # Entrées identiques à l'instantané : aucun changement notifié
+                self.refresh_displays()
             self.start_web_server()
-            
-            # Activer les boutons une fois le fichier ouvert
             self.enable_buttons()
-            
+            return self.snapshot_contents()
+        
+        def store(contents):
+            write_snapshot(path, contents)
+        
+        stages = [
+            Stage("Fermeture du classeur précédent", close_previous),
+            # Instantané à jour : tableaux et API servis immédiatement
+            Stage("Lecture de l'instantané", lambda _: load_snapshot(path),
+                  apply=self.show_snapshot, discard=lambda snapshot: snapshot and snapshot.close()),
+            Stage("Ouverture du classeur", open_file,
+                  apply=use_workbook, discard=discard_workbook),
+            Stage("Lecture des entrées", lambda _: read_workbook_inputs(self.workbook),
+                  apply=show_results),
+            Stage("Enregistrement de l'instantané", store),
+        ]
+        
+        def done(_):
+            self.hide_progress()
+            self.watch_workbook()
             messagebox.showinfo("Succès", "Fichier Excel ouvert avec succès!")
-            
+        
+        def failed(error):
+            if task is self.open_task:
+                self.hide_progress()
+            messagebox.showerror("Erreur", f"Erreur lors de l'ouverture du fichier: {str(error)}")
+            self.release_workbook(opened.get("workbook"), current=task is self.open_task)
+        
+        def cancelled():
+            # Une ouverture remplacée par une nouvelle ne touche plus à l'affichage
+            if task is self.open_task:
+                self.hide_progress()
+            print("Ouverture annulée")
+            self.release_workbook(opened.get("workbook"), current=task is self.open_task)
+        
+        self.show_progress(len(stages))
+        task = self.open_task = StagedTask(self.root, stages,
+                                    on_progress=self.update_progress, on_done=done,
+                                    on_error=failed, on_cancel=cancelled).start()
+
+    def cancel_open(self):
+        """Annule l'ouverture en cours"""
+        if self.open_task and self.open_task.running:
+            self.progress_label.configure(text="Annulation...")
+            self.open_task.cancel()
+
+    def release_workbook(self, opened, current=True):
+        """
+        Referme le classeur ouvert par une ouverture interrompue. Si cette
+        ouverture est la dernière demandée, l'API cesse de servir ses données
+        (instantané compris).
+        """
+        if current:
+            self.web_server.set_workbook(None, refresh=False)
+        if opened is None or opened[1] is not self.workbook:
+            return
+        self.excel = None
+        self.workbook = None
+        self.web_server.set_workbook(None, refresh=False)
+        default_worker().submit(_close_workbook, *opened, False)
+        self.disable_buttons()
+
+    def show_progress(self, count):
+        self.progress_bar.configure(maximum=count, value=0)
+        self.progress_label.configure(text="")
+        self.progress_frame.pack(side=tk.LEFT, padx=10)
+
+    def update_progress(self, index, count, label):
+        self.progress_bar.configure(value=index)
+        self.progress_label.configure(text=f"{label}... ({index + 1}/{count})")
+
+    def hide_progress(self):
+        self.progress_frame.pack_forget()
+
+    def show_snapshot(self, snapshot):
+        """Affiche l'instantané du classeur s'il est à jour (sinon rien)"""
+        if self.snapshot:
+            self.snapshot.close()
+        self.snapshot = snapshot
+        if not self.snapshot:
+            return
+        print(f"Instantané chargé : {self.snapshot.path.name}")
+        values = self.snapshot.inputs
+        self.workbook_inputs.update(values)
+        self.calc_graph.set_values(values)
+        # Résultats enregistrés : rien n'est recalculé tant que les entrées
+        # ne changent pas (tableaux et API servis tels quels)
+        seeded = {"costs": self.snapshot.costs, "summary": self.snapshot.summary,
+                  "projection": self.snapshot.projection()}
+        self.calc_graph.seed({name: value for name, value in seeded.items() if value is not None})
+        # Les matrices sont copiées : le fichier peut être remplacé
+        self.snapshot.close()
+        if not self.calc_graph.recalculate():
+            self.refresh_displays()
+        self.start_web_server()
+
+    def refresh_displays(self):
+        """Rafraîchit tous les affichages, même sans changement de valeur"""
+        self.on_results_changed(dict.fromkeys(list(INPUT_CELLS) + ["summary"]))
+
+    def snapshot_contents(self):
+        """Entrées, coûts, synthèse et projection à enregistrer dans l'instantané"""
+        return (dict(self.workbook_inputs), self.calc_graph.get("costs"),
+                self.calc_graph.get("summary"), self.calc_graph.get("projection"))
+
+    def store_snapshot(self):
+        """Enregistre l'instantané du classeur ouvert pour le prochain démarrage"""
+        write_snapshot(self.excel_path, self.snapshot_contents())
+
+    def watch_workbook(self):
+        """Surveille le fichier ouvert ; une modification est traitée dans le thread Tk"""
+        self.unwatch_workbook()
+        self.file_watcher = FileWatcher(
+            self.excel_path, lambda path: self.root.after(0, self.on_workbook_changed))
+        self.file_watcher.start()
+
+    def unwatch_workbook(self):
+        if self.file_watcher:
+            self.file_watcher.stop(timeout=2)
+            self.file_watcher = None
+
+    def on_workbook_changed(self):
+        """Fichier modifié sur le disque : relecture des entrées et des seuls affichages concernés"""
+        if not self.workbook:
+            return
+        try:
+            print(f"Modification détectée : {self.excel_path.name}")
+            # Le backend fichier relit les valeurs ; Excel garde sa copie ouverte
+            if hasattr(self.workbook, "reload"):
+                default_worker().call(self.workbook.reload)
+            self.recalculate()
+            self.store_snapshot()
         except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur lors de l'ouverture du fichier: {str(e)}")
-            if self.excel:
-                try:
-                    self.excel.Quit()
-                except:
-                    pass
-            self.excel = None
-            self.workbook = None
-            self.disable_buttons()
+            print(f"Erreur lors de la relecture du classeur: {str(e)}")
 
     def enable_buttons(self):
         """Active les boutons après ouverture du fichier"""
@@ -1367,15 +1762,9 @@ class ExcelInterface:
         """Actualisation des données depuis Excel"""
         try:
             if self.workbook:
-                # Mise à jour du tableau principal avec les données de synthèse
-                self.update_data_tree()
-                
-                # Mise à jour des récapitulatifs
-                self.refresh_input_summary()
-                self.web_data = self.extract_web_data()
-                
-                # Forcer la mise à jour du web server
-                self.web_server.update_cache()
+                # Relecture des entrées : seuls les affichages concernés
+                # par une modification sont rafraîchis
+                self.recalculate()
                 
                 messagebox.showinfo("Succès", "Données actualisées avec succès!")
                 
@@ -1385,6 +1774,23 @@ class ExcelInterface:
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'actualisation: {str(e)}")
 
+    def recalculate(self, values=None):
+        """Met à jour le graphe de calcul (entrées relues dans feuil1 si non fournies)"""
+        if values is None:
+            values = read_workbook_inputs(self.workbook)
+        self.workbook_inputs.update(values)
+        self.calc_graph.set_values(values)
+        return self.calc_graph.recalculate()
+
+    def on_results_changed(self, changes):
+        """Rafraîchit les affichages dont les valeurs ont changé"""
+        if any(key in changes for key in INPUT_CELLS):
+            self.refresh_input_summary()
+        if "summary" in changes:
+            self.update_data_tree()
+            self.web_data = self.extract_web_data()
+        self.web_server.update_cache(dict(self.workbook_inputs), self.calc_graph.get("summary"))
+
     def update_data_tree(self, df=None):
         """Mise à jour du tableau principal des données avec la feuille web"""
         try:
@@ -1392,9 +1798,9 @@ class ExcelInterface:
             for item in self.data_tree.get_children():
                 self.data_tree.delete(item)
 
-            if self.workbook:
-                # Lecture de la feuille web
-                web_sheet = self.workbook.Sheets("web")
+            if self.workbook or self.snapshot:
+                # Synthèse par régime issue du graphe de calcul
+                summary = self.calc_graph.get("summary")
                 
                 # Configuration des colonnes basée sur la structure réelle
                 columns = [
@@ -1417,29 +1823,21 @@ class ExcelInterface:
                     self.data_tree.heading(col, text=col)
                     self.data_tree.column(col, width=column_widths[i], anchor="center")
                 
-                # Configuration des couleurs alternées
-                # Données des régimes avec leurs positions dans la feuille web
-                regime_rows = [
-                    (2, "micro nu + meublé"),
-                    (3, "SCI IS"),
-                    (4, "SCI IS PREL BONI"),
-                    (5, "SCI IR")
-                ]
-
-                # Insertion des données calculées depuis la feuille web
-                for row_num, regime_name in regime_rows:
+                # Insertion des données calculées par le moteur
+                for regime_name in REGIMES:
                     try:
-                        cost_global = web_sheet.Range(f"B{row_num}").Value or 0
+                        (average_40, average_detention, cost_40, cost_detention,
+                         plus_value_40, plus_value_detention, total) = summary[regime_name]
 
                         values = [
                             regime_name,
-                            self.format_number(cost_global / 40) if cost_global > 0 else "-",
-                            self.format_number(cost_global / 20) if cost_global > 0 else "-",
-                            self.format_number(cost_global),
-                            self.format_number(cost_global),
-                            "-",
-                            "-",
-                            self.format_number(cost_global)
+                            self.format_number(average_40) if average_40 > 0 else "-",
+                            self.format_number(average_detention) if average_detention > 0 else "-",
+                            self.format_number(cost_40),
+                            self.format_number(cost_detention),
+                            self.format_number(plus_value_40),
+                            self.format_number(plus_value_detention),
+                            self.format_number(total)
                         ]
 
                         tag = f"row_{len(self.data_tree.get_children()) % 2}"
@@ -1471,23 +1869,24 @@ class ExcelInterface:
     def refresh_input_summary(self):
         """Actualisation du récapitulatif des données saisies"""
         try:
-            if self.workbook:
-                sheet = self.workbook.Sheets("feuil1")
+            if self.workbook or self.snapshot:
+                # Entrées déjà lues pour le graphe de calcul
+                inputs = self.workbook_inputs
                 data = {
                     # Champ : [Valeur, Unité]
-                    "Prix d'acquisition": [sheet.Range("c4").Value, "€"],
-                    "Travaux": [sheet.Range("b51").Value, "€"],
-                    "TF + charges loc.": [sheet.Range("b25").Value, "€"],
-                    "Assurance": [sheet.Range("b26").Value, "€"],
-                    "Loyer mensuel": [sheet.Range("c1").Value, "€"],
-                    "Emprunt": [sheet.Range("b39").Value, "€"],
-                    "Durée emprunt": [sheet.Range("b40").Value, "années"],
-                    "Taux emprunt": [sheet.Range("b43").Value, "%"],
-                    "TMI perso./physique": [sheet.Range("c6").Value, "%"],
-                    "Prix de cession": [sheet.Range("b47").Value, "€"],
-                    "Durée détention": [sheet.Range("c3").Value, "années"],
-                    "Prél. prix de cession": [sheet.Range("c2").Value, "OUI/NON"],
-                    "CGA": [sheet.Range("f3").Value, "OUI/NON"]
+                    "Prix d'acquisition": [inputs.get("acquisition_price"), "€"],
+                    "Travaux": [inputs.get("works_cost"), "€"],
+                    "TF + charges loc.": [inputs.get("property_charges"), "€"],
+                    "Assurance": [inputs.get("insurance"), "€"],
+                    "Loyer mensuel": [inputs.get("rent"), "€"],
+                    "Emprunt": [inputs.get("loan_amount"), "€"],
+                    "Durée emprunt": [inputs.get("loan_duration"), "années"],
+                    "Taux emprunt": [inputs.get("loan_rate"), "%"],
+                    "TMI perso./physique": [inputs.get("marginal_tax_rate"), "%"],
+                    "Prix de cession": [inputs.get("selling_price"), "€"],
+                    "Durée détention": [inputs.get("detention_duration"), "années"],
+                    "Prél. prix de cession": [inputs.get("sale_withdrawal"), "OUI/NON"],
+                    "CGA": [inputs.get("cga"), "OUI/NON"]
                 }
 
                 # Nettoyage du tableau existant
@@ -1495,8 +1894,10 @@ class ExcelInterface:
                 
                 # Insertion des données avec leurs unités
                 for field, (value, unit) in data.items():
-                    # Formatage des valeurs numériques
-                    if isinstance(value, (int, float)) and unit not in ["OUI/NON"]:
+                    # Formatage des valeurs numériques (taux enregistrés en fraction)
+                    if unit == "%" and value is not None:
+                        formatted_value = format_rate(value)
+                    elif isinstance(value, (int, float)) and unit not in ["OUI/NON"]:
                         formatted_value = self.format_number(value)
                     else:
                         formatted_value = str(value) if value is not None else "-"
@@ -1507,25 +1908,17 @@ class ExcelInterface:
             print(f"Erreur lors de l'actualisation du récapitulatif des données: {str(e)}")
 
     def refresh_fiscal_summary(self):
-        """Actualisation du récapitulatif fiscal - UTILISE LA FEUILLE WEB"""
+        """Actualisation du récapitulatif fiscal - UTILISE LE MOTEUR NATIF"""
         try:
             if not self.workbook:
                 raise Exception("Aucun classeur Excel ouvert")
 
-            # MODIFICATION: Utilisation de la feuille "web" au lieu de "fiscalité"
-            web_sheet = self.workbook.Sheets("web")
+            # Synthèse par régime issue du graphe de calcul
+            summary = self.calc_graph.get("summary")
             
             # Nettoyage du tableau existant
             self.fiscal_tree.delete(*self.fiscal_tree.get_children())
             
-            # Définition des régimes avec leurs positions dans la feuille web
-            regimes = [
-                ("micro nu + meublé", 2),    # Ligne 2 dans la feuille web
-                ("SCI IS", 3),               # Ligne 3 dans la feuille web
-                ("SCI IS PREL BONI", 4),     # Ligne 4 dans la feuille web
-                ("SCI IR", 5)                # Ligne 5 dans la feuille web
-            ]
-            
             # Configuration du style
             style = ttk.Style()
             style.configure("Treeview.Heading",
@@ -1535,21 +1928,21 @@ class ExcelInterface:
                           padding=(5,15))
             
             # Récupération et insertion des données pour chaque régime
-            for regime_name, row_num in regimes:
+            for regime_name in REGIMES:
                 try:
-                    # Lecture du coût global depuis la colonne B de la feuille web
-                    cost_global = web_sheet.Range(f"B{row_num}").Value or 0
+                    (average_40, average_detention, cost_40, cost_detention,
+                     plus_value_40, plus_value_detention, total) = summary[regime_name]
                     
-                    # Calcul des autres valeurs basées sur le coût global
+                    # Valeurs lues dans la projection annuelle
                     values = [
                         regime_name,
-                        self.format_number(cost_global / 40) if cost_global > 0 else "-",  # Coût moyen annuel (40 ans)
-                        self.format_number(cost_global / 20) if cost_global > 0 else "-",  # Coût moyen annuel (durée détention - estimation)
-                        self.format_number(cost_global),  # Coût global (40 ans)
-                        self.format_number(cost_global),  # Coût global (durée détention)
-                        "-",  # Fiscalité plus value (40 ans) - données non disponibles dans feuille web
-                        "-",  # Fiscalité plus value (durée détention) - données non disponibles dans feuille web
-                        self.format_number(cost_global)   # Coût global total
+                        self.format_number(average_40) if average_40 > 0 else "-",  # Coût moyen annuel (40 ans)
+                        self.format_number(average_detention) if average_detention > 0 else "-",  # Coût moyen annuel (durée détention)
+                        self.format_number(cost_40),  # Coût global (40 ans)
+                        self.format_number(cost_detention),  # Coût global (durée détention)
+                        self.format_number(plus_value_40),  # Fiscalité plus value (40 ans)
+                        self.format_number(plus_value_detention),  # Fiscalité plus value (durée détention)
+                        self.format_number(total)   # Coût global total
                     ]
                     
                     # Insertion avec style alterné
@@ -1568,38 +1961,22 @@ class ExcelInterface:
             print(f"Erreur lors de l'actualisation du récapitulatif fiscal: {str(e)}")
             messagebox.showerror("Erreur", f"Erreur lors de l'actualisation : {str(e)}")
 
-    def get_regime_values(self, regime, sheet):
-        """Récupération des valeurs pour chaque régime - UTILISE LA FEUILLE WEB"""
+    def get_regime_values(self, regime, summary):
+        """Récupération des valeurs pour chaque régime - UTILISE LE MOTEUR NATIF"""
         try:
-            # Utilisation de la feuille web au lieu de synthese/fiscalité
-            web_sheet = self.workbook.Sheets("web")
-            
-            # Mapping des régimes vers leurs lignes dans la feuille web
-            regime_mapping = {
-                "micro nu": 2,           # Ligne 2 : micro nu + meublé
-                "micro meublé": 2,       # Ligne 2 : micro nu + meublé  
-                "micro classé": 2,       # Ligne 2 : micro nu + meublé
-                "SCI IS": 3,             # Ligne 3 : SCI IS
-                "SCI IS PREL BONI": 4,   # Ligne 4 : SCI IS PREL BONI
-                "SCI IR": 5,             # Ligne 5 : SCI IR
-                "LMNP": 2,               # Ligne 2 : micro nu + meublé (approximation)
-                "LMNP CGA": 2            # Ligne 2 : micro nu + meublé (approximation)
-            }
-            
-            row_num = regime_mapping.get(regime.lower().replace(" ", ""), 2)
-            
-            # Lecture du coût global depuis la feuille web (colonne B)
-            cost_global = web_sheet.Range(f"B{row_num}").Value or 0
+            # Valeurs issues de la projection annuelle du moteur natif
+            (average_40, average_detention, cost_40, cost_detention,
+             plus_value_40, plus_value_detention, total) = summary[REGIME_MAPPING.get(regime, REGIMES[0])]
             
             return [
                 regime,
-                cost_global / 40 if cost_global > 0 else 0,  # coût moyen annuel (40 ans)
-                cost_global / 20 if cost_global > 0 else 0,  # coût moyen annuel (durée estimation)
-                cost_global,  # coût global (40 ans)
-                cost_global,  # coût global (durée de détention)
-                0,  # fiscalité plus value (40 ans) - données non disponibles
-                0,  # fiscalité plus value (durée de détention) - données non disponibles
-                cost_global  # coût global total
+                average_40,  # coût moyen annuel (40 ans)
+                average_detention,  # coût moyen annuel (durée de détention)
+                cost_40,  # coût global (40 ans)
+                cost_detention,  # coût global (durée de détention)
+                plus_value_40,  # fiscalité plus value (40 ans)
+                plus_value_detention,  # fiscalité plus value (durée de détention)
+                total  # coût global total
             ]
             
         except Exception as e:
@@ -1611,7 +1988,7 @@ class ExcelInterface:
         if not self.workbook:
             messagebox.showerror("Erreur", "Veuillez d'abord ouvrir un fichier Excel!")
             return
-        DataEntryForm(self.root, self.workbook)
+        DataEntryForm(self.root, self.workbook, on_validate=self.recalculate)
 
     def show_fiscal_synthesis(self):
         """Affichage de la synthèse fiscale"""
@@ -1628,8 +2005,8 @@ class ExcelInterface:
             self.server_thread.daemon = True
             
             try:
+                # Pas d'attente : le serveur se met en écoute en arrière-plan
                 self.server_thread.start()
-                time.sleep(2)
                 print("Serveur web démarré avec succès")
             except Exception as e:
                 print(f"Erreur lors du démarrage du serveur web: {str(e)}")
@@ -1648,44 +2025,112 @@ class ExcelInterface:
             messagebox.showerror("Erreur", f"Erreur lors de l'ouverture de la version web: {str(e)}")
 
     def extract_web_data(self):
-        """Extrait les données principales de la feuille 'web'."""
+        """Extrait les coûts globaux par régime (équivalent de la feuille 'web')."""
         data = {}
-        if not self.workbook:
+        if not self.workbook and not self.snapshot:
             return data
         try:
-            sheet = self.workbook.Sheets("web")
-            regimes = {
-                "micro nu + meublé": 2,
-                "SCI IS": 3,
-                "SCI IS PREL BONI": 4,
-                "SCI IR": 5,
-            }
-            for name, row in regimes.items():
-                value = sheet.Range(f"B{row}").Value or 0
-                data[name] = value
+            data.update(self.calc_graph.get("costs"))
         except Exception as e:
             print(f"Erreur lors de l'extraction des données de la feuille web: {str(e)}")
         return data
+
+    def show_sensitivity_analysis(self):
+        """Affiche l'analyse de sensibilité des entrées (tornade)"""
+        try:
+            if not self.workbook:
+                messagebox.showwarning("Attention", "Aucun fichier Excel ouvert!")
+                return
+
+            inputs = read_workbook_inputs(self.workbook)
+
+            window = tk.Toplevel(self.root)
+            window.title("📈 Analyse de Sensibilité")
+            window.geometry("1400x600")
+            window.configure(bg="#f8f9fa")
+
+            main_frame = tk.Frame(window, bg="#f8f9fa")
+            main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+            # Choix de la variation appliquée à chaque entrée
+            options_frame = tk.Frame(main_frame, bg="#f8f9fa")
+            options_frame.pack(fill=tk.X, pady=(0, 10))
+            tk.Label(options_frame,
+                     text="Variation des entrées (± %) :",
+                     font=('Segoe UI', 11),
+                     bg="#f8f9fa").pack(side=tk.LEFT)
+            shift_var = tk.StringVar(value=str(int(DEFAULT_SHIFT * 100)))
+            tk.Spinbox(options_frame, from_=1, to=50, width=5,
+                       textvariable=shift_var).pack(side=tk.LEFT, padx=10)
+            summary_label = tk.Label(options_frame, text="",
+                                     font=('Segoe UI', 10),
+                                     bg="#f8f9fa", fg="#6c757d")
+
+            table_frame = tk.Frame(main_frame, bg="white", relief="solid", bd=1)
+            table_frame.pack(fill=tk.BOTH, expand=True)
+            columns = (["Entrée", "Valeur basse", "Valeur haute"]
+                       + [f"Δ {regime}" for regime in REGIMES]
+                       + ["Optimal bas", "Optimal haut"])
+            tree = self.create_treeview(table_frame, columns)
+            tree.column("Entrée", width=180, anchor="w")
+
+            def display(value):
+                # Taux et durées gardent leurs décimales, montants arrondis
+                if isinstance(value, str):
+                    return value
+                if abs(value) < 100:
+                    return f"{value:.2f}".rstrip("0").rstrip(".")
+                return self.format_number(value)
+
+            def refresh():
+                try:
+                    shift = float(shift_var.get().replace(",", ".")) / 100
+                except ValueError:
+                    messagebox.showerror("Erreur", "Variation invalide", parent=window)
+                    return
+                report = sensitivity_analysis(inputs, shift)
+                tree.delete(*tree.get_children())
+                for i, item in enumerate(report["inputs"]):
+                    low, high = item["low"], item["high"]
+                    values = ([item["label"], display(low["value"]), display(high["value"])]
+                              + [self.format_number(item["swing"][regime]) for regime in REGIMES]
+                              + [low["optimal"], high["optimal"]])
+                    tag = 'changed' if low["optimal"] != high["optimal"] else ('odd' if i % 2 else 'even')
+                    tree.insert("", "end", values=values, tags=(tag,))
+                summary_label.configure(text=f"Régime optimal de référence : {report['base']['optimal']}")
+
+            tree.tag_configure('even', background='#f8f9fa')
+            tree.tag_configure('odd', background='white')
+            tree.tag_configure('changed', background='#FFF3CD')
+
+            tk.Button(options_frame,
+                      text="🔄 Calculer",
+                      command=refresh,
+                      font=('Segoe UI', 10, 'bold'),
+                      bg="#17a2b8",
+                      fg="white",
+                      relief="flat",
+                      padx=15,
+                      cursor="hand2").pack(side=tk.LEFT, padx=10)
+            summary_label.pack(side=tk.LEFT, padx=20)
+
+            refresh()
+
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Erreur lors de l'analyse de sensibilité: {str(e)}")
 
     # === MÉTHODES DE GESTION DE L'HISTORIQUE ===
     
     def show_simulation_history(self):
         """Affiche l'historique des simulations dans une nouvelle fenêtre"""
         try:
-            history_file = "historique_simulations.xlsx"
+            store = default_store()
             
-            if not os.path.exists(history_file):
+            if not store.count():
                 messagebox.showinfo("Info", "Aucun historique de simulations trouvé.\n"
                                           "Effectuez et sauvegardez une simulation d'abord.")
                 return
             
-            # Lecture des données
-            df = pd.read_excel(history_file)
-            
-            if df.empty:
-                messagebox.showinfo("Info", "L'historique des simulations est vide.")
-                return
-            
             # Création de la fenêtre d'historique
             history_window = tk.Toplevel(self.root)
             history_window.title("📊 Historique des Simulations")
@@ -1708,44 +2153,9 @@ class ExcelInterface:
             table_frame = tk.Frame(main_frame, bg="white", relief="solid", bd=1)
             table_frame.pack(fill=tk.BOTH, expand=True)
             
-            # Création du Treeview
-            columns = list(df.columns)
-            tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=20)
-            
-            # Configuration des colonnes
-            for col in columns:
-                tree.heading(col, text=col)
-                # Ajustement de la largeur selon le contenu
-                if 'Date' in col or 'ID' in col:
-                    tree.column(col, width=120, anchor="center")
-                elif '€' in col or '%' in col:
-                    tree.column(col, width=140, anchor="center")
-                elif 'Option' in col:
-                    tree.column(col, width=180, anchor="center")
-                else:
-                    tree.column(col, width=100, anchor="center")
-            
-            # Scrollbars
-            v_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-            h_scrollbar = ttk.Scrollbar(table_frame, orient="horizontal", command=tree.xview)
-            tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-            
-            # Insertion des données avec couleurs alternées
-            for i, (_, row) in enumerate(df.iterrows()):
-                tag = 'odd' if i % 2 else 'even'
-                tree.insert("", "end", values=list(row), tags=(tag,))
-            
-            # Configuration des couleurs
-            tree.tag_configure('even', background='#f8f9fa')
-            tree.tag_configure('odd', background='white')
-            
-            # Placement du tableau et scrollbars
-            tree.grid(row=0, column=0, sticky="nsew")
-            v_scrollbar.grid(row=0, column=1, sticky="ns")
-            h_scrollbar.grid(row=1, column=0, sticky="ew")
-            
-            table_frame.grid_rowconfigure(0, weight=1)
-            table_frame.grid_columnconfigure(0, weight=1)
+            # Tableau virtuel : seules les lignes visibles sont lues et affichées
+            table = HistoryTable(table_frame, store)
+            table.pack(fill=tk.BOTH, expand=True)
             
             # Frame pour les boutons d'action
             action_frame = tk.Frame(main_frame, bg="#f8f9fa")
@@ -1754,7 +2164,7 @@ class ExcelInterface:
             # Boutons d'action
             export_btn = tk.Button(action_frame,
                                  text="📤 Exporter",
-                                 command=lambda: self.export_history(df),
+                                 command=self.export_history,
                                  font=('Segoe UI', 11, 'bold'),
                                  bg="#28a745",
                                  fg="white",
@@ -1788,11 +2198,15 @@ class ExcelInterface:
                                 cursor="hand2")
             close_btn.pack(side=tk.RIGHT, padx=10)
             
-            # Statistiques rapides
-            stats_text = f"Total des simulations: {len(df)}"
-            if len(df) > 0:
-                latest_date = df['Date'].iloc[-1] if 'Date' in df.columns else "N/A"
-                stats_text += f" | Dernière simulation: {latest_date}"
+            # Statistiques rapides, calculées par la base
+            statistics = store.statistics()
+            stats_text = f"Total des simulations: {statistics['count']}"
+            if statistics['latest']:
+                stats_text += f" | Dernière simulation: {display_date(statistics['latest'])}"
+            if statistics['optimal_options']:
+                best = statistics['optimal_options'][0]
+                stats_text += (f" | Option la plus fréquente: {best['option']} "
+                               f"({best['count']} simulations)")
             
             stats_label = tk.Label(action_frame,
                                  text=stats_text,
@@ -1804,7 +2218,7 @@ class ExcelInterface:
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de l'affichage de l'historique: {str(e)}")
 
-    def export_history(self, df):
+    def export_history(self):
         """Exporte l'historique vers un fichier choisi par l'utilisateur"""
         try:
             file_path = filedialog.asksaveasfilename(
@@ -1814,10 +2228,7 @@ class ExcelInterface:
             )
             
             if file_path:
-                if file_path.endswith('.xlsx'):
-                    df.to_excel(file_path, index=False)
-                else:
-                    df.to_csv(file_path, index=False, encoding='utf-8-sig')
+                default_store().export(file_path)
                 
                 messagebox.showinfo("Succès", f"Historique exporté vers:\n{file_path}")
                 
@@ -1832,10 +2243,8 @@ class ExcelInterface:
     def __del__(self):
         """Nettoyage des ressources à la fermeture"""
         try:
-            if self.workbook:
-                self.workbook.Close(SaveChanges=True)
-            if self.excel:
-                self.excel.Quit()
+            if self.workbook or self.excel:
+                close_workbook(self.excel, self.workbook, save_changes=True)
 
             # Arrêter le serveur web si nécessaire
             if self.server_thread:
@@ -2081,40 +2490,32 @@ class FiscalSynthesisInterface:
             return str(value)
 
     def show_results(self):
-        """MODIFICATION: Utilise la feuille web au lieu de fiscalité"""
+        """Affiche la synthèse calculée par le moteur natif"""
         try:
             if self.workbook:
-                # MODIFICATION: Utilisation de la feuille "web" au lieu de "fiscalité"
-                web_sheet = self.workbook.Sheets("web")
+                # Synthèse par régime issue de la projection annuelle du moteur natif
+                summary = compute_workbook_summary(self.workbook)
                 
                 # Nettoyer le tableau existant
                 for item in self.tree.get_children():
                     self.tree.delete(item)
-                    
-                # Données des régimes avec leurs positions dans la feuille web
-                regimes = [
-                    ("micro nu + meublé", 2),    # Ligne 2 dans la feuille web
-                    ("SCI IS", 3),               # Ligne 3 dans la feuille web
-                    ("SCI IS PREL BONI", 4),     # Ligne 4 dans la feuille web
-                    ("SCI IR", 5)                # Ligne 5 dans la feuille web
-                ]
                 
                 # Remplir le tableau avec les données
-                for idx, (regime_name, row_num) in enumerate(regimes):
+                for idx, regime_name in enumerate(REGIMES):
                     try:
-                        # Lecture du coût global depuis la colonne B de la feuille web
-                        cost_global = web_sheet.Range(f"B{row_num}").Value or 0
+                        (average_40, average_detention, cost_40, cost_detention,
+                         plus_value_40, plus_value_detention, total) = summary[regime_name]
                         
-                        # Calcul des autres valeurs basées sur le coût global
+                        # Valeurs lues dans la projection annuelle
                         values = [
                             regime_name,
-                            self.format_number(cost_global / 40) if cost_global > 0 else "-",  # Coût moyen annuel (40 ans)
-                            self.format_number(cost_global / 20) if cost_global > 0 else "-",  # Coût moyen annuel (durée détention - estimation)
-                            self.format_number(cost_global),  # Coût global (40 ans)
-                            self.format_number(cost_global),  # Coût global (durée détention)
-                            "-",  # Fiscalité plus value (40 ans) - données non disponibles dans feuille web
-                            "-",  # Fiscalité plus value (durée détention) - données non disponibles dans feuille web
-                            self.format_number(cost_global)   # Coût global total
+                            self.format_number(average_40) if average_40 > 0 else "-",  # Coût moyen annuel (40 ans)
+                            self.format_number(average_detention) if average_detention > 0 else "-",  # Coût moyen annuel (durée détention)
+                            self.format_number(cost_40),  # Coût global (40 ans)
+                            self.format_number(cost_detention),  # Coût global (durée détention)
+                            self.format_number(plus_value_40),  # Fiscalité plus value (40 ans)
+                            self.format_number(plus_value_detention),  # Fiscalité plus value (durée détention)
+                            self.format_number(total)   # Coût global total
                         ]
                         
                         tag = f"row_{idx % 2}"
@@ -2134,38 +2535,22 @@ class FiscalSynthesisInterface:
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors du chargement des données: {str(e)}")
 
-    def get_regime_values(self, regime, sheet):
-        """MODIFICATION: Utilise la feuille web pour récupérer les valeurs"""
+    def get_regime_values(self, regime, summary):
+        """Récupération des valeurs pour chaque régime - UTILISE LE MOTEUR NATIF"""
         try:
-            # Utilisation de la feuille web au lieu de synthese/fiscalité
-            web_sheet = self.workbook.Sheets("web")
-            
-            # Mapping des régimes vers leurs lignes dans la feuille web
-            regime_mapping = {
-                "micro nu": 2,           # Ligne 2 : micro nu + meublé
-                "micro meublé": 2,       # Ligne 2 : micro nu + meublé  
-                "micro classé": 2,       # Ligne 2 : micro nu + meublé
-                "SCI IS": 3,             # Ligne 3 : SCI IS
-                "SCI IS PREL BONI": 4,   # Ligne 4 : SCI IS PREL BONI
-                "SCI IR": 5,             # Ligne 5 : SCI IR
-                "LMNP": 2,               # Ligne 2 : micro nu + meublé (approximation)
-                "LMNP CGA": 2            # Ligne 2 : micro nu + meublé (approximation)
-            }
-            
-            row_num = regime_mapping.get(regime.lower().replace(" ", ""), 2)
-            
-            # Lecture du coût global depuis la feuille web (colonne B)
-            cost_global = web_sheet.Range(f"B{row_num}").Value or 0
+            # Valeurs issues de la projection annuelle du moteur natif
+            (average_40, average_detention, cost_40, cost_detention,
+             plus_value_40, plus_value_detention, total) = summary[REGIME_MAPPING.get(regime, REGIMES[0])]
             
             return [
                 regime,
-                cost_global / 40 if cost_global > 0 else 0,  # coût moyen annuel (40 ans)
-                cost_global / 20 if cost_global > 0 else 0,  # coût moyen annuel (durée estimation)
-                cost_global,  # coût global (40 ans)
-                cost_global,  # coût global (durée de détention)
-                0,  # fiscalité plus value (40 ans) - données non disponibles
-                0,  # fiscalité plus value (durée de détention) - données non disponibles
-                cost_global  # coût global total
+                average_40,  # coût moyen annuel (40 ans)
+                average_detention,  # coût moyen annuel (durée de détention)
+                cost_40,  # coût global (40 ans)
+                cost_detention,  # coût global (durée de détention)
+                plus_value_40,  # fiscalité plus value (40 ans)
+                plus_value_detention,  # fiscalité plus value (durée de détention)
+                total  # coût global total
             ]
             
         except Exception as e:
@@ -2178,23 +2563,17 @@ class FiscalSynthesisInterface:
             if not self.workbook:
                 return []
                 
-            sheet = self.workbook.Sheets("feuil1")
-            web_sheet = self.workbook.Sheets("web")
+            inputs = read_workbook_inputs(self.workbook)
             
             # Récupération des données de base
-            loyer_mensuel = sheet.Range("c1").Value
-            duree_detention = sheet.Range("c3").Value
+            loyer_mensuel = inputs["rent"]
+            duree_detention = inputs["detention_duration"]
             
             # Calcul du revenu global
             revenu_global = loyer_mensuel * 12 * duree_detention
             
-            # Liste des régimes et leurs coûts globaux depuis la feuille web
-            regimes_data = [
-                ("micro nu + meublé", web_sheet.Range("B2").Value or 0),
-                ("SCI IS", web_sheet.Range("B3").Value or 0),
-                ("SCI IS PREL BONI", web_sheet.Range("B4").Value or 0),
-                ("SCI IR", web_sheet.Range("B5").Value or 0)
-            ]
+            # Liste des régimes et leurs coûts globaux calculés par le moteur
+            regimes_data = list(cached_regime_costs(inputs).items())
             
             # Calcul des résultats
             results = []
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+
+import result_cache  # noqa: E402
+from fiscal_engine import REGIMES  # noqa: E402
+from test1 import WebServer, format_rate  # noqa: E402
+
+INPUTS = {
+    "acquisition_price": 245000, "works_cost": 12500, "property_charges": 1800,
+    "insurance": 350, "rent": 950, "loan_amount": 200000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 290000,
+    "detention_duration": 15, "sale_withdrawal": "NON", "cga": "OUI",
+}
+SUMMARY = {regime: (0.0,) * 7 for regime in REGIMES}
+
+
+@pytest.fixture(autouse=True)
+def memory_cache():
+    result_cache.set_default_cache(result_cache.ResultCache(None))
+    yield
+    result_cache.set_default_cache(None)
+
+
+def test_format_rate():
+    # Les taux de feuil1 sont des fractions
+    assert format_rate(0.035) == "3,50"
+    assert format_rate(0.008) == "0,80"
+    assert format_rate("0,3") == "30,00"
+
+
+def test_rendered_input_data():
+    server = WebServer()
+    server.update_cache(inputs=INPUTS, summary=SUMMARY)
+    input_data = server.cached_data["input_data"]
+    assert input_data["Prix d'acquisition"] == "245 000 €"
+    assert input_data["Taux emprunt"] == "3,50 %"
+    assert input_data["TMI perso./physique"] == "30,00 %"
+    assert input_data["Durée détention"] == "15 ans"
+    assert input_data["CGA"] == "OUI"
+
+
+def test_sensitivity_served_from_snapshot_inputs():
+    # Entrées de l'instantané, classeur pas encore ouvert
+    server = WebServer()
+    client = server.app.test_client()
+    assert client.get("/api/sensitivity").status_code == 400
+    server.update_cache(inputs=INPUTS, summary=SUMMARY)
+    response = client.get("/api/sensitivity?shift=5")
+    assert response.status_code == 200
+    assert response.get_json()["shift"] == pytest.approx(0.05)
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from background_tasks import Stage, StagedTask
+
+
+class Loop:
+    # Boucle d'événements minimale, à la place de la boucle Tk
+    def __init__(self):
+        self.pending = []
+        self.thread = threading.current_thread()
+
+    def after(self, delay, callback):
+        self.pending.append(callback)
+
+    def run(self, task, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not task.finished and time.monotonic() < deadline:
+            pending, self.pending = self.pending, []
+            for callback in pending:
+                callback()
+            time.sleep(0.001)
+        assert task.finished
+
+
+def test_stages_run_in_order_and_apply_in_the_loop_thread():
+    loop = Loop()
+    events = []
+    applied_in = []
+
+    def apply(result):
+        applied_in.append(threading.current_thread())
+        return result * 10
+    task = StagedTask(loop, [
+        Stage("Démarrage", lambda value: value + 1, apply),
+        Stage("Ouverture", lambda value: value + 2),
+    ], on_progress=lambda *args: events.append(args), on_done=events.append).start(1)
+    assert task.running
+    loop.run(task)
+    assert events == [(0, 2, "Démarrage"), (1, 2, "Ouverture"), 22]
+    assert applied_in == [loop.thread]
+    assert not task.running
+
+
+def test_cancel_discards_the_running_stage():
+    loop = Loop()
+    started, release = threading.Event(), threading.Event()
+    discarded, events = [], []
+
+    def open_workbook(value):
+        started.set()
+        release.wait(5)
+        return "classeur"
+    task = StagedTask(loop, [
+        Stage("Ouverture", open_workbook,
+              apply=events.append, discard=discarded.append),
+        Stage("Lecture", events.append),
+    ], on_done=events.append, on_cancel=lambda: events.append("annulée")).start()
+    # Étape en cours : elle se termine, son résultat est écarté
+    assert started.wait(5)
+    task.cancel()
+    assert task.cancelled and not task.finished
+    release.set()
+    loop.run(task)
+    assert discarded == ["classeur"]
+    assert events == ["annulée"]
+
+
+def test_errors_are_reported():
+    loop = Loop()
+    errors = []
+
+    def fail(value):
+        raise OSError("classeur introuvable")
+    task = StagedTask(loop, [Stage("Ouverture", fail)], on_error=errors.append).start()
+    loop.run(task)
+    assert isinstance(errors[0], OSError)
+
+    task = StagedTask(loop, [Stage("Ouverture", str, apply=fail)]).start()
+    with pytest.raises(OSError):
+        loop.run(task)
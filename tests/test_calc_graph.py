@@ -0,0 +1,83 @@
+import pytest
+
+from calc_graph import CalculationGraph, FiscalGraph
+from projection import regime_costs
+
+VALUES = {
+    "acquisition_price": 200000, "works_cost": 10000, "property_charges": 1500,
+    "insurance": 300, "rent": 900, "loan_amount": 180000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 250000,
+    "detention_duration": 15,
+}
+
+
+def _graph():
+    graph = CalculationGraph()
+    graph.add_input("a", 1)
+    graph.add_input("b", 2)
+    graph.add_node("parity", ("a",), lambda a: a % 2)
+    graph.add_node("total", ("parity", "b"), lambda parity, b: parity + b)
+    return graph
+
+
+def test_only_downstream_nodes_are_recomputed():
+    graph = _graph()
+    assert graph.get("total") == 3
+    graph.set_inputs({"b": 5})
+    assert graph.get("total") == 6
+    assert graph.evaluations == {"parity": 1, "total": 2}
+    # parity inchangée : total n'est pas recalculé
+    graph.set_inputs({"a": 3})
+    assert graph.get("total") == 6
+    assert graph.evaluations == {"parity": 2, "total": 2}
+    assert graph.set_inputs({"a": 3}) == set()
+
+
+def test_subscribers_see_only_changed_outputs():
+    graph = _graph()
+    received = []
+    token = graph.subscribe(("parity", "total"), received.append)
+    graph.recalculate()
+    assert received == [{"parity": 1, "total": 3}]
+    graph.set_inputs({"b": 4})
+    graph.recalculate()
+    assert received[-1] == {"total": 5}
+    graph.set_inputs({"a": 5})
+    assert graph.recalculate() == []
+    graph.unsubscribe(token)
+    graph.set_inputs({"b": 0})
+    graph.recalculate()
+    assert len(received) == 2
+
+
+def test_seeded_nodes_are_recomputed_after_a_change():
+    graph = _graph()
+    graph.seed({"total": 42})
+    assert graph.get("total") == 42 and not graph.evaluations
+    graph.set_inputs({"b": 3})
+    assert graph.get("total") == 4
+
+
+def test_unknown_dependency_and_node_as_input():
+    graph = _graph()
+    with pytest.raises(ValueError):
+        graph.add_node("x", ("missing",), abs)
+    with pytest.raises(ValueError):
+        graph.set_inputs({"total": 1})
+
+
+def test_fiscal_graph_matches_the_projection():
+    graph = FiscalGraph(VALUES)
+    costs = graph.get("costs")
+    expected = regime_costs(VALUES)
+    assert costs == pytest.approx(expected)
+    regime, cost = graph.get("optimal_regime")
+    assert cost == min(expected.values()) and expected[regime] == cost
+    # La durée de détention ne relance ni le prêt ni la projection
+    graph.set_values({"detention_duration": 10})
+    assert graph.get("costs") == pytest.approx(regime_costs(dict(VALUES, detention_duration=10)))
+    assert graph.evaluations["projection"] == 1 and graph.evaluations["loan_costs"] == 1
+    graph.set_values({"selling_price": 260000})
+    graph.get("costs")
+    assert graph.evaluations["loan_costs"] == 1 and graph.evaluations["yearly_flows"] == 1
+    assert graph.evaluations["capital_gains"] == 2
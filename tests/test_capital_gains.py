@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from capital_gains import (
+    capital_gains_batch, capital_gains_curve, capital_gains_taxes, holding_allowances,
+    private_gain_tax, surtax,
+)
+from fiscal_engine import MAX_HORIZON, REGIMES
+
+VALUES = {
+    "acquisition_price": 200000, "works_cost": 10000, "property_charges": 1500,
+    "insurance": 300, "rent": 900, "loan_amount": 180000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 320000,
+    "detention_duration": 15, "sale_withdrawal": "NON", "cga": "OUI",
+}
+
+
+def test_holding_allowances():
+    income, social = holding_allowances(np.array([5, 6, 10, 22, 23, 30, 31]))
+    np.testing.assert_allclose(income, [0, 0.06, 0.30, 1.0, 1.0, 1.0, 1.0])
+    np.testing.assert_allclose(social, [0, 0.0165, 0.0825, 0.28, 0.37, 1.0, 1.0])
+
+
+def test_surtax_brackets():
+    np.testing.assert_allclose(surtax(np.array([50000, 60000, 120000, 300000])),
+                               [0, 1200, 3600, 18000])
+
+
+def test_private_gain_tax():
+    assert private_gain_tax(-1000.0, 3) == 0
+    assert private_gain_tax(10000.0, 3) == pytest.approx(10000 * (0.19 + 0.172))
+    assert private_gain_tax(10000.0, 30) == 0
+
+
+def test_curves_by_regime():
+    curves = capital_gains_curve(VALUES)
+    assert set(curves) == set(REGIMES)
+    for regime in ("micro nu + meublé", "SCI IR", "LMNP", "LMNP CGA"):
+        assert curves[regime].shape == (MAX_HORIZON,)
+        # Exonération totale après 30 ans de détention
+        assert not curves[regime][29:].any()
+    # Les amortissements LMNP déduits sont réintégrés
+    assert (curves["LMNP"] >= curves["micro nu + meublé"] - 1e-9).all()
+    # Sans prélèvement du prix de cession, la plus-value de la SCI IS n'est pas distribuée
+    assert (curves["SCI IS"] <= curves["SCI IS PREL BONI"]).all()
+    withdrawn = capital_gains_curve(dict(VALUES, sale_withdrawal="OUI"))
+    np.testing.assert_array_equal(withdrawn["SCI IS"], withdrawn["SCI IS PREL BONI"])
+
+
+def test_taxes_at_40_years_and_detention():
+    curves = capital_gains_curve(VALUES)
+    taxes = capital_gains_taxes(VALUES)
+    for regime in REGIMES:
+        assert taxes[regime] == (curves[regime][-1], curves[regime][14])
+
+
+def test_batch_matches_scalar_curves():
+    scenarios = [VALUES, dict(VALUES, selling_price=150000, sale_withdrawal="OUI"),
+                 dict(VALUES, acquisition_price=90000, cga="NON")]
+    batch = capital_gains_batch(scenarios)
+    assert batch.shape == (3, len(REGIMES), MAX_HORIZON)
+    for row, values in zip(batch, scenarios):
+        curves = capital_gains_curve(values)
+        np.testing.assert_allclose(row, [curves[regime] for regime in REGIMES],
+                                   rtol=1e-9, atol=1e-6)
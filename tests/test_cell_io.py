@@ -0,0 +1,113 @@
+import pytest
+
+from cell_io import (
+    XL_CALCULATION_MANUAL, ComCellIO, MemoryCellIO, benchmark_writes, bounding_block,
+    column_letter, contiguous_runs, split_cell,
+)
+from fiscal_engine import INPUT_CELLS
+
+
+def test_cell_addresses():
+    assert split_cell("c4") == (3, 4)
+    assert split_cell("$AB$12") == (28, 12)
+    assert column_letter(28) == "AB"
+    assert bounding_block(["C4", "B25", "F3"]) == ("B3:F25", 2, 3)
+    with pytest.raises(ValueError):
+        split_cell("4C")
+
+
+def test_contiguous_runs():
+    runs = contiguous_runs({"B26": 2, "c1": "x", "B25": 1, "B27": 3, "B40": 4, "C3": "y"})
+    assert runs == [
+        ("B25:B27", ((1,), (2,), (3,))),
+        ("B40", ((4,),)),
+        ("C1", (("x",),)),
+        ("C3", (("y",),)),
+    ]
+    assert contiguous_runs({}) == []
+
+
+def test_bulk_read_in_one_round_trip():
+    cells = {cell: i for i, cell in enumerate(INPUT_CELLS.values())}
+    io = MemoryCellIO({"Feuil1": cells, "web": {"B2": 1.0, "B3": 2.0, "B4": 3.0, "B5": 4.0}})
+    inputs = io.read_inputs()
+    assert inputs == {key: cells[cell] for key, cell in INPUT_CELLS.items()}
+    assert sorted(io.read_web_costs().values()) == [1.0, 2.0, 3.0, 4.0]
+    assert io.calls["read"] == 2
+
+
+def test_write_leaves_the_other_cells_untouched():
+    io = MemoryCellIO({"feuil1": {"B24": "=formule", "B25": 1, "B28": "=autre"}})
+    io.write_cells("feuil1", {"B25": 10, "B26": 20, "B27": 30, "C1": 900})
+    assert io.calls["write"] == 2
+    assert io.sheets["feuil1"] == {"B24": "=formule", "B25": 10, "B26": 20, "B27": 30,
+                                   "B28": "=autre", "C1": 900}
+    # Une valeur vide efface la cellule
+    io.write_cells("feuil1", {"C1": ""})
+    assert "C1" not in io.sheets["feuil1"]
+
+
+def test_transaction_recalculates_once():
+    io = MemoryCellIO()
+    values = {"C4": 245000, "B25": 1800, "B26": 350, "C1": 950}
+    io.write_inputs(values)
+    assert io.recalculations == 1
+    assert (io.automatic, io.screen_updating) == (True, True)
+    assert io.sheets["feuil1"] == values
+    results = benchmark_writes(MemoryCellIO(), values)
+    assert results["per_cell"]["round_trips"] == 4
+    assert results["transaction"]["round_trips"] == 3
+
+
+class FailingCellIO(MemoryCellIO):
+    def _write_values(self, sheet, address, rows):
+        raise RuntimeError("cellule verrouillée")
+
+
+def test_transaction_restores_the_state_on_error():
+    io = FailingCellIO()
+    with pytest.raises(RuntimeError):
+        io.write_inputs({"C4": 1})
+    assert (io.automatic, io.screen_updating) == (True, True)
+    assert io.recalculations == 0
+
+
+class Application:
+    # Propriétés d'Excel.Application utilisées par ComCellIO
+    Calculation = -4105
+    ScreenUpdating = True
+    EnableEvents = True
+    calculations = 0
+
+    def Calculate(self):
+        assert self.Calculation == XL_CALCULATION_MANUAL and not self.ScreenUpdating
+        self.calculations += 1
+
+
+class Workbook:
+    def __init__(self, failing=False):
+        self.Application = Application()
+        self.failing = failing
+
+    def Sheets(self, name):
+        if self.failing:
+            raise RuntimeError("feuille protégée")
+        return self
+
+    def Range(self, address):
+        return self
+
+
+def test_com_transaction_restores_excel_settings():
+    for failing in (False, True):
+        workbook = Workbook(failing)
+        io = ComCellIO(workbook)
+        if failing:
+            with pytest.raises(RuntimeError):
+                io.write_inputs({"C4": 1, "C1": 2})
+        else:
+            io.write_inputs({"C4": 1, "C1": 2})
+        application = workbook.Application
+        assert application.calculations == (0 if failing else 1)
+        assert (application.Calculation, application.ScreenUpdating,
+                application.EnableEvents) == (-4105, True, True)
@@ -0,0 +1,79 @@
+import os
+import time
+
+from file_watcher import FileWatcher
+
+
+def _write(path, content, mtime):
+    path.write_bytes(content)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_change_fires_once_after_the_debounce(tmp_path):
+    path = tmp_path / "classeur.xlsm"
+    _write(path, b"v1", 1_000_000_000)
+    changes = []
+    watcher = FileWatcher(path, changes.append, debounce=2.0)
+    assert not watcher.check(now=0.0)
+
+    # Deux enregistrements successifs : un seul rappel, une fois le fichier stable
+    _write(path, b"v2", 2_000_000_000)
+    assert not watcher.check(now=10.0)
+    _write(path, b"v3", 3_000_000_000)
+    assert not watcher.check(now=11.0)
+    assert not watcher.check(now=12.5)
+    assert watcher.check(now=13.0)
+    assert changes == [path] and watcher.changes == 1
+    assert not watcher.check(now=20.0)
+
+
+def test_touch_without_content_change_is_ignored(tmp_path):
+    path = tmp_path / "classeur.xlsm"
+    _write(path, b"v1", 1_000_000_000)
+    changes = []
+    watcher = FileWatcher(path, changes.append, debounce=1.0)
+    _write(path, b"v1", 2_000_000_000)
+    assert not watcher.check(now=0.0)
+    assert not watcher.check(now=5.0)
+    assert changes == [] and watcher.changes == 0
+
+
+def test_acknowledged_saves_and_deletion_are_ignored(tmp_path):
+    path = tmp_path / "classeur.xlsm"
+    _write(path, b"v1", 1_000_000_000)
+    changes = []
+    watcher = FileWatcher(path, changes.append, debounce=1.0)
+    # Enregistrement par l'application elle-même
+    _write(path, b"v2", 2_000_000_000)
+    watcher.acknowledge()
+    assert not watcher.check(now=0.0) and not watcher.check(now=5.0)
+    path.unlink()
+    assert not watcher.check(now=10.0) and not watcher.check(now=20.0)
+    assert changes == []
+
+
+def test_callback_errors_do_not_stop_the_watcher(tmp_path):
+    path = tmp_path / "classeur.xlsm"
+    _write(path, b"v1", 1_000_000_000)
+
+    def callback(path):
+        raise RuntimeError("classeur verrouillé")
+    watcher = FileWatcher(path, callback, debounce=0.0)
+    _write(path, b"v2", 2_000_000_000)
+    watcher.check(now=0.0)
+    assert watcher.check(now=1.0) and watcher.changes == 1
+
+
+def test_thread_polls_the_file(tmp_path):
+    path = tmp_path / "classeur.xlsm"
+    _write(path, b"v1", 1_000_000_000)
+    changes = []
+    watcher = FileWatcher(path, changes.append, interval=0.01, debounce=0.02).start()
+    try:
+        _write(path, b"v2", 2_000_000_000)
+        deadline = time.monotonic() + 5
+        while not changes and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop(timeout=1)
+    assert changes == [path]
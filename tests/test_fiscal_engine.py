@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from fiscal_engine import (
+    LMNP_ACCOUNTING_FEES, MAX_HORIZON, REGIMES, _carried_forward, compute_batch,
+    compute_regime_costs, lmnp_depreciation, lmnp_schedule, normalize_inputs,
+)
+
+
+def _scenarios(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{
+        "acquisition_price": round(rng.uniform(80000, 400000)),
+        "works_cost": round(rng.uniform(0, 50000)),
+        "property_charges": round(rng.uniform(500, 3000)),
+        "insurance": round(rng.uniform(100, 600)),
+        "rent": round(rng.uniform(400, 1800)),
+        "loan_amount": round(rng.uniform(0, 300000)),
+        "loan_duration": float(rng.integers(10, 26)),
+        "loan_rate": float(rng.uniform(0.01, 0.05)),
+        "marginal_tax_rate": float(rng.choice([0.11, 0.30, 0.41, 0.45])),
+        "selling_price": round(rng.uniform(80000, 500000)),
+        "detention_duration": float(rng.integers(1, 41)),
+        "sale_withdrawal": "OUI" if rng.random() < 0.5 else "NON",
+        "cga": "OUI" if rng.random() < 0.5 else "NON",
+        "rent_growth": float(rng.uniform(0, 0.03)),
+        "loan_insurance_rate": float(rng.uniform(0, 0.5)),
+    } for _ in range(count)]
+
+
+def test_scalar_and_batch_costs_agree():
+    scenarios = _scenarios(40)
+    batch = compute_batch(scenarios)
+    assert batch.shape == (len(scenarios), len(REGIMES))
+    for row, values in zip(batch, scenarios):
+        costs = compute_regime_costs(values)
+        np.testing.assert_allclose(row, [costs[regime] for regime in REGIMES],
+                                   rtol=1e-9, atol=1e-6)
+
+
+def test_rate_units_are_fixed_per_input():
+    # Un taux de 0,8 % reste 0,008 ; l'assurance emprunteur est saisie en %
+    e = normalize_inputs({"loan_rate": 0.008, "marginal_tax_rate": 1.0,
+                          "loan_insurance_rate": 0.36})
+    assert e["loan_rate"] == pytest.approx(0.008)
+    assert e["marginal_tax_rate"] == pytest.approx(1.0)
+    assert e["loan_insurance_rate"] == pytest.approx(0.0036)
+
+
+def test_empty_batch():
+    assert compute_batch([]).shape == (0, len(REGIMES))
+
+
+LMNP_VALUES = {
+    "acquisition_price": 200000, "works_cost": 10000, "property_charges": 1500,
+    "insurance": 300, "rent": 900, "loan_amount": 180000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "detention_duration": 15,
+    "furniture_cost": 5000,
+}
+
+
+def test_lmnp_depreciation_by_component():
+    e = normalize_inputs(LMNP_VALUES)
+    depreciation = lmnp_depreciation(e, MAX_HORIZON)
+    assert depreciation[0] == pytest.approx(
+        200000 * (0.40 / 50 + 0.20 / 25 + 0.15 / 20 + 0.10 / 15) + 10000 / 15 + 5000 / 7)
+    # Mobilier amorti sur 7 ans, travaux et agencements sur 15 ans
+    assert depreciation[6] - depreciation[7] == pytest.approx(5000 / 7)
+    assert depreciation[-1] == pytest.approx(200000 * 0.40 / 50)
+
+
+def test_lmnp_depreciation_never_creates_a_deficit():
+    schedule = lmnp_schedule(LMNP_VALUES)
+    depreciation, deducted, deferred = (schedule[name] for name in
+                                        ("depreciation", "deducted", "deferred"))
+    assert (deducted >= -1e-9).all() and (deferred >= -1e-9).all()
+    # Tant qu'un report subsiste, le résultat imposable est nul
+    assert schedule["tax"][0] == pytest.approx(LMNP_ACCOUNTING_FEES)
+    # Dotations = amortissements déduits + report restant en fin de période
+    assert depreciation.sum() == pytest.approx(deducted.sum() + deferred[-1])
+    np.testing.assert_allclose(np.diff(deferred), depreciation[1:] - deducted[1:], atol=1e-6)
+
+
+def test_carried_forward_rows_match_scalar_loop():
+    flows = np.random.default_rng(2).normal(0, 1000, (MAX_HORIZON, 5))
+    carried = _carried_forward(flows)
+    for column in range(5):
+        np.testing.assert_allclose(carried[:, column], _carried_forward(flows[:, column]))
+    previous = 0.0
+    for flow, value in zip(flows[:, 0], carried[:, 0]):
+        previous = max(previous - flow, 0.0)
+        assert value == pytest.approx(previous)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from formula_compiler import (  # noqa: E402
+    ARRAY_FUNCTIONS, WorkbookModel, compile_node, parse_formula,
+)
+
+
+def evaluate(formula, env=None):
+    return compile_node(parse_formula(formula, "feuil1"))(env or {})
+
+
+@pytest.mark.parametrize("formula, expected", [
+    # La négation passe avant la puissance : -2^2 vaut 4 dans Excel
+    ("=-2^2", 4.0),
+    ("=-(2)^2", 4.0),
+    # Puissances enchaînées évaluées de gauche à droite
+    ("=2^3^2", 64.0),
+    ("=2+3*4", 14.0),
+    ("=10-2-3", 5.0),
+    ("=(1+2)*3", 9.0),
+    ("=2*3%", 0.06),
+    # & après les opérateurs arithmétiques, comparaisons en dernier
+    ("=1+2&3", "33"),
+    ("=1+2=3", True),
+    ("=2-1>0", True),
+])
+def test_operator_precedence_matches_excel(formula, expected):
+    value = evaluate(formula)
+    if isinstance(expected, float):
+        assert value == pytest.approx(expected)
+    else:
+        assert value == expected
+
+
+def test_references_and_ranges():
+    env = {("feuil1", "A1"): 2.0, ("feuil1", "A2"): 3.0, ("feuil1", "A3"): 5.0}
+    assert evaluate("=SUM(A1:A3)*A1", env) == 20.0
+    assert evaluate("=IF(A1>A2,A1,A2)", env) == 3.0
+
+
+def _model():
+    formulas = {
+        ("web", "B2"): "=IF(feuil1!A1>100,ROUND(feuil1!A1*1.05,2),MIN(feuil1!A1,feuil1!A2))",
+        ("web", "B3"): "=IFERROR(feuil1!A1/feuil1!A2,-1)+MAX(feuil1!A1:feuil1!A2)",
+        ("web", "B4"): "=-PMT(feuil1!A3/12,240,feuil1!A1*1000)",
+        ("web", "B5"): "=web!B2+web!B3*2-feuil1!A2^2",
+    }
+    trees = {key: parse_formula(formula, key[0]) for key, formula in formulas.items()}
+    constants = {("feuil1", "A1"): 0.0, ("feuil1", "A2"): 0.0, ("feuil1", "A3"): 0.0}
+    return WorkbookModel(constants, trees)
+
+
+def test_scalar_and_batch_evaluation_agree():
+    model = _model()
+    rng = np.random.default_rng(0)
+    columns = {
+        "feuil1!A1": rng.uniform(0, 200, 50).round(2),
+        # Quelques zéros pour passer par IFERROR
+        "feuil1!A2": rng.integers(0, 5, 50).astype(float),
+        "feuil1!A3": rng.uniform(0.01, 0.06, 50),
+    }
+    outputs = ("web!B2", "web!B3", "web!B4", "web!B5")
+    batch = model.evaluate_batch(columns, outputs)
+    for i in range(50):
+        scalar = model.evaluate({name: values[i] for name, values in columns.items()}, outputs)
+        for output in outputs:
+            assert batch[output][i] == pytest.approx(scalar[output], rel=1e-12), (output, i)
+
+
+def test_batch_functions_are_elementwise():
+    node = parse_formula("=IF(A1>0,A1,0)+MAX(A1,1)", "feuil1")
+    values = compile_node(node, ARRAY_FUNCTIONS)({("feuil1", "A1"): np.array([-2.0, 0.5, 3.0])})
+    np.testing.assert_allclose(values, [1.0, 1.5, 6.0])
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+import result_cache
+from fiscal_engine import REGIMES, evaluate_batch, normalize_batch, records_to_columns
+from goal_seek import (
+    break_even_rent, goal_seek, max_acquisition_price, max_loan_rate, metric_values,
+)
+from result_cache import ResultCache
+
+SCENARIOS = [
+    {"acquisition_price": 200000, "works_cost": 10000, "property_charges": 1500,
+     "insurance": 300, "rent": 900, "loan_amount": 180000, "loan_duration": 20,
+     "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 250000,
+     "detention_duration": 15, "cga": "OUI"},
+    {"acquisition_price": 120000, "works_cost": 0, "property_charges": 900,
+     "insurance": 200, "rent": 650, "loan_amount": 100000, "loan_duration": 15,
+     "loan_rate": 0.04, "marginal_tax_rate": 0.11, "selling_price": 130000,
+     "detention_duration": 10, "sale_withdrawal": "OUI"},
+]
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setattr(result_cache, "_default_cache", ResultCache(None))
+
+
+def metric_at(variable, values, metric):
+    # Indicateur de chaque régime lorsque la variable prend values[i, j]
+    base = normalize_batch(records_to_columns(SCENARIOS))
+    result = np.empty(values.shape)
+    for j in range(len(REGIMES)):
+        e = dict(base, **{variable: values[:, j]})
+        result[:, j] = metric_values(e, evaluate_batch(e), metric)[:, j]
+    return result
+
+
+def test_break_even_rent_cancels_the_cash_flow():
+    rents = break_even_rent(SCENARIOS)
+    assert rents.shape == (len(SCENARIOS), len(REGIMES))
+    assert not np.isnan(rents).any()
+    np.testing.assert_allclose(metric_at("rent", rents, "cash_flow"), 0, atol=1e-4)
+
+
+def test_max_acquisition_price_reaches_the_roi():
+    prices = max_acquisition_price(SCENARIOS, roi=20.0)
+    reached = ~np.isnan(prices)
+    assert reached.any()
+    np.testing.assert_allclose(metric_at("acquisition_price", np.nan_to_num(prices), "roi")[reached],
+                               20.0, atol=1e-6)
+
+
+def test_max_loan_rate_reaches_the_cash_flow():
+    target = -50000.0
+    rates = max_loan_rate(SCENARIOS, cash_flow=target)
+    reached = ~np.isnan(rates)
+    assert reached.any()
+    assert ((rates[reached] >= 0) & (rates[reached] <= 0.25)).all()
+    np.testing.assert_allclose(metric_at("loan_rate", np.nan_to_num(rates), "cash_flow")[reached],
+                               target, atol=1e-3)
+
+
+def test_unreachable_target_is_nan():
+    rents = goal_seek(SCENARIOS, "rent", target=1e9, bounds=(0.0, 1000.0))
+    assert np.isnan(rents).all()
+
+
+def test_unknown_variable_or_metric():
+    with pytest.raises(ValueError):
+        goal_seek(SCENARIOS, "surface")
+    with pytest.raises(ValueError):
+        goal_seek(SCENARIOS, "rent", metric="tri")
@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import pytest
+
+import result_cache
+from fiscal_engine import MAX_HORIZON, REGIMES, normalize_inputs
+from holding_period import debt_flows, irr_curves, optimal_holding
+from loan import amortize
+from projection import projection
+from result_cache import ResultCache
+
+VALUES = {
+    "acquisition_price": 200000, "works_cost": 10000, "property_charges": 1500,
+    "insurance": 300, "rent": 900, "loan_amount": 180000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 250000,
+    "detention_duration": 15, "furniture_cost": 5000,
+}
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setattr(result_cache, "_default_cache", ResultCache(None))
+
+
+def _npv(rate, years, column, result, e, debt):
+    proceeds, repayments, balances = debt
+    flows = result.cash_flows()[:years, column] - repayments[:years]
+    terminal = e["selling_price"] - result.capital_gains[years - 1, column] - balances[years - 1]
+    discount = (1 + rate) ** -np.arange(1, years + 1)
+    investment = e["acquisition_price"] + e["works_cost"] + e["furniture_cost"] - proceeds
+    return flows @ discount + terminal * discount[-1] - investment
+
+
+def test_irr_cancels_the_npv():
+    e = normalize_inputs(VALUES)
+    result = projection(VALUES)
+    debt = debt_flows(VALUES, e)
+    investment = e["acquisition_price"] + e["works_cost"] + e["furniture_cost"]
+    curves = irr_curves(result, investment, e["selling_price"], debt)
+    assert curves.shape == (MAX_HORIZON, len(REGIMES))
+    for years in (1, 10, 25, 40):
+        for column in range(len(REGIMES)):
+            rate = curves[years - 1, column]
+            if not np.isnan(rate):
+                scale = abs(_npv(0.0, years, column, result, e, debt)) + investment
+                assert abs(_npv(rate, years, column, result, e, debt)) < 1e-9 * scale
+
+
+def test_debt_flows_match_the_monthly_schedule():
+    proceeds, repayments, balances = debt_flows(VALUES)
+    schedule = amortize([180000], [240], [0.035])
+    assert proceeds == 180000
+    np.testing.assert_allclose(repayments[:20], schedule.annual(schedule.principal)[0], atol=1e-6)
+    np.testing.assert_allclose(balances[:20], schedule.remaining[0, 11::12], atol=1e-6)
+    assert not balances[19:].any() and not repayments[20:].any()
+    assert repayments.sum() == pytest.approx(180000)
+
+
+def test_optimal_holding_picks_the_curve_optimum():
+    for criterion in ("cost", "irr"):
+        optimum = optimal_holding(VALUES, criterion)
+        curves = np.column_stack([optimum["curves"][regime] for regime in REGIMES])
+        best = np.nanmin(curves) if criterion == "cost" else np.nanmax(curves)
+        assert optimum["value"] == best
+        assert curves[optimum["years"] - 1, REGIMES.index(optimum["regime"])] == best
+
+
+def test_irr_solver_takes_under_10_ms():
+    optimal_holding(VALUES, "irr")
+    timings = []
+    for rent in range(800, 820):
+        values = dict(VALUES, rent=rent)
+        projection(values)
+        start = time.perf_counter()
+        optimal_holding(values, "irr", cache=ResultCache(None))
+        timings.append(time.perf_counter() - start)
+    assert np.median(timings) < 0.010
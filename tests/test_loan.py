@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from loan import (
+    DEFERRAL_TOTAL, Loan, amortize, amortize_loans, annual_interest, annual_interest_batch,
+    fixed_rate_balances,
+)
+
+
+def annuity(balance, monthly_rate, months):
+    return balance * monthly_rate / (1 - (1 + monthly_rate) ** -months)
+
+
+def test_fixed_rate_schedule():
+    schedule = Loan(120000, 20, 0.03).schedule()
+    payment = annuity(120000, 0.0025, 240)
+    np.testing.assert_allclose(schedule.payment[0], payment)
+    assert schedule.principal.sum() == pytest.approx(120000)
+    assert schedule.remaining[0, -1] == pytest.approx(0, abs=1e-6)
+    assert schedule.total_interest()[0] == pytest.approx(payment * 240 - 120000)
+
+
+def test_partial_deferral_pays_interest_only():
+    schedule = Loan(100000, 15, 0.024, deferral_months=12).schedule()
+    deferred = slice(0, 12)
+    np.testing.assert_allclose(schedule.principal[0, deferred], 0)
+    np.testing.assert_allclose(schedule.remaining[0, deferred], 100000)
+    np.testing.assert_allclose(schedule.payment[0, deferred], 100000 * 0.002)
+    # Amortissement sur les mois restants après le différé
+    np.testing.assert_allclose(schedule.payment[0, 12:], annuity(100000, 0.002, 168))
+    assert schedule.remaining[0, -1] == pytest.approx(0, abs=1e-6)
+
+
+def test_total_deferral_capitalizes_interest():
+    schedule = Loan(100000, 15, 0.024, deferral_months=12, deferral=DEFERRAL_TOTAL).schedule()
+    np.testing.assert_allclose(schedule.payment[0, :12], 0)
+    capitalized = 100000 * 1.002 ** 12
+    assert schedule.remaining[0, 11] == pytest.approx(capitalized)
+    np.testing.assert_allclose(schedule.payment[0, 12:], annuity(capitalized, 0.002, 168))
+    # Le capital amorti comprend les intérêts capitalisés
+    assert schedule.principal.sum() == pytest.approx(capitalized)
+    assert schedule.remaining[0, -1] == pytest.approx(0, abs=1e-6)
+
+
+def test_rate_steps_recompute_the_payment():
+    schedule = Loan(150000, 20, 0.03, rate_steps=[(60, 0.045)]).schedule()
+    np.testing.assert_allclose(schedule.payment[0, :60], annuity(150000, 0.0025, 240))
+    balance = schedule.remaining[0, 59]
+    np.testing.assert_allclose(schedule.payment[0, 60:], annuity(balance, 0.045 / 12, 180))
+    np.testing.assert_allclose(schedule.interest[0, 60], balance * 0.045 / 12)
+    assert schedule.remaining[0, -1] == pytest.approx(0, abs=1e-6)
+
+
+def test_zero_rate_is_linear():
+    schedule = Loan(24000, 2, 0.0).schedule()
+    np.testing.assert_allclose(schedule.payment[0], 1000)
+    assert not schedule.interest.any()
+
+
+def test_insurance_on_initial_or_remaining_capital():
+    initial = Loan(100000, 10, 0.03, insurance_rate=0.0036).schedule()
+    remaining = Loan(100000, 10, 0.03, insurance_rate=0.0036,
+                     insurance_on_remaining=True).schedule()
+    np.testing.assert_allclose(initial.insurance[0], 30)
+    assert remaining.insurance[0, 0] == pytest.approx(30)
+    assert remaining.total_insurance()[0] < initial.total_insurance()[0]
+
+
+def test_several_loans_in_one_pass():
+    loans = [Loan(100000, 20, 0.03), Loan(30000, 7, 0.0, deferral_months=6)]
+    schedule = amortize_loans(loans)
+    assert schedule.interest.shape == (2, 240)
+    for row, loan in enumerate(loans):
+        alone = loan.schedule()
+        np.testing.assert_allclose(schedule.payment[row, :loan.months], alone.payment[0])
+    assert not schedule.payment[1, 84:].any()
+
+
+def test_closed_form_matches_the_monthly_schedule():
+    schedule = amortize([180000, 90000], [300, 180], [0.035, 0.02])
+    interest = annual_interest_batch([180000, 90000], [25, 15], [0.035, 0.02], 30)
+    np.testing.assert_allclose(interest, schedule.annual_interest(30), rtol=1e-9, atol=1e-6)
+    balances = fixed_rate_balances([180000, 90000], [25, 15], [0.035, 0.02], 30)
+    np.testing.assert_allclose(balances[:, :25], schedule.remaining[:, 11::12], atol=1e-6)
+    assert not balances[1, 15:].any()
+    # Valeur mémoïsée identique au calcul
+    assert annual_interest(180000, 25, 0.035, 30) == pytest.approx(interest[0].tolist())
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import result_cache
+from capital_gains import capital_gains_taxes
+from fiscal_engine import REGIMES, compute_regime_costs
+from monte_carlo import optimal_shares, run_monte_carlo
+from result_cache import ResultCache
+
+VALUES = {
+    "acquisition_price": 200000, "works_cost": 10000, "property_charges": 1500,
+    "insurance": 300, "rent": 900, "loan_amount": 180000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 250000,
+    "detention_duration": 15, "sale_withdrawal": "OUI",
+}
+# Tirages sans aléa : chaque tirage reproduit le scénario de référence
+CONSTANT = {
+    "rent_growth": ("constant", 0.0),
+    "vacancy_months": ("constant", 0.0),
+    "rate_shock": ("constant", 0.0),
+    "resale_factor": ("constant", 1.0),
+}
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setattr(result_cache, "_default_cache", ResultCache(None))
+
+
+def _run(values, **options):
+    options.setdefault("paths", 2000)
+    options.setdefault("chunk_size", 1000)
+    return run_monte_carlo(values, workers=1, cache=ResultCache(None), **options)
+
+
+def test_constant_draws_match_the_engine_with_capital_gains():
+    report = _run(VALUES, distributions=CONSTANT, paths=10, chunk_size=10)
+    costs = compute_regime_costs(VALUES)
+    gains_taxes = capital_gains_taxes(VALUES)
+    for regime in REGIMES:
+        assert report["cost_percentiles"][regime][50] == pytest.approx(
+            costs[regime] + gains_taxes[regime][1])
+
+
+def test_resale_price_moves_costs_and_ranking():
+    low = _run(VALUES, seed=3)
+    high = _run(dict(VALUES, selling_price=400000), seed=3)
+    for regime in REGIMES:
+        assert high["cost_percentiles"][regime][50] > low["cost_percentiles"][regime][50]
+    assert low["optimal_probability"] != high["optimal_probability"]
+    assert sum(low["optimal_probability"].values()) == pytest.approx(1.0)
+
+
+def test_draws_are_reproducible():
+    assert _run(VALUES, seed=7) == _run(VALUES, seed=7)
+    assert _run(VALUES, seed=7) != _run(VALUES, seed=8)
+
+
+def test_ties_are_shared():
+    costs = np.array([[5.0, 1.0, 1.0, 3.0],
+                      [0.0, 2.0, 2.0, 3.0]])
+    np.testing.assert_allclose(optimal_shares(costs), [0.5, 0.25, 0.25, 0.0])
@@ -0,0 +1,73 @@
+import threading
+
+import numpy as np
+import pytest
+
+import projection as projection_module
+from capital_gains import capital_gains_taxes
+from fiscal_engine import MAX_HORIZON, REGIMES, compute_regime_costs
+from projection import Projection, build_projection, projection, regime_summary
+
+VALUES = {
+    "acquisition_price": 200000, "works_cost": 10000, "property_charges": 1500,
+    "insurance": 300, "rent": 900, "loan_amount": 180000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 250000,
+    "detention_duration": 15, "cga": "OUI",
+}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    projection_module.clear_cache()
+    yield
+    projection_module.clear_cache()
+
+
+def test_totals_match_the_engine():
+    result = build_projection(VALUES)
+    for years in (1, 15, MAX_HORIZON):
+        costs = compute_regime_costs(dict(VALUES, detention_duration=years))
+        np.testing.assert_allclose(result.total_costs(years), [costs[r] for r in REGIMES],
+                                   rtol=1e-12)
+
+
+def test_summary_columns():
+    summary = regime_summary(VALUES)
+    gains = capital_gains_taxes(VALUES)
+    costs = compute_regime_costs(VALUES)
+    for regime in REGIMES:
+        average_40, average, cost_40, cost, gain_40, gain, total = summary[regime]
+        assert average_40 == pytest.approx(cost_40 / MAX_HORIZON)
+        assert average == pytest.approx(cost / 15)
+        assert cost == pytest.approx(costs[regime])
+        assert (gain_40, gain) == pytest.approx(gains[regime])
+        assert total == pytest.approx(cost + gain)
+
+
+def test_cache_ignores_the_holding_duration():
+    first = projection(VALUES)
+    assert projection(dict(VALUES, detention_duration=30)) is first
+    assert projection(dict(VALUES, rent=950)) is not first
+    assert not first.costs.flags.writeable
+
+
+def test_concurrent_calls_share_one_projection():
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        results.append(projection(VALUES))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result is projection(VALUES) for result in results)
+
+
+def test_rebuilt_from_arrays():
+    result = build_projection(VALUES)
+    copy = Projection.from_arrays({name: getattr(result, name) for name in Projection.ARRAYS})
+    assert copy.summary(15) == result.summary(15)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import result_cache
+from goal_seek import break_even_rent
+from holding_period import optimal_holding
+from loan import Loan
+from result_cache import ResultCache, cached_regime_costs, scenario_key
+
+VALUES = {
+    "acquisition_price": 200000, "rent": 900, "loan_amount": 150000, "loan_duration": 20,
+    "loan_rate": 0.03, "marginal_tax_rate": 0.30, "selling_price": 230000,
+    "detention_duration": 15,
+}
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    # Les appels sans cache explicite n'écrivent pas dans le dépôt
+    monkeypatch.setattr(result_cache, "_default_cache", ResultCache(None))
+
+
+def test_memory_tier_is_lru():
+    cache = ResultCache(None, memory_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # "b" est le moins récemment utilisé
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_survives_memory_eviction(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite3", memory_size=1)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 0)
+    cache.close()
+
+    reopened = ResultCache(tmp_path / "cache.sqlite3")
+    assert reopened.get("b") == [2.0]
+    reopened.close()
+
+
+def test_disk_tier_evicts_least_recently_read(tmp_path):
+    payload = np.zeros(1000)
+    cache = ResultCache(tmp_path / "cache.sqlite3", memory_size=1, disk_size=20000)
+    cache.put("a", payload)
+    cache.put("b", payload)
+    cache.get("a")
+    cache.put("c", payload)
+    stats = cache.stats()
+    assert stats["disk_entries"] == 2 and stats["disk_bytes"] <= 20000
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    cache.close()
+
+
+def test_keys_ignore_input_formatting():
+    formatted = dict(VALUES, acquisition_price="200 000", cga="NON")
+    assert scenario_key("costs", formatted, "v") == scenario_key("costs", VALUES, "v")
+    assert scenario_key("costs", VALUES, "v") != scenario_key("costs", VALUES, "w")
+
+
+def test_results_are_served_from_the_cache():
+    cache = ResultCache(None)
+    costs = cached_regime_costs(VALUES, cache)
+    assert cached_regime_costs(dict(VALUES), cache) is costs
+    first = break_even_rent([VALUES], cache=cache)
+    first[:] = 0
+    np.testing.assert_array_equal(break_even_rent([VALUES], cache=cache),
+                                  break_even_rent([VALUES], cache=ResultCache(None)))
+    optimal_holding(VALUES, cache=cache)
+    optimal_holding(VALUES, cache=cache)
+    assert cache.stats()["memory_hits"] == 3
+    assert cache.stats()["misses"] == 3
+
+
+def test_detailed_loans_bypass_the_cache():
+    cache = ResultCache(None)
+    values = dict(VALUES, loans=[Loan(150000, 20, 0.03)])
+    cached_regime_costs(values, cache)
+    assert cache.stats()["misses"] == 0
+    assert cache.stats()["memory_entries"] == 0
@@ -0,0 +1,46 @@
+import pytest
+
+import result_cache
+from fiscal_engine import INPUT_CELLS, REGIMES
+from result_cache import ResultCache, cached_regime_costs
+from sensitivity import sensitivity_analysis
+
+VALUES = {
+    "acquisition_price": 245000, "works_cost": 12500, "property_charges": 1800,
+    "insurance": 350, "rent": 950, "loan_amount": 200000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 290000,
+    "detention_duration": 15, "sale_withdrawal": "NON", "cga": "OUI",
+}
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setattr(result_cache, "_default_cache", ResultCache(None))
+
+
+def test_one_entry_per_input_sorted_by_swing():
+    report = sensitivity_analysis(VALUES)
+    assert report["shift"] == 0.10
+    assert {item["input"] for item in report["inputs"]} == set(INPUT_CELLS)
+    swings = [item["max_swing"] for item in report["inputs"]]
+    assert swings == sorted(swings, reverse=True)
+    base = cached_regime_costs(VALUES)
+    for regime in REGIMES:
+        assert report["base"]["costs"][regime] == pytest.approx(base[regime])
+
+
+def test_scenarios_match_single_evaluations():
+    report = sensitivity_analysis(VALUES, shift=0.05, inputs=["rent", "loan_rate", "cga"])
+    items = {item["input"]: item for item in report["inputs"]}
+    rent = items["rent"]
+    assert (rent["low"]["value"], rent["high"]["value"]) == pytest.approx((902.5, 997.5))
+    high = cached_regime_costs(dict(VALUES, rent=997.5))
+    for regime in REGIMES:
+        assert rent["high"]["costs"][regime] == pytest.approx(high[regime])
+        assert rent["swing"][regime] == pytest.approx(
+            high[regime] - rent["low"]["costs"][regime], abs=1e-6)
+    assert rent["high"]["optimal"] == min(high, key=high.get)
+    # Taux affichés en %, options basculées
+    rate = items["loan_rate"]
+    assert (rate["low"]["value"], rate["high"]["value"]) == pytest.approx((3.325, 3.675))
+    assert (items["cga"]["low"]["value"], items["cga"]["high"]["value"]) == ("NON", "OUI")
@@ -0,0 +1,165 @@
+import csv
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from fiscal_engine import REGIMES
+from simulation_store import (
+    COST_COLUMNS, SCHEMA_VERSION, SimulationStore, format_value, input_hash,
+)
+
+INPUTS = {
+    "acquisition_price": "245 000", "works_cost": 12500, "property_charges": 1800,
+    "insurance": 350, "rent": 950, "loan_amount": 200000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 290000,
+    "detention_duration": 15, "sale_withdrawal": "NON", "cga": "OUI",
+}
+RESULTS = {
+    "min_cost": "84 321 €", "optimal_option": "LMNP", "gross_yield": "4,65 %",
+    "roi": 3.1, "cashflow": "-1 250 €",
+    "costs": {regime: 80000 + 1000 * i for i, regime in enumerate(REGIMES)},
+}
+
+# Table de la première version : montants enregistrés tels qu'affichés
+V1_SCHEMA = (
+    "CREATE TABLE simulations (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " created_at TEXT NOT NULL, input_hash TEXT, acquisition_price,"
+    " works_cost, loan_amount, selling_price, rent, detention_duration,"
+    " min_cost, optimal_option, gross_yield, roi, cashflow)"
+)
+V1_ROWS = [
+    (1, "2024-03-01 10:00:00", "abc", "245 000 €", "12 500 €", "200 000 €",
+     "290 000 €", "950 €", "20", "84 321 €", "LMNP", "4,65 %", "3,1 %", "-1 250 €"),
+    (2, "2024-03-02 11:30:00", None, 180000, None, "illisible",
+     "210 000", "700", 15, "61 000", "SCI IS", "4,67 %", "2 %", "300"),
+]
+
+
+@pytest.fixture
+def v1_database(tmp_path):
+    path = tmp_path / "historique.sqlite3"
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(V1_SCHEMA)
+        connection.executemany(f"INSERT INTO simulations VALUES ({', '.join('?' * 14)})",
+                               V1_ROWS)
+    connection.close()
+    return path
+
+
+def test_migrates_v1_formatted_values(v1_database):
+    store = SimulationStore(v1_database)
+    try:
+        assert store.count() == 2
+        columns = ("id", "created_at", "acquisition_price", "works_cost", "loan_amount",
+                   "rent", "detention_duration", "min_cost", "optimal_option",
+                   "gross_yield", "cashflow")
+        first, second = store.rows(columns)
+        assert first == (1, "2024-03-01 10:00:00", 245000.0, 12500.0, 200000.0,
+                         950.0, 20.0, 84321.0, "LMNP", 4.65, -1250.0)
+        # Valeurs illisibles ou absentes : NULL
+        assert second[2:5] == (180000.0, None, None)
+        assert second[8] == "SCI IS"
+    finally:
+        store.close()
+
+    connection = sqlite3.connect(v1_database)
+    try:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        tables = {name for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert "simulations_v1" not in tables
+        assert connection.execute(
+            "SELECT input_hash FROM simulations WHERE id = 1").fetchone() == ("abc",)
+    finally:
+        connection.close()
+
+
+def test_reopening_does_not_migrate_again(v1_database):
+    SimulationStore(v1_database).close()
+    store = SimulationStore(v1_database)
+    try:
+        assert store.count() == 2
+        assert store.rows(("acquisition_price",))[0] == (245000.0,)
+    finally:
+        store.close()
+
+
+@pytest.fixture
+def store():
+    store = SimulationStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_append_stores_typed_values(store):
+    first = store.append(INPUTS, RESULTS, datetime(2024, 3, 1, 10, 0))
+    second = store.append(dict(INPUTS, rent=1000), RESULTS)
+    assert (first, second) == (1, 2) and store.count() == 2
+    row = store.rows(("created_at", "acquisition_price", "loan_rate", "cga", "sale_withdrawal",
+                      "min_cost", "optimal_option", "gross_yield", "cashflow",
+                      COST_COLUMNS["LMNP"], "input_hash"))[0]
+    assert row == ("2024-03-01 10:00:00", 245000.0, 0.035, 1, 0, 84321.0, "LMNP", 4.65,
+                   -1250.0, 80000 + 1000 * REGIMES.index("LMNP"), input_hash(INPUTS))
+    assert store.latest(("id", "rent")) == (2, 1000.0)
+
+
+def test_hash_ignores_input_formatting():
+    assert input_hash(dict(INPUTS, acquisition_price=245000)) == input_hash(INPUTS)
+    assert input_hash(dict(INPUTS, rent=951)) != input_hash(INPUTS)
+
+
+def test_formatted_values():
+    assert format_value("acquisition_price", 245000.4) == "245 000 €"
+    assert format_value("loan_rate", 0.035) == "3,50 %"
+    assert format_value("gross_yield", 4.65) == "4,65 %"
+    assert format_value("cga", 1) == "OUI"
+    assert format_value("created_at", "2024-03-01 10:00:00") == "01/03/2024 10:00"
+    assert format_value("rent", None) == ""
+
+
+def test_statistics_and_csv_export(store, tmp_path):
+    store.append(INPUTS, RESULTS)
+    store.append(INPUTS, dict(RESULTS, optimal_option="SCI IS", min_cost=60000))
+    store.append(INPUTS, dict(RESULTS, min_cost=90000))
+    statistics = store.statistics()
+    assert statistics["count"] == 3
+    assert statistics["optimal_options"][0] == {
+        "option": "LMNP", "count": 2, "average_min_cost": pytest.approx(87160.5)}
+    assert statistics["average_costs"]["SCI IS"] == 81000
+
+    path = store.export(tmp_path / "historique.csv")
+    with open(path, encoding="utf-8-sig") as handle:
+        lines = list(csv.reader(handle))
+    assert len(lines) == 4 and lines[0][0] == "ID"
+    assert lines[1][lines[0].index("Taux emprunt (%)")] == "3,50 %"
+
+
+def test_legacy_excel_history_is_imported_once(store, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Date", "Prix acquisition (€)", "Loyer mensuel (€)", "Option optimale"])
+    sheet.append(["01/03/2024 10:00", "245 000 €", "950 €", "LMNP"])
+    sheet.append([None, None, None, None])
+    path = tmp_path / "historique_simulations.xlsx"
+    workbook.save(path)
+    assert store.import_excel(path) == 1
+    assert store.import_excel(path) == 0
+    assert store.rows(("created_at", "acquisition_price", "rent", "optimal_option")) == [
+        ("2024-03-01 10:00:00", 245000.0, 950.0, "LMNP")]
+
+
+def test_pages_are_sorted_by_the_database(store):
+    for rent in (900, 700, 800, 700, 1000):
+        store.append(dict(INPUTS, rent=rent), RESULTS)
+    assert store.page(0, 2, columns=("id",)) == [(1,), (2,)]
+    assert store.page(4, 2, columns=("id",)) == [(5,)]
+    assert store.page(5, 2) == []
+    # Égalités départagées par l'identifiant, dans le sens du tri
+    assert store.page(0, 5, "rent", columns=("id", "rent")) == [
+        (2, 700.0), (4, 700.0), (3, 800.0), (1, 900.0), (5, 1000.0)]
+    assert store.page(1, 3, "rent", descending=True, columns=("id",)) == [(1,), (3,), (4,)]
+    with pytest.raises(ValueError):
+        store.page(0, 5, "rent; DROP TABLE simulations")
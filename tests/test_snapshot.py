@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from projection import Projection, build_projection  # noqa: E402
+from snapshot import load_snapshot, save_snapshot, snapshot_path  # noqa: E402
+
+INPUTS = {
+    "acquisition_price": 200000, "works_cost": 10000, "property_charges": 1500,
+    "insurance": 300, "rent": 900, "loan_amount": 180000, "loan_duration": 20,
+    "loan_rate": 0.035, "marginal_tax_rate": 0.30, "selling_price": 240000,
+    "detention_duration": 15, "sale_withdrawal": "NON", "cga": "OUI",
+}
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "classeur.xlsm"
+    path.write_bytes(b"contenu du classeur")
+    return path
+
+
+def test_round_trip(workbook):
+    projection = build_projection(INPUTS)
+    save_snapshot(workbook, INPUTS, costs={"LMNP": 1.5}, projection=projection)
+    snapshot = load_snapshot(workbook)
+    assert snapshot is not None
+    try:
+        assert snapshot.inputs == INPUTS
+        assert snapshot.costs == {"LMNP": 1.5}
+        restored = snapshot.projection()
+        for name in Projection.ARRAYS:
+            np.testing.assert_array_equal(getattr(restored, name), getattr(projection, name))
+    finally:
+        snapshot.close()
+
+
+def test_touched_workbook_keeps_snapshot(workbook):
+    save_snapshot(workbook, INPUTS)
+    stat = workbook.stat()
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    snapshot = load_snapshot(workbook)
+    assert snapshot is not None
+    snapshot.close()
+
+
+def test_modified_workbook_discards_snapshot(workbook):
+    save_snapshot(workbook, INPUTS)
+    workbook.write_bytes(b"classeur enregistre depuis")
+    assert load_snapshot(workbook) is None
+    assert not snapshot_path(workbook).exists()
+
+
+def test_same_size_modified_workbook_discards_snapshot(workbook):
+    save_snapshot(workbook, INPUTS)
+    stat = workbook.stat()
+    workbook.write_bytes(b"CONTENU DU CLASSEUR")
+    os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_snapshot(workbook) is None
+
+
+def test_unreadable_snapshot_is_ignored(workbook):
+    snapshot_path(workbook).write_bytes(b"pas un instantane")
+    assert load_snapshot(workbook) is None
+
+
+def test_missing_snapshot(workbook):
+    assert load_snapshot(workbook) is None
@@ -0,0 +1,79 @@
+import zipfile
+
+import numpy as np
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from openpyxl import Workbook  # noqa: E402
+
+from fiscal_engine import FLAG_INPUTS, INPUT_CELLS  # noqa: E402
+from verification import (  # noqa: E402
+    format_report, random_inputs, same_cell_value, verify_cached_values, verify_reference,
+)
+
+
+def _save(path, cells):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for (sheet, cell), value in cells.items():
+        if sheet not in workbook.sheetnames:
+            workbook.create_sheet(sheet)
+        workbook[sheet][cell] = value
+    workbook.save(path)
+
+
+def _with_cached_values(path, values):
+    # Ajoute les valeurs qu'Excel enregistrerait après recalcul
+    with zipfile.ZipFile(path) as archive:
+        files = {name: archive.read(name) for name in archive.namelist()}
+    sheet = files["xl/worksheets/sheet1.xml"].decode()
+    for formula, value in values.items():
+        sheet = sheet.replace(f"<f>{formula}</f><v />", f"<f>{formula}</f><v>{value}</v>")
+    files["xl/worksheets/sheet1.xml"] = sheet.encode()
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+
+
+def test_same_cell_value():
+    assert same_cell_value(100.0, 100.0 + 1e-8)
+    assert not same_cell_value(100.0, 100.01)
+    assert not same_cell_value(1.0, float("nan"))
+    assert same_cell_value(None, 0.0)
+    assert same_cell_value(True, 1)
+    assert same_cell_value("OUI", "OUI")
+
+
+def test_cached_values_are_compared(tmp_path):
+    path = tmp_path / "calc.xlsx"
+    _save(path, {("calc", "A1"): 3, ("calc", "A2"): "=A1*2", ("calc", "A3"): "=A1+1"})
+    _with_cached_values(path, {"A1*2": 6, "A1+1": 5})
+    report = verify_cached_values(path)
+    assert report["checked"] == 2 and report["missing"] == 0
+    assert report["mismatches"] == [{"cell": "calc!A3", "expected": 5, "actual": 4.0}]
+
+
+def test_workbook_without_cached_values_fails(tmp_path):
+    # Enregistré par openpyxl : aucune valeur calculée à comparer
+    path = tmp_path / "reference.xlsx"
+    cells = {("feuil1", cell): 1 for cell in INPUT_CELLS.values()}
+    cells.update({("web", f"B{row}"): "=feuil1!C1*2" for row in range(2, 6)})
+    _save(path, cells)
+    report = verify_reference(path, samples=10)
+    assert "error" not in report
+    assert report["cached"]["checked"] == 0
+    assert not report["passed"]
+    assert "Aucune valeur calculée enregistrée" in format_report(report)
+
+
+def test_random_inputs():
+    base = {key: 100 for key in INPUT_CELLS}
+    columns = random_inputs(base, 500, np.random.default_rng(0), spread=0.2)
+    for key, column in columns.items():
+        assert len(column) == 500
+        if key in FLAG_INPUTS:
+            assert set(column) == {"OUI", "NON"}
+        else:
+            assert column.min() >= 80 and column.max() <= 120
+    assert (columns["loan_duration"] == np.rint(columns["loan_duration"])).all()
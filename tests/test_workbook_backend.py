@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from openpyxl import Workbook  # noqa: E402
+
+from cell_io import ComCellIO  # noqa: E402
+from workbook_backend import (  # noqa: E402
+    BackendUnavailableError, _read_calamine, _read_openpyxl, com_available, open_workbook,
+)
+
+
+@pytest.fixture
+def path(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Feuil1"
+    sheet["C4"] = 245000
+    sheet["C1"] = 950
+    sheet["B43"] = 0.035
+    sheet["F3"] = "OUI"
+    web = workbook.create_sheet("web")
+    for row, value in enumerate((1.5, 2.5, 3.5, 4.5), 2):
+        web[f"B{row}"] = value
+    path = tmp_path / "classeur.xlsx"
+    workbook.save(path)
+    return path
+
+
+def test_file_backend_reads_the_saved_values(path):
+    application, workbook = open_workbook(path, "file")
+    assert application is None
+    assert workbook.sheet_names == ["Feuil1", "web"]
+    sheet = workbook.Sheets("feuil1")
+    assert sheet.Range("$C$4").Value == 245000
+    assert sheet.Range("B43").Value == pytest.approx(0.035)
+    assert sheet.Range("C1:C4").Value == ((950,), (None,), (None,), (245000,))
+    assert sheet.Cells(100, 100).Value is None
+    io = ComCellIO(workbook)
+    assert list(io.read_web_costs().values()) == [1.5, 2.5, 3.5, 4.5]
+    assert io.read_inputs()["cga"] == "OUI"
+
+
+def test_calamine_and_openpyxl_agree(path):
+    pytest.importorskip("python_calamine")
+    # Mêmes lignes depuis A1, cellules vides à None
+    assert _read_calamine(path) == _read_openpyxl(path)
+
+
+def test_writes_stay_in_memory(path):
+    _, workbook = open_workbook(path, "file")
+    sheet = workbook.Sheets("feuil1")
+    sheet.Range("C1").Value = 1000
+    assert sheet.Range("C1").Value == 1000 and workbook.modified
+    with pytest.raises(BackendUnavailableError):
+        workbook.Save()
+    workbook.reload()
+    assert workbook.Sheets("feuil1").Range("C1").Value == 950 and not workbook.modified
+
+
+def test_backend_selection(path):
+    with pytest.raises(ValueError):
+        open_workbook(path, "excel")
+    if not com_available():
+        with pytest.raises(BackendUnavailableError):
+            open_workbook(path, "com")
+        assert open_workbook(path)[0] is None
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from workbook_worker import WorkbookWorker, WorkerBusyError
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def blocked_worker():
+    """Thread du classeur occupé par une commande jusqu'à la fin du test"""
+    worker = WorkbookWorker(max_pending=2)
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(TIMEOUT)
+
+    worker.submit(block)
+    assert started.wait(TIMEOUT)
+    yield worker
+    release.set()
+    worker.stop(timeout=TIMEOUT)
+
+
+def test_pending_commands_with_same_key_are_coalesced(blocked_worker):
+    calls = []
+    first = blocked_worker.submit(calls.append, 1, key="recalcul")
+    second = blocked_worker.submit(calls.append, 2, key="recalcul")
+    assert second is first
+    assert blocked_worker.stats["coalesced"] == 1
+    assert blocked_worker.pending() == 1
+    # La commande en cours n'est plus en file : elle n'absorbe pas les suivantes
+    other = blocked_worker.submit(calls.append, 3, key="autre")
+    assert other is not first
+
+
+def test_full_queue_rejects_commands(blocked_worker):
+    first = blocked_worker.submit(int, key="recalcul")
+    blocked_worker.submit(int)
+    with pytest.raises(WorkerBusyError):
+        blocked_worker.submit(int)
+    assert blocked_worker.stats["rejected"] == 1
+    # File pleine : une commande fusionnée reste acceptée
+    assert blocked_worker.submit(int, key="recalcul") is first
+    assert blocked_worker.pending() == 2
+
+
+def test_commands_run_in_order():
+    worker = WorkbookWorker()
+    results = []
+    futures = [worker.submit(results.append, value) for value in range(5)]
+    for future in futures:
+        future.result(TIMEOUT)
+    worker.stop(timeout=TIMEOUT)
+    assert results == list(range(5))
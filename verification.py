@@ -0,0 +1,288 @@
+"""
+Vérification différentielle des calculs sans Excel.
+
+Deux contrôles par classeur de référence (.xlsm enregistré par Excel) :
+
+- valeurs en cache : les valeurs qu'Excel a enregistrées dans le fichier
+  (lues avec openpyxl en data_only) sont comparées, cellule par cellule, à
+  celles du compilateur de formules évaluant le classeur sur ses propres
+  entrées ;
+- entrées aléatoires : des milliers de jeux d'entrées de feuil1 tirés
+  autour de ceux du classeur sont évalués en un lot par le compilateur
+  (web!B2:B5) et par le moteur fiscal natif, puis comparés.
+
+Aucun processus Excel n'est nécessaire ; les classeurs sont répartis sur
+un pool de processus.
+
+Utilisation : python verification.py classeur.xlsm [...] --samples 5000
+"""
+
+import argparse
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from fiscal_engine import FLAG_INPUTS, INPUT_CELLS, REGIMES, compute_batch
+from formula_compiler import (
+    INPUT_SHEET, OPENPYXL_AVAILABLE, WEB_OUTPUTS, ExcelError, WorkbookModel, cell_key,
+)
+
+if OPENPYXL_AVAILABLE:
+    from openpyxl import load_workbook
+
+# Écarts tolérés : |écart| <= max(relatif * |attendu|, absolu)
+DEFAULT_RELATIVE_TOLERANCE = 1e-9
+DEFAULT_ABSOLUTE_TOLERANCE = 1e-6
+# Le moteur natif est comparé au centime près
+NATIVE_ABSOLUTE_TOLERANCE = 0.01
+
+DEFAULT_SAMPLES = 1000
+DEFAULT_SPREAD = 0.5          # Entrées tirées entre -50 % et +50 %
+MAX_REPORTED = 50             # Écarts détaillés par contrôle
+
+INTEGER_INPUTS = ("loan_duration", "detention_duration")
+
+
+def cached_values(path, sheets=None):
+    """Valeurs enregistrées par Excel, indexées comme les cellules du compilateur"""
+    workbook = load_workbook(path, data_only=True, read_only=True)
+    selected = {sheet.lower() for sheet in sheets} if sheets else None
+    values = {}
+    for worksheet in workbook.worksheets:
+        if selected is not None and worksheet.title.lower() not in selected:
+            continue
+        for row in worksheet.iter_rows():
+            for cell in row:
+                if cell.value is not None and hasattr(cell, "coordinate"):
+                    values[cell_key(worksheet.title, cell.coordinate)] = cell.value
+    workbook.close()
+    return values
+
+
+def same_cell_value(expected, actual, relative=DEFAULT_RELATIVE_TOLERANCE,
+                    absolute=DEFAULT_ABSOLUTE_TOLERANCE):
+    """Égalité d'une valeur Excel et d'une valeur calculée, aux tolérances près"""
+    if isinstance(actual, ExcelError):
+        return isinstance(expected, str) and expected.upper() == actual.code
+    if expected is None or expected == "":
+        return actual in (None, "", 0, 0.0)
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return bool(expected) == bool(actual)
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        if math.isnan(actual):
+            return False
+        return math.isclose(expected, actual, rel_tol=relative, abs_tol=absolute)
+    return str(expected) == str(actual)
+
+
+def _display(value):
+    if isinstance(value, ExcelError):
+        return value.code
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return value
+
+
+def verify_cached_values(path, model=None, relative=DEFAULT_RELATIVE_TOLERANCE,
+                         absolute=DEFAULT_ABSOLUTE_TOLERANCE, sheets=None):
+    """
+    Compare les valeurs en cache d'Excel à celles du compilateur pour
+    toutes les cellules calculées. Retourne le nombre de cellules
+    vérifiées et les écarts (cellule, attendu, obtenu).
+    """
+    model = model or WorkbookModel.load(path, sheets)
+    expected = cached_values(path, sheets)
+    keys = [key for key in model.order if key in expected]
+    env = model.run(dict(model.constants), tuple(keys))
+
+    mismatches = []
+    for key in keys:
+        if not same_cell_value(expected[key], env.get(key), relative, absolute):
+            sheet, cell = key
+            mismatches.append({
+                "cell": f"{sheet}!{cell}",
+                "expected": expected[key],
+                "actual": _display(env.get(key)),
+            })
+    return {
+        "checked": len(keys),
+        # Cellules calculées qu'Excel n'a jamais enregistrées (fichier non recalculé)
+        "missing": len(model.formulas) - len(keys),
+        "mismatches": mismatches,
+    }
+
+
+def workbook_inputs(model, path=None):
+    """
+    Entrées de feuil1 du classeur (clés du moteur). Les cellules d'entrée
+    contenant une formule prennent la valeur enregistrée par Excel.
+    """
+    cached = cached_values(path, [INPUT_SHEET]) if path else {}
+    values = {}
+    for key, cell in INPUT_CELLS.items():
+        address = cell_key(INPUT_SHEET, cell)
+        values[key] = model.constants.get(address, cached.get(address))
+    return values
+
+
+def random_inputs(base, size, rng, spread=DEFAULT_SPREAD):
+    """
+    Tire `size` jeux d'entrées autour de `base` (valeurs brutes de
+    cellules) : facteur uniforme dans [1 - spread, 1 + spread], options
+    OUI/NON tirées au hasard, durées arrondies à l'année.
+    """
+    columns = {}
+    for key in INPUT_CELLS:
+        value = base.get(key)
+        if key in FLAG_INPUTS:
+            columns[key] = rng.choice(np.array(["OUI", "NON"]), size)
+            continue
+        try:
+            value = float(value or 0)
+        except (TypeError, ValueError):
+            value = 0.0
+        column = value * rng.uniform(1 - spread, 1 + spread, size)
+        if key in INTEGER_INPUTS:
+            column = np.maximum(np.rint(column), 1.0)
+        columns[key] = column
+    return columns
+
+
+def verify_random_inputs(model, base, samples=DEFAULT_SAMPLES, seed=0,
+                         spread=DEFAULT_SPREAD, relative=DEFAULT_RELATIVE_TOLERANCE,
+                         absolute=NATIVE_ABSOLUTE_TOLERANCE):
+    """
+    Évalue `samples` jeux d'entrées aléatoires avec le compilateur
+    (web!B2:B5) et le moteur natif (régimes correspondants de REGIMES).
+    Retourne, par régime, le nombre d'écarts et l'écart maximal, ainsi que
+    le détail des premiers écarts (numéro du tirage, entrées, valeurs).
+    """
+    rng = np.random.default_rng(seed)
+    columns = random_inputs(base, samples, rng, spread)
+    workbook = model.evaluate_batch(columns, WEB_OUTPUTS)
+    native = compute_batch(columns)
+
+    regimes, mismatches = {}, []
+    for column, (output, regime) in enumerate(zip(WEB_OUTPUTS, REGIMES)):
+        expected = workbook[output].astype(float)
+        actual = native[:, column]
+        difference = np.abs(actual - expected)
+        failed = ~(difference <= np.maximum(relative * np.abs(expected), absolute))
+        regimes[regime] = {
+            "cell": output,
+            "mismatches": int(failed.sum()),
+            "max_difference": float(np.nanmax(difference)) if samples else 0.0,
+        }
+        for index in np.flatnonzero(failed)[:MAX_REPORTED]:
+            mismatches.append({
+                "sample": int(index),
+                "regime": regime,
+                "cell": output,
+                "inputs": {key: _display(values[index]) for key, values in columns.items()},
+                "expected": float(expected[index]),
+                "actual": float(actual[index]),
+            })
+    return {"samples": samples, "seed": seed, "regimes": regimes, "mismatches": mismatches}
+
+
+def verify_reference(path, samples=DEFAULT_SAMPLES, seed=0, spread=DEFAULT_SPREAD,
+                     relative=DEFAULT_RELATIVE_TOLERANCE, absolute=DEFAULT_ABSOLUTE_TOLERANCE):
+    """Les deux contrôles sur un classeur de référence"""
+    try:
+        model = WorkbookModel.load(path)
+        report = {
+            "workbook": str(path),
+            "unsupported": sorted(model.unsupported),
+            "unparsed": {f"{sheet}!{cell}": formula
+                         for (sheet, cell), formula in sorted(model.errors.items())},
+            "cached": verify_cached_values(path, model, relative, absolute),
+        }
+        report["random"] = verify_random_inputs(
+            model, workbook_inputs(model, path), samples, seed, spread, relative,
+            max(absolute, NATIVE_ABSOLUTE_TOLERANCE))
+    except Exception as e:
+        return {"workbook": str(path), "error": f"{type(e).__name__}: {str(e)}"}
+    cached = report["cached"]
+    # Aucune valeur en cache comparée (classeur enregistré sans recalcul, par
+    # openpyxl par exemple) : le contrôle n'a rien prouvé, il échoue
+    report["passed"] = (cached["checked"] > 0 and not cached["mismatches"]
+                        and not report["random"]["mismatches"])
+    return report
+
+
+def verify_references(paths, samples=DEFAULT_SAMPLES, seed=0, workers=None, **options):
+    """
+    Vérifie plusieurs classeurs, chacun dans un processus du pool (avec
+    workers=1 le calcul reste dans le processus courant). Chaque classeur
+    reçoit une graine dérivée de `seed` : le résultat ne dépend pas du
+    nombre de processus.
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise RuntimeError("openpyxl est requis pour lire les classeurs de référence")
+    paths = [str(path) for path in paths]
+    seeds = [int(child.generate_state(1)[0])
+             for child in np.random.SeedSequence(seed).spawn(len(paths))]
+    tasks = [(path, samples, child) for path, child in zip(paths, seeds)]
+
+    if workers == 1 or len(tasks) <= 1:
+        return [verify_reference(*task, **options) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(verify_reference, *task, **options) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def format_report(report):
+    """Résumé texte d'un rapport de verify_reference"""
+    lines = [f"== {report['workbook']}"]
+    if "error" in report:
+        lines.append(f"   ERREUR : {report['error']}")
+        return "\n".join(lines)
+    if report["unsupported"]:
+        lines.append(f"   Fonctions non prises en charge : {', '.join(report['unsupported'])}")
+    for cell, formula in list(report["unparsed"].items())[:MAX_REPORTED]:
+        lines.append(f"   Formule non analysée {cell} : {formula}")
+
+    cached = report["cached"]
+    lines.append(f"   Valeurs en cache : {cached['checked']} cellules, "
+                 f"{len(cached['mismatches'])} écarts, {cached['missing']} sans valeur")
+    if not cached["checked"]:
+        lines.append("      Aucune valeur calculée enregistrée : ouvrir le classeur dans Excel "
+                     "et l'enregistrer avant de le vérifier")
+    for mismatch in cached["mismatches"][:MAX_REPORTED]:
+        lines.append(f"      {mismatch['cell']} : attendu {mismatch['expected']!r}, "
+                     f"obtenu {mismatch['actual']!r}")
+
+    random = report["random"]
+    lines.append(f"   Entrées aléatoires : {random['samples']} tirages (graine {random['seed']})")
+    for regime, result in random["regimes"].items():
+        lines.append(f"      {result['cell']} {regime} : {result['mismatches']} écarts, "
+                     f"écart max {result['max_difference']:.6g}")
+    lines.append("   OK" if report["passed"] else "   ÉCHEC")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Vérifie le compilateur de formules et le moteur natif "
+                    "contre des classeurs enregistrés par Excel.")
+    parser.add_argument("workbooks", nargs="+", help="Classeurs de référence (.xlsm)")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spread", type=float, default=DEFAULT_SPREAD)
+    parser.add_argument("--relative", type=float, default=DEFAULT_RELATIVE_TOLERANCE)
+    parser.add_argument("--absolute", type=float, default=DEFAULT_ABSOLUTE_TOLERANCE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    reports = verify_references(args.workbooks, args.samples, args.seed, args.workers,
+                                spread=args.spread, relative=args.relative,
+                                absolute=args.absolute)
+    for report in reports:
+        print(format_report(report))
+    return 0 if all(report.get("passed") for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
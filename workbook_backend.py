@@ -0,0 +1,213 @@
+"""
+Accès au classeur par un backend interchangeable.
+
+Deux backends exposent la même interface que les objets COM utilisés par
+l'application (application.Quit(), workbook.Sheets(nom).Range(adresse)
+.Value, workbook.Close()) :
+
+- "com" : Excel piloté par win32com (Windows, Excel installé), importé
+  uniquement à l'ouverture ;
+- "file" : lecture directe des valeurs enregistrées dans le fichier
+  (python-calamine si disponible, sinon openpyxl), sans lancer Excel.
+  Ce backend est en lecture seule : les écritures restent en mémoire et
+  ne déclenchent aucun recalcul, les calculs étant faits par le moteur
+  natif.
+
+open_workbook(path) choisit "com" lorsque win32com est disponible, "file"
+sinon.
+"""
+
+import sys
+from pathlib import Path
+
+from cell_io import column_letter, split_cell
+
+BACKENDS = ("auto", "com", "file")
+
+
+class BackendUnavailableError(RuntimeError):
+    """Le backend demandé ne peut pas être utilisé sur ce poste"""
+
+
+def com_available():
+    if sys.platform != "win32":
+        return False
+    try:
+        import win32com.client  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def open_workbook(path, backend="auto"):
+    """
+    Ouvre le classeur `path`. Retourne (application, classeur) ;
+    l'application est None pour le backend fichier.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend inconnu : {backend}")
+    if backend == "auto":
+        backend = "com" if com_available() else "file"
+    if backend == "com":
+        return open_com_workbook(path)
+    return None, FileWorkbook(path)
+
+
+def open_com_workbook(path):
+    """Lance Excel (invisible) et ouvre le classeur"""
+    try:
+        import win32com.client
+    except ImportError:
+        raise BackendUnavailableError("win32com (pywin32) n'est pas installé")
+    excel = win32com.client.Dispatch("Excel.Application")
+    excel.Visible = False
+    excel.DisplayAlerts = False
+    try:
+        workbook = excel.Workbooks.Open(str(Path(path).absolute()))
+    except Exception:
+        excel.Quit()
+        raise
+    return excel, workbook
+
+
+# === BACKEND FICHIER ===
+
+def _read_calamine(path):
+    from python_calamine import CalamineWorkbook
+    workbook = CalamineWorkbook.from_path(str(path))
+    sheets = {}
+    for name in workbook.sheet_names:
+        rows = workbook.get_sheet_by_name(name).to_python(skip_empty_area=False)
+        # Cellule vide : "" pour calamine, None pour Excel
+        sheets[name] = [[None if value == "" else value for value in row] for row in rows]
+    return sheets
+
+
+def _read_openpyxl(path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return {worksheet.title: [list(row) for row in worksheet.iter_rows(
+                    min_row=1, min_col=1, values_only=True)]
+                for worksheet in workbook.worksheets}
+    finally:
+        workbook.close()
+
+
+def read_cached_values(path):
+    """Valeurs enregistrées du classeur : {feuille: lignes de valeurs}"""
+    try:
+        return _read_calamine(path)
+    except ImportError:
+        pass
+    try:
+        return _read_openpyxl(path)
+    except ImportError:
+        raise BackendUnavailableError(
+            "python-calamine ou openpyxl est requis pour lire le classeur sans Excel")
+
+
+class FileRange:
+    """Plage rectangulaire d'une FileSheet (Value et Formula comme en COM)"""
+
+    def __init__(self, sheet, address):
+        first, _, last = address.partition(":")
+        self.sheet = sheet
+        self.first_column, self.first_row = split_cell(first)
+        self.last_column, self.last_row = split_cell(last or first)
+
+    def _positions(self):
+        return [[(row, column) for column in range(self.first_column, self.last_column + 1)]
+                for row in range(self.first_row, self.last_row + 1)]
+
+    @property
+    def Value(self):
+        rows = tuple(tuple(self.sheet.get(row, column) for row, column in line)
+                     for line in self._positions())
+        # Une cellule seule est renvoyée comme un scalaire, comme en COM
+        if len(rows) == 1 and len(rows[0]) == 1:
+            return rows[0][0]
+        return rows
+
+    @Value.setter
+    def Value(self, value):
+        positions = self._positions()
+        if not isinstance(value, (tuple, list)):
+            value = [[value] * len(positions[0])] * len(positions)
+        for line, values in zip(positions, value):
+            for (row, column), item in zip(line, values):
+                self.sheet.set(row, column, item)
+
+    # Les formules ne sont pas lues : seules les valeurs en cache sont connues
+    Formula = Value
+
+
+class FileSheet:
+    def __init__(self, workbook, name, rows):
+        self.workbook = workbook
+        self.Name = name
+        self._rows = rows
+
+    def get(self, row, column):
+        try:
+            return self._rows[row - 1][column - 1]
+        except IndexError:
+            return None
+
+    def set(self, row, column, value):
+        value = None if value == "" else value
+        while len(self._rows) < row:
+            self._rows.append([])
+        line = self._rows[row - 1]
+        if len(line) < column:
+            line.extend([None] * (column - len(line)))
+        if line[column - 1] != value:
+            line[column - 1] = value
+            self.workbook.modified = True
+
+    def Range(self, address):
+        return FileRange(self, address.replace("$", ""))
+
+    def Cells(self, row, column):
+        return FileRange(self, f"{column_letter(column)}{row}")
+
+    def Activate(self):
+        self.workbook.active_sheet = self
+
+
+class FileWorkbook:
+    """Classeur lu depuis le fichier, sans Excel"""
+
+    read_only = True
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.FullName = str(self.path.absolute())
+        self.Name = self.path.name
+        self.reload()
+
+    def reload(self):
+        """Relit les valeurs du fichier (les modifications en mémoire sont perdues)"""
+        self.modified = False
+        self._sheets = {name.lower(): FileSheet(self, name, rows)
+                        for name, rows in read_cached_values(self.path).items()}
+        self.active_sheet = next(iter(self._sheets.values()), None)
+
+    def Sheets(self, name):
+        try:
+            return self._sheets[str(name).lower()]
+        except KeyError:
+            raise KeyError(f"Feuille introuvable : {name}")
+
+    @property
+    def sheet_names(self):
+        return [sheet.Name for sheet in self._sheets.values()]
+
+    def Save(self):
+        raise BackendUnavailableError(
+            "Le classeur est ouvert en lecture seule (sans Excel) : enregistrement impossible")
+
+    def Close(self, SaveChanges=False):
+        if SaveChanges and self.modified:
+            print("Classeur ouvert en lecture seule : les modifications ne sont pas enregistrées")
+        self._sheets = {}
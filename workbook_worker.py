@@ -0,0 +1,150 @@
+"""
+Thread propriétaire du classeur.
+
+Les objets COM d'Excel appartiennent au thread qui les a créés ; le
+serveur Flask (threaded=True) et l'interface Tk y accèdent pourtant depuis
+des threads différents. Tous les accès au classeur passent donc par un
+unique thread de travail et sa file de commandes :
+
+- chaque commande retourne un Future ;
+- une commande identique (même clé) encore en attente n'est pas
+  dupliquée : l'appelant reçoit le Future déjà en file ;
+- la profondeur de la file est bornée : au-delà, WorkerBusyError.
+"""
+
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+
+DEFAULT_MAX_PENDING = 32
+
+
+class WorkerBusyError(RuntimeError):
+    """File de commandes pleine"""
+
+
+class WorkerStoppedError(RuntimeError):
+    """Le thread du classeur est arrêté"""
+
+
+def _com_initialize():
+    # Le thread doit initialiser COM pour piloter Excel (pywin32)
+    try:
+        import pythoncom
+    except ImportError:
+        return False
+    pythoncom.CoInitialize()
+    return True
+
+
+def _com_uninitialize():
+    import pythoncom
+    pythoncom.CoUninitialize()
+
+
+class WorkbookWorker:
+    """Thread unique exécutant les commandes adressées au classeur"""
+
+    def __init__(self, max_pending=DEFAULT_MAX_PENDING, name="classeur"):
+        self.max_pending = max_pending
+        self.name = name
+        self.stats = Counter()      # submitted, coalesced, rejected, completed, failed
+        self._queue = deque()
+        self._pending = {}          # clé -> Future d'une commande pas encore démarrée
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def in_worker(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, function, *args, key=None, **kwargs):
+        """
+        Met function(*args, **kwargs) en file et retourne son Future. Deux
+        commandes de même `key` en attente sont fusionnées.
+        """
+        with self._condition:
+            if self._stopping:
+                raise WorkerStoppedError("Le thread du classeur est arrêté")
+            if key is not None and key in self._pending:
+                self.stats["coalesced"] += 1
+                return self._pending[key]
+            if len(self._queue) >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise WorkerBusyError(
+                    f"File du classeur pleine ({self.max_pending} commandes en attente)")
+            future = Future()
+            self._queue.append((key, future, function, args, kwargs))
+            if key is not None:
+                self._pending[key] = future
+            self.stats["submitted"] += 1
+            self._ensure_thread()
+            self._condition.notify()
+            return future
+
+    def call(self, function, *args, key=None, timeout=None, **kwargs):
+        """
+        Exécute une commande et attend son résultat. Appelée depuis le
+        thread du classeur, elle s'exécute directement (pas d'interblocage).
+        """
+        if self.in_worker():
+            return function(*args, **kwargs)
+        return self.submit(function, *args, key=key, **kwargs).result(timeout)
+
+    def pending(self):
+        with self._condition:
+            return len(self._queue)
+
+    def stop(self, wait=True, timeout=None):
+        """Termine les commandes en file puis arrête le thread"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread = self._thread
+        if wait and thread is not None and not self.in_worker():
+            thread.join(timeout)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        com = _com_initialize()
+        try:
+            while True:
+                with self._condition:
+                    while not self._queue and not self._stopping:
+                        self._condition.wait()
+                    if not self._queue:
+                        break
+                    key, future, function, args, kwargs = self._queue.popleft()
+                    # Une fois démarrée, la commande n'absorbe plus les suivantes
+                    if key is not None and self._pending.get(key) is future:
+                        del self._pending[key]
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = function(*args, **kwargs)
+                except BaseException as e:
+                    self.stats["failed"] += 1
+                    future.set_exception(e)
+                else:
+                    self.stats["completed"] += 1
+                    future.set_result(result)
+        finally:
+            if com:
+                _com_uninitialize()
+
+
+_default_worker = None
+_default_lock = threading.Lock()
+
+
+def default_worker():
+    """Thread du classeur partagé par l'application"""
+    global _default_worker
+    with _default_lock:
+        if _default_worker is None:
+            _default_worker = WorkbookWorker()
+        return _default_worker